@@ -0,0 +1,197 @@
+"""End-to-end load benchmark against local simulated fleet of F&F Fox devices.
+
+Simulated devices run in separate process, so reported CPU time and peak memory
+belong to the client only. No network access is needed.
+
+Usage: python benchmarks/bench_load.py --devices 100 --latency 0.01 --duration 5
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import random
+import resource
+import sys
+import time
+from os import path
+sys.path.append( path.dirname( path.dirname( path.abspath(__file__) ) ) )
+
+from foxrestapiclient.connection.rest_api_budget import RestApiRequestBudget
+from foxrestapiclient.connection.rest_api_session import RestApiSessionPool
+from foxrestapiclient.devices.fox_base_device import DeviceData
+from foxrestapiclient.devices.fox_device_factory import create_device
+from foxrestapiclient.devices.fox_dim1s2_device import FoxDIM1S2Device
+from foxrestapiclient.devices.fox_fleet import FoxFleet
+from foxrestapiclient.devices.fox_led2s2_device import FoxLED2S2Device
+from foxrestapiclient.devices.fox_rgbw_device import FoxRGBWDevice
+from foxrestapiclient.devices.fox_str1s2_device import FoxSTR1S2Device
+from foxrestapiclient.testing.fox_simulated_device import FaultProfile
+from foxrestapiclient.testing.fox_simulator import FoxSimulator
+
+
+def serve_in_process(connection, devices_count: int, fault_profile: FaultProfile):
+    """Run simulator in separate process.
+
+    Sends list of (host, dev_type, mac_addr) through connection, then replies with
+    served requests count to every received message. Stops after "stop" message.
+    """
+    async def async_serve():
+        async with FoxSimulator.create_fleet(devices_count, fault_profile=fault_profile,
+                discovery_port=None) as simulator:
+            connection.send([(device.host, device.dev_type, device.mac_addr)
+                for device in simulator.get_device_data()])
+            loop = asyncio.get_running_loop()
+            while True:
+                message = await loop.run_in_executor(None, connection.recv)
+                connection.send(simulator.get_requests_count())
+                if message == "stop":
+                    break
+    asyncio.run(async_serve())
+
+
+def percentile(values: list, percent: float) -> float:
+    """Return percentile of sorted values."""
+    if not values:
+        return 0.0
+    index = min(int(round(percent / 100 * (len(values) - 1))), len(values) - 1)
+    return values[index]
+
+
+async def async_command(device):
+    """Send command matching device type."""
+    if isinstance(device, FoxSTR1S2Device):
+        return await device.async_set_cover_position(random.randint(0, 100))
+    if isinstance(device, FoxRGBWDevice):
+        return await device.async_set_color_hsv(random.randint(1, 359), random.randint(1, 100))
+    if isinstance(device, (FoxDIM1S2Device, FoxLED2S2Device)):
+        return await device.async_update_channel_brightness(random.randint(0, 255), 1)
+    return await device.async_update_channel_state(random.random() < 0.5)
+
+
+async def async_poll_workload(fleet: FoxFleet, duration: float) -> list:
+    """Poll whole fleet until duration passes. Return device refresh latencies."""
+    latencies = []
+    end = time.monotonic() + duration
+    while time.monotonic() < end:
+        result = await fleet.async_poll()
+        latencies.extend(result.device_durations.values())
+    return latencies
+
+
+async def async_command_workload(fleet: FoxFleet, duration: float, concurrency: int) -> list:
+    """Send commands to random devices until duration passes. Return command latencies."""
+    latencies = []
+    devices = fleet.get_devices()
+    end = time.monotonic() + duration
+
+    async def async_worker():
+        while time.monotonic() < end:
+            start = time.monotonic()
+            await async_command(random.choice(devices))
+            latencies.append(time.monotonic() - start)
+
+    await asyncio.gather(*[async_worker() for _ in range(concurrency)])
+    return latencies
+
+
+async def async_run_workload(name, workload, connection) -> dict:
+    """Run workload and collect client statistics."""
+    connection.send("count")
+    requests_before = connection.recv()
+    cpu_start = time.process_time()
+    start = time.monotonic()
+    latencies = sorted(await workload)
+    wall = time.monotonic() - start
+    cpu = time.process_time() - cpu_start
+    connection.send("count")
+    requests = connection.recv() - requests_before
+    return {
+        "workload": name,
+        "requests": requests,
+        "requests_per_second": requests / wall,
+        "operations": len(latencies),
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "cpu_seconds": cpu,
+        "cpu_per_request_us": cpu / requests * 1e6 if requests else 0.0,
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    }
+
+
+async def async_main(args) -> list:
+    """Start fake fleet, run workloads and return results."""
+    connection, child_connection = multiprocessing.Pipe()
+    server = multiprocessing.Process(target=serve_in_process,
+        args=(child_connection, args.devices, FaultProfile(args.latency, args.latency_jitter,
+            args.drop_probability, invalid_action_probability=args.invalid_probability)),
+        daemon=True)
+    server.start()
+    hosts = connection.recv()
+    budget = RestApiRequestBudget.get_default()
+    budget.set_rate(args.budget_rate if args.budget_rate > 0 else None)
+    budget.set_max_concurrency(args.budget_concurrency if args.budget_concurrency > 0 else None)
+    budget.set_adaptive(args.adaptive_budget)
+    pool = RestApiSessionPool()
+    fleet = FoxFleet([
+        create_device(DeviceData(None, host, "000", mac_addr, dev_type), pool)
+        for host, dev_type, mac_addr in hosts
+    ], max_concurrency=args.concurrency)
+    if args.concurrent_refresh:
+        for device in fleet.get_devices():
+            device.set_concurrent_refresh(True)
+    results = []
+    try:
+        if args.workload in ("poll", "all"):
+            results.append(await async_run_workload("poll",
+                async_poll_workload(fleet, args.duration), connection))
+        if args.workload in ("command", "all"):
+            results.append(await async_run_workload("command",
+                async_command_workload(fleet, args.duration, args.concurrency), connection))
+    finally:
+        await fleet.async_close()
+        connection.send("stop")
+        connection.recv()
+        server.join()
+    return results
+
+
+def main():
+    """Parse arguments, run benchmark and print report."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--devices", type=int, default=100, help="simulated devices count")
+    parser.add_argument("--latency", type=float, default=0.005,
+        help="simulated device response latency in seconds")
+    parser.add_argument("--latency-jitter", type=float, default=0,
+        help="random extra latency in seconds")
+    parser.add_argument("--drop-probability", type=float, default=0,
+        help="probability of dropped connection")
+    parser.add_argument("--invalid-probability", type=float, default=0,
+        help="probability of invalid_action_name response")
+    parser.add_argument("--duration", type=float, default=5, help="workload duration in seconds")
+    parser.add_argument("--concurrency", type=int, default=32,
+        help="fleet poll concurrency and command workers count")
+    parser.add_argument("--workload", choices=("poll", "command", "all"), default="all")
+    parser.add_argument("--concurrent-refresh", action="store_true",
+        help="enable concurrent refresh mode on devices")
+    parser.add_argument("--budget-rate", type=float, default=0,
+        help="process-wide requests per second, 0 disables rate limit")
+    parser.add_argument("--budget-concurrency", type=int, default=0,
+        help="process-wide max requests in progress, 0 disables limit")
+    parser.add_argument("--adaptive-budget", action="store_true",
+        help="adapt process-wide concurrency to errors and latency (AIMD)")
+    parser.add_argument("--json", action="store_true", help="print results as JSON lines")
+    args = parser.parse_args()
+    for result in asyncio.run(async_main(args)):
+        if args.json:
+            print(json.dumps(result))
+            continue
+        print("[{0}] {1} requests, {2:.0f} req/s, p50 {3:.1f} ms, p95 {4:.1f} ms, "
+            "p99 {5:.1f} ms, cpu {6:.2f} s ({7:.0f} us/req), peak rss {8:.1f} MB".format(
+            result["workload"], result["requests"], result["requests_per_second"],
+            result["p50_ms"], result["p95_ms"], result["p99_ms"], result["cpu_seconds"],
+            result["cpu_per_request_us"], result["peak_rss_mb"]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""Memory footprint benchmark of device data for simulated fleet.
+
+Compares per-device memory of previous __dict__ based objects with not interned
+strings against current slotted objects with interned metadata. Whole FoxR1S1Device
+objects are measured too, without and with sensor history enabled.
+
+Usage: python benchmarks/bench_memory.py [devices_count]
+"""
+import json
+import sys
+import tracemalloc
+from os import path
+sys.path.append( path.dirname( path.dirname( path.abspath(__file__) ) ) )
+
+from foxrestapiclient.connection.rest_api_responses import (
+    RestApiDeviceInfoResponse, RestApiDeviceStateResponse)
+from foxrestapiclient.devices.const import DEVICE_TYPE_R1S1
+from foxrestapiclient.devices.fox_base_device import DeviceData
+from foxrestapiclient.devices.fox_r1s1_device import FoxR1S1Device
+
+DEFAULT_DEVICES_COUNT = 10000
+
+DEVICE_INFO_PAYLOAD = json.dumps({
+    "status": "ok", "device_name": "R1S1", "firmware": "1.2.14", "hw": "2.0",
+    "updater": "1.0.3", "device_friendly_name": "Meter", "device_commercial_name": "Fox R1S1",
+    "device_channels_name": ["Channel 1"]
+})
+STATE_PAYLOAD = json.dumps({"status": "ok", "state": "on"})
+ENERGY_PAYLOAD = json.dumps({
+    "status": "ok", "active_energy": "1523.4", "reactive_energy": "12.1",
+    "active_energy_import": "1500.2", "reactive_energy_import": "10.4"
+})
+AC_PAYLOAD = json.dumps({
+    "status": "ok", "voltage": "230.4", "current": "1.21", "power_active": "270.5",
+    "power_reactive": "12.5", "frequency": "50.01", "power_factor": "0.98"
+})
+
+
+class DictRecord:
+    """Object with attributes stored in __dict__, as before slots were introduced."""
+
+    def __init__(self, **attributes):
+        """Store all attributes in instance dictionary."""
+        for name, value in attributes.items():
+            setattr(self, name, value)
+
+
+def create_dict_device(index: int) -> tuple:
+    """Create device data with previous __dict__ layout."""
+    info = json.loads(DEVICE_INFO_PAYLOAD)
+    info["hardware"] = info.pop("hw")
+    return (
+        DictRecord(name="R1S1", host="192.168.{0}.{1}".format(index // 250, index % 250),
+            api_key="000", mac_addr="{0:012x}".format(index), dev_type=DEVICE_TYPE_R1S1,
+            channels=None, skip=False),
+        DictRecord(error="", _RestApiBaseResponse__has_errors=False,
+            _RestApiBaseResponse__error_obj=None, **info),
+        DictRecord(error="", _RestApiBaseResponse__has_errors=False,
+            _RestApiBaseResponse__error_obj=None, channel_1_state=None, channel_2_state=None,
+            overcurrent=None, **json.loads(STATE_PAYLOAD)),
+        DictRecord(error="", _RestApiBaseResponse__has_errors=False,
+            _RestApiBaseResponse__error_obj=None, **json.loads(ENERGY_PAYLOAD)),
+        DictRecord(error="", _RestApiBaseResponse__has_errors=False,
+            _RestApiBaseResponse__error_obj=None, **json.loads(AC_PAYLOAD))
+    )
+
+
+def create_slotted_device(index: int) -> tuple:
+    """Create device data with current slotted classes."""
+    return (
+        DeviceData("R1S1", "192.168.{0}.{1}".format(index // 250, index % 250), "000",
+            "{0:012x}".format(index), DEVICE_TYPE_R1S1),
+        RestApiDeviceInfoResponse(**json.loads(DEVICE_INFO_PAYLOAD)),
+        RestApiDeviceStateResponse(**json.loads(STATE_PAYLOAD)),
+        FoxR1S1Device.EnergySensorData(**json.loads(ENERGY_PAYLOAD)),
+        FoxR1S1Device.ACParamsSensorData(**json.loads(AC_PAYLOAD))
+    )
+
+
+def create_r1s1_device(index: int) -> FoxR1S1Device:
+    """Create R1S1 device, sensor history is not allocated."""
+    return FoxR1S1Device(DeviceData("R1S1", "192.168.{0}.{1}".format(index // 250, index % 250),
+        "000", "{0:012x}".format(index), DEVICE_TYPE_R1S1))
+
+
+def create_r1s1_device_with_history(index: int) -> FoxR1S1Device:
+    """Create R1S1 device with sensor history enabled."""
+    device = create_r1s1_device(index)
+    device.enable_sensor_history()
+    return device
+
+
+def measure(factory, devices_count: int) -> float:
+    """Return memory in bytes allocated per device by given factory."""
+    tracemalloc.start()
+    start, _ = tracemalloc.get_traced_memory()
+    fleet = [factory(index) for index in range(devices_count)]
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del fleet
+    return (current - start) / devices_count
+
+
+def main():
+    """Run benchmark and print results."""
+    devices_count = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_DEVICES_COUNT
+    before = measure(create_dict_device, devices_count)
+    after = measure(create_slotted_device, devices_count)
+    print("Simulated fleet: {0} R1S1 devices".format(devices_count))
+    print("__dict__ objects:  {0:8.0f} B per device".format(before))
+    print("slotted objects:   {0:8.0f} B per device".format(after))
+    print("saved:             {0:8.1f} %".format(100 * (before - after) / before))
+    #Whole devices are much bigger, fewer of them give stable result
+    devices_count = max(devices_count // 10, 1)
+    device = measure(create_r1s1_device, devices_count)
+    history = measure(create_r1s1_device_with_history, devices_count)
+    print("FoxR1S1Device:     {0:8.0f} B per device".format(device))
+    print("with history:      {0:8.0f} B per device".format(history))
+
+
+if __name__ == "__main__":
+    main()
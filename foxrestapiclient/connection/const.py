@@ -8,10 +8,123 @@ API_COMMON_GET_DEVICE_INFO = "get_device_info/"
 #Client connection timeout in seconds
 API_CLIENT_CONNECTION_TIMEOUT = 5
 
+#Session pool limits. Total open connections and connections per single device.
+API_SESSION_POOL_LIMIT = 100
+API_SESSION_POOL_LIMIT_PER_HOST = 4
+#Idle keep-alive connection lifetime in seconds
+API_SESSION_KEEPALIVE_TIMEOUT = 15
+#Number of dropped keep-alive connections after which host uses close-per-request
+API_SESSION_KEEPALIVE_FAILURE_THRESHOLD = 2
+
+#Response cache values
+API_CACHE_DEFAULT_MAX_SIZE = 4096
+#Cached response lifetime in seconds, key: api method. Not listed methods are not cached.
+API_CACHE_TTL = {
+    API_COMMON_GET_STATE: 5,
+    API_COMMON_GET_DEVICE_INFO: 3600,
+    "get_brightness/": 5,
+    "get_color_hsv/": 5,
+    "get_current_energy/": 2,
+    "get_total_energy/": 30,
+    "get_open_level/": 2,
+    "get_open_louvers_level/": 2
+}
+#Cached api methods invalidated after write, key: write api method
+API_CACHE_INVALIDATION = {
+    API_COMMON_SET_STATE: (API_COMMON_GET_STATE, "get_brightness/", "get_color_hsv/",
+        "get_current_energy/"),
+    "set_brightness/": (API_COMMON_GET_STATE, "get_brightness/"),
+    "set_color_hsv/": (API_COMMON_GET_STATE, "get_color_hsv/"),
+    "set_open_level/": ("get_open_level/",),
+    "set_open_louvers_level/": ("get_open_louvers_level/",)
+}
+
+#Circuit breaker states
+API_CIRCUIT_CLOSED = "closed"
+API_CIRCUIT_OPEN = "open"
+API_CIRCUIT_HALF_OPEN = "half_open"
+#Consecutive connection errors which open circuit
+API_CIRCUIT_FAILURE_THRESHOLD = 3
+#Open circuit window in seconds, doubled after every failed trial request up to max
+API_CIRCUIT_OPEN_WINDOW = 5
+API_CIRCUIT_MAX_OPEN_WINDOW = 300
+#Random part of open window, e.g. 0.2 means +-20%
+API_CIRCUIT_JITTER = 0.2
+
+#Retry policy values
+#Idempotent reads retried after connection error or timeout
+API_RETRY_METHODS = (API_COMMON_GET_STATE, "get_brightness/", "get_color_hsv/",
+    "get_current_energy/", "get_open_level/")
+#Max attempts of single request, including first one
+API_RETRY_MAX_ATTEMPTS = 3
+#Backoff before first retry in seconds, doubled for every next retry up to max
+API_RETRY_BACKOFF = 0.1
+API_RETRY_MAX_BACKOFF = 1
+#Random part of backoff, e.g. 0.5 means +-50%
+API_RETRY_JITTER = 0.5
+#Retry budget: every request adds ratio of token, every retry or hedge takes one.
+#Budget is full at start and never exceeds max tokens.
+API_RETRY_BUDGET_RATIO = 0.1
+API_RETRY_BUDGET_MAX_TOKENS = 10
+#Hedged requests: second request is sent when first one did not answer within
+#observed latency percentile. Latency is measured per host over recent responses.
+API_HEDGE_PERCENTILE = 0.95
+API_HEDGE_LATENCY_SAMPLES = 100
+API_HEDGE_MIN_SAMPLES = 20
+#Min hedge delay in seconds
+API_HEDGE_MIN_DELAY = 0.05
+
+#Request scheduler values
+#Requests sent to single device at the same time
+API_SCHEDULER_DEFAULT_MAX_IN_FLIGHT = 1
+#Request priorities, lower value is sent first
+API_SCHEDULER_PRIORITY_WRITE = 0
+API_SCHEDULER_PRIORITY_READ = 1
+#Read waiting in queue longer than given seconds is dropped
+API_SCHEDULER_MAX_READ_WAIT = 5
+
+#Process-wide request budget values, budget is opt-in and does not limit by default
+#Token bucket: requests per second and max burst, None rate means no limit
+API_BUDGET_RATE = None
+API_BUDGET_BURST = 50
+#Max requests in progress in whole process, None means no limit
+API_BUDGET_MAX_CONCURRENCY = None
+#Adaptive (AIMD) mode: concurrency is lowered when share of connection errors
+#and timeouts in window reaches ratio, raised by 1/limit on every success
+#while recent latency is not above long term latency multiplied by ratio.
+API_BUDGET_MIN_CONCURRENCY = 4
+API_BUDGET_AIMD_DECREASE = 0.5
+API_BUDGET_AIMD_WINDOW = 1
+API_BUDGET_AIMD_ERROR_RATIO = 0.2
+API_BUDGET_AIMD_MIN_ERRORS = 3
+API_BUDGET_AIMD_LATENCY_RATIO = 1.5
+#Smoothing of recent and long term latency averages
+API_BUDGET_LATENCY_SHORT_SMOOTHING = 0.3
+API_BUDGET_LATENCY_LONG_SMOOTHING = 0.02
+
+#Request metrics values
+#Upper bounds of latency histogram buckets in seconds, last bucket is +Inf
+API_METRICS_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+#Request tracing values
+#Span names: request sent to device, parsing of response content
+API_TRACE_SPAN_REQUEST = "request"
+API_TRACE_SPAN_PARSE = "parse"
+#Span phases, durations in seconds
+API_TRACE_PHASE_QUEUE = "queue"
+API_TRACE_PHASE_BUDGET = "budget"
+API_TRACE_PHASE_CONNECT = "connect"
+API_TRACE_PHASE_TTFB = "ttfb"
+API_TRACE_PHASE_BODY_READ = "body_read"
+API_TRACE_PHASE_JSON_DECODE = "json_decode"
+API_TRACE_PHASE_OBJECT_BUILD = "object_build"
+
 #Common RestApi status values
 API_RESPONSE_STATUS_OK = "ok"
 API_RESPONSE_STATUS_FAIL = "false"
 API_RESPONSE_STATUS_INVALID = "invalid_action_name"
+#Queued read was dropped before it was sent, device state is unknown
+API_RESPONSE_STATUS_DROPPED = "dropped"
 
 #Request base params keys
 REQUEST_CHANNEL_KEY = "channel"
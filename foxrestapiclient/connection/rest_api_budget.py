@@ -0,0 +1,200 @@
+"""Process-wide request budget for F&F Fox RestAPI clients."""
+from __future__ import annotations
+
+import asyncio
+import time
+from collections import deque
+
+from .const import (API_BUDGET_AIMD_DECREASE, API_BUDGET_AIMD_ERROR_RATIO,
+                    API_BUDGET_AIMD_LATENCY_RATIO, API_BUDGET_AIMD_MIN_ERRORS,
+                    API_BUDGET_AIMD_WINDOW, API_BUDGET_BURST,
+                    API_BUDGET_LATENCY_LONG_SMOOTHING,
+                    API_BUDGET_LATENCY_SHORT_SMOOTHING,
+                    API_BUDGET_MAX_CONCURRENCY, API_BUDGET_MIN_CONCURRENCY,
+                    API_BUDGET_RATE)
+
+
+class RestApiRequestBudget:
+    """Limits request rate and requests in progress of all clients together.
+
+    Protects shared network, e.g. WiFi access point, which is often the
+    bottleneck of big fleets. Requests take tokens from token bucket and
+    concurrency slots. In adaptive mode concurrency limit follows network
+    capacity (AIMD): it is halved when connection errors and timeouts spike
+    and grows slowly back while latency stays normal.
+
+    Budget does not limit anything by default, limits are enabled with
+    set_rate() and set_max_concurrency().
+    """
+
+    __default_budget: RestApiRequestBudget = None
+
+    def __init__(self, rate: float = API_BUDGET_RATE, burst: int = API_BUDGET_BURST,
+                max_concurrency: int = API_BUDGET_MAX_CONCURRENCY, adaptive: bool = False,
+                min_concurrency: int = API_BUDGET_MIN_CONCURRENCY) -> None:
+        """Construct budget.
+
+        Keyword arguments:
+        rate -- requests per second, None means no rate limit
+        burst -- max requests sent at once after idle period
+        max_concurrency -- max requests in progress, None means no limit
+        adaptive -- adjust concurrency limit between min_concurrency and
+            max_concurrency by observed errors and latency
+        min_concurrency -- lowest concurrency limit in adaptive mode
+        """
+        self.rate = rate
+        self.burst = burst
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = min_concurrency
+        self.adaptive = adaptive and max_concurrency is not None
+        self.__limit = float(max_concurrency) if max_concurrency is not None else None
+        self.__tokens = float(burst)
+        self.__tokens_time = time.monotonic()
+        self.__in_flight = 0
+        self.__waiters = deque()
+        self.__loop = None
+        self.__short_latency: float = None
+        self.__long_latency: float = None
+        self.__window_start = time.monotonic()
+        self.__window_requests = 0
+        self.__window_errors = 0
+        self.decreases_count = 0
+
+    @classmethod
+    def get_default(cls) -> RestApiRequestBudget:
+        """Return process-wide budget, create it if needed."""
+        if cls.__default_budget is None:
+            cls.__default_budget = cls()
+        return cls.__default_budget
+
+    def set_rate(self, rate: float = None, burst: int = API_BUDGET_BURST):
+        """Change requests per second and max burst, None rate means no limit."""
+        self.rate = rate
+        self.burst = burst
+        self.__tokens = float(burst)
+        self.__tokens_time = time.monotonic()
+
+    def set_adaptive(self, adaptive: bool):
+        """Enable or disable adaptive concurrency limit, it needs max concurrency set."""
+        self.adaptive = adaptive and self.max_concurrency is not None
+        if not self.adaptive and self.max_concurrency is not None:
+            self.__limit = float(self.max_concurrency)
+            self.__wake_waiters()
+
+    def set_max_concurrency(self, max_concurrency: int = None):
+        """Change max requests in progress, None means no limit."""
+        self.max_concurrency = max_concurrency
+        self.__limit = float(max_concurrency) if max_concurrency is not None else None
+        self.adaptive = self.adaptive and max_concurrency is not None
+        self.__wake_waiters()
+
+    def get_concurrency_limit(self) -> int:
+        """Return current concurrency limit or None if not limited."""
+        if self.__limit is None:
+            return None
+        return int(self.__limit)
+
+    def get_in_flight(self) -> int:
+        """Return number of requests in progress."""
+        return self.__in_flight
+
+    def get_queue_depth(self) -> int:
+        """Return number of requests waiting for concurrency slot."""
+        return sum(1 for waiter in self.__waiters if not waiter.done())
+
+    async def async_acquire(self):
+        """Wait for concurrency slot and token. Call release() when request is done."""
+        loop = asyncio.get_running_loop()
+        if self.__loop is not loop:
+            #Futures of other event loop cannot be used.
+            self.__loop = loop
+            self.__waiters = deque()
+            self.__in_flight = 0
+        if self.__waiters or not self.__has_free_slot():
+            waiter = loop.create_future()
+            self.__waiters.append(waiter)
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                if waiter.done() and not waiter.cancelled():
+                    self.release()
+                raise
+        else:
+            self.__in_flight += 1
+        delay = self.__reserve_token()
+        if delay > 0:
+            try:
+                await asyncio.sleep(delay)
+            except asyncio.CancelledError:
+                self.release()
+                raise
+
+    def release(self):
+        """Release slot of finished request."""
+        self.__in_flight = max(self.__in_flight - 1, 0)
+        self.__wake_waiters()
+
+    def record_success(self, latency: float):
+        """Record successful request with its latency in seconds."""
+        if self.__short_latency is None:
+            self.__short_latency = self.__long_latency = latency
+        else:
+            self.__short_latency += (
+                API_BUDGET_LATENCY_SHORT_SMOOTHING * (latency - self.__short_latency))
+            self.__long_latency += (
+                API_BUDGET_LATENCY_LONG_SMOOTHING * (latency - self.__long_latency))
+        self.__record(False)
+        if (self.adaptive and self.__limit < self.max_concurrency
+                and self.__short_latency <= self.__long_latency * API_BUDGET_AIMD_LATENCY_RATIO):
+            self.__limit = min(self.__limit + 1 / self.__limit, self.max_concurrency)
+            self.__wake_waiters()
+
+    def record_failure(self):
+        """Record connection error or timeout."""
+        self.__record(True)
+
+    def __record(self, error: bool):
+        """Count request in current window and lower limit if errors spiked."""
+        now = time.monotonic()
+        if now - self.__window_start >= API_BUDGET_AIMD_WINDOW:
+            self.__window_start = now
+            self.__window_requests = 0
+            self.__window_errors = 0
+        self.__window_requests += 1
+        if not error:
+            return
+        self.__window_errors += 1
+        if (not self.adaptive or self.__window_errors < API_BUDGET_AIMD_MIN_ERRORS
+                or self.__window_errors < self.__window_requests * API_BUDGET_AIMD_ERROR_RATIO):
+            return
+        self.__limit = max(self.__limit * API_BUDGET_AIMD_DECREASE, self.min_concurrency)
+        self.decreases_count += 1
+        #Next decrease needs new errors
+        self.__window_start = now
+        self.__window_requests = 0
+        self.__window_errors = 0
+
+    def __has_free_slot(self) -> bool:
+        """Return true if request can be sent now."""
+        return self.__limit is None or self.__in_flight < int(self.__limit)
+
+    def __wake_waiters(self):
+        """Grant free slots to waiting requests in order."""
+        while self.__waiters and self.__has_free_slot():
+            waiter = self.__waiters.popleft()
+            if waiter.done():
+                continue
+            self.__in_flight += 1
+            waiter.set_result(None)
+
+    def __reserve_token(self) -> float:
+        """Take token and return seconds to wait until it is available."""
+        if self.rate is None:
+            return 0
+        now = time.monotonic()
+        self.__tokens = min(self.__tokens + (now - self.__tokens_time) * self.rate, self.burst)
+        self.__tokens_time = now
+        self.__tokens -= 1
+        if self.__tokens >= 0:
+            return 0
+        return -self.__tokens / self.rate
@@ -0,0 +1,131 @@
+"""Response cache for F&F Fox RestAPI client."""
+from __future__ import annotations
+
+import time
+from collections import OrderedDict
+
+from .const import API_CACHE_DEFAULT_MAX_SIZE, API_CACHE_INVALIDATION, API_CACHE_TTL
+
+
+class RestApiResponseCache:
+    """Bounded LRU cache of raw device responses.
+
+    Entries are keyed by (host, method, params) and expire after lifetime defined
+    per api method in API_CACHE_TTL. Only methods listed there are cached.
+    """
+
+    __default_cache: RestApiResponseCache = None
+
+    def __init__(self, max_size: int = API_CACHE_DEFAULT_MAX_SIZE, ttl: dict = None):
+        """Construct cache.
+
+        Keyword arguments:
+        max_size -- max number of cached responses, least recently used are evicted
+        ttl -- optional, responses lifetime in seconds by api method. API_CACHE_TTL
+            is used if not provided.
+        """
+        self._max_size = max_size
+        self._ttl = ttl if ttl is not None else API_CACHE_TTL
+        #Values: (store time, response content)
+        self.__entries = OrderedDict()
+        #Cached keys, key: host
+        self.__host_keys = {}
+        #Invalidation counter, key: host
+        self.__generations = {}
+
+    @classmethod
+    def get_default(cls) -> RestApiResponseCache:
+        """Return process-wide cache, create it if needed."""
+        if cls.__default_cache is None:
+            cls.__default_cache = cls()
+        return cls.__default_cache
+
+    def __len__(self) -> int:
+        """Return number of cached responses."""
+        return len(self.__entries)
+
+    @staticmethod
+    def make_key(host: str, method: str, params: dict = None) -> tuple:
+        """Create cache key from request data."""
+        if not params:
+            return (host, method, ())
+        return (host, method, tuple(sorted((str(k), str(v)) for k, v in params.items())))
+
+    def is_cacheable(self, method: str) -> bool:
+        """Return true if responses of given api method can be cached."""
+        return method in self._ttl
+
+    def get_generation(self, host: str) -> int:
+        """Return host invalidation counter. Used to reject responses older than write."""
+        return self.__generations.get(host, 0)
+
+    def get(self, key: tuple, max_age: float = None):
+        """Return cached response content or None.
+
+        Keyword arguments:
+        key -- key created by make_key()
+        max_age -- optional, max accepted response age in seconds
+        """
+        entry = self.__entries.get(key)
+        if entry is None:
+            return None
+        age = time.monotonic() - entry[0]
+        if age > self._ttl.get(key[1], 0):
+            self.__remove(key)
+            return None
+        if max_age is not None and age > max_age:
+            return None
+        self.__entries.move_to_end(key)
+        return entry[1]
+
+    def put(self, key: tuple, content, generation: int = None):
+        """Store response content.
+
+        Keyword arguments:
+        key -- key created by make_key()
+        content -- raw response content
+        generation -- optional, host invalidation counter read before request was sent.
+            Response is dropped if host was invalidated in the meantime.
+        """
+        if not self.is_cacheable(key[1]):
+            return
+        if generation is not None and generation != self.get_generation(key[0]):
+            return
+        self.__entries[key] = (time.monotonic(), content)
+        self.__entries.move_to_end(key)
+        self.__host_keys.setdefault(key[0], set()).add(key)
+        while len(self.__entries) > self._max_size:
+            self.__remove(next(iter(self.__entries)))
+
+    def invalidate(self, host: str, methods = None):
+        """Remove cached responses of host.
+
+        Keyword arguments:
+        host -- device host
+        methods -- optional, api methods to invalidate. All host responses are
+            removed if not provided.
+        """
+        self.__generations[host] = self.get_generation(host) + 1
+        for key in list(self.__host_keys.get(host, ())):
+            if methods is None or key[1] in methods:
+                self.__remove(key)
+
+    def invalidate_after_write(self, host: str, method: str):
+        """Remove responses outdated by write made with given api method."""
+        methods = API_CACHE_INVALIDATION.get(method)
+        if methods is not None:
+            self.invalidate(host, methods)
+
+    def clear(self):
+        """Remove all cached responses."""
+        self.__entries.clear()
+        self.__host_keys.clear()
+
+    def __remove(self, key: tuple):
+        """Remove single entry."""
+        self.__entries.pop(key, None)
+        host_keys = self.__host_keys.get(key[0])
+        if host_keys is not None:
+            host_keys.discard(key)
+            if not host_keys:
+                del self.__host_keys[key[0]]
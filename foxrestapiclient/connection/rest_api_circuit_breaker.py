@@ -0,0 +1,163 @@
+"""Per host circuit breaker for F&F Fox RestAPI client."""
+from __future__ import annotations
+
+import random
+import time
+
+import aiohttp
+
+from foxrestapiclient.connection import _LOGGER
+
+from .const import (API_CIRCUIT_CLOSED, API_CIRCUIT_FAILURE_THRESHOLD,
+                    API_CIRCUIT_HALF_OPEN, API_CIRCUIT_JITTER,
+                    API_CIRCUIT_MAX_OPEN_WINDOW, API_CIRCUIT_OPEN,
+                    API_CIRCUIT_OPEN_WINDOW)
+
+
+class CircuitOpenError(aiohttp.ClientConnectionError):
+    """Request rejected without network call, device circuit is open."""
+
+    def __init__(self, host: str, retry_after: float) -> None:
+        """Construct error.
+
+        Keyword arguments:
+        host -- device host
+        retry_after -- seconds until trial request is allowed
+        """
+        super().__init__("Circuit of {0} is open, retry after {1:.1f} s".format(
+            host, retry_after))
+        self.host = host
+        self.retry_after = retry_after
+
+
+class CircuitState:
+    """Circuit state of single host."""
+
+    __slots__ = ("state", "failures", "open_until", "open_window", "trial_in_progress")
+
+    def __init__(self) -> None:
+        """Construct closed circuit."""
+        self.state = API_CIRCUIT_CLOSED
+        #Consecutive connection errors
+        self.failures = 0
+        self.open_until = 0.0
+        self.open_window = 0.0
+        self.trial_in_progress = False
+
+
+class RestApiCircuitBreaker:
+    """Stops sending requests to unreachable hosts.
+
+    Circuit of host opens after failure_threshold consecutive connection errors,
+    then requests fail immediately with CircuitOpenError. After open window with
+    jitter single trial request is let through (half open): success closes
+    circuit, failure opens it again with doubled window.
+    """
+
+    __default_breaker: RestApiCircuitBreaker = None
+
+    def __init__(self, failure_threshold: int = API_CIRCUIT_FAILURE_THRESHOLD,
+                open_window: float = API_CIRCUIT_OPEN_WINDOW,
+                max_open_window: float = API_CIRCUIT_MAX_OPEN_WINDOW,
+                jitter: float = API_CIRCUIT_JITTER) -> None:
+        """Construct circuit breaker.
+
+        Keyword arguments:
+        failure_threshold -- consecutive connection errors which open circuit
+        open_window -- first open window in seconds
+        max_open_window -- max open window in seconds
+        jitter -- random part of open window
+        """
+        self.failure_threshold = failure_threshold
+        self.open_window = open_window
+        self.max_open_window = max_open_window
+        self.jitter = jitter
+        #Circuit states, key: host
+        self.__circuits = {}
+        self.__state_change_hooks = []
+
+    @classmethod
+    def get_default(cls) -> RestApiCircuitBreaker:
+        """Return process-wide circuit breaker."""
+        if cls.__default_breaker is None:
+            cls.__default_breaker = cls()
+        return cls.__default_breaker
+
+    def add_state_change_hook(self, hook):
+        """Register hook called with (host, old state, new state) on circuit state change."""
+        self.__state_change_hooks.append(hook)
+
+    def remove_state_change_hook(self, hook):
+        """Unregister state change hook."""
+        if hook in self.__state_change_hooks:
+            self.__state_change_hooks.remove(hook)
+
+    def get_state(self, host: str) -> str:
+        """Return circuit state of host."""
+        circuit = self.__circuits.get(host)
+        if circuit is None:
+            return API_CIRCUIT_CLOSED
+        if circuit.state == API_CIRCUIT_OPEN and time.monotonic() >= circuit.open_until:
+            return API_CIRCUIT_HALF_OPEN
+        return circuit.state
+
+    def before_request(self, host: str):
+        """Check request can be sent. Raise CircuitOpenError if circuit is open."""
+        circuit = self.__circuits.get(host)
+        if circuit is None or circuit.state == API_CIRCUIT_CLOSED:
+            return
+        now = time.monotonic()
+        if circuit.state == API_CIRCUIT_OPEN and now >= circuit.open_until:
+            self.__set_state(host, circuit, API_CIRCUIT_HALF_OPEN)
+        if circuit.state == API_CIRCUIT_HALF_OPEN and not circuit.trial_in_progress:
+            circuit.trial_in_progress = True
+            return
+        raise CircuitOpenError(host, max(circuit.open_until - now, 0))
+
+    def record_success(self, host: str):
+        """Record successful request. Circuit is closed."""
+        circuit = self.__circuits.pop(host, None)
+        if circuit is not None and circuit.state != API_CIRCUIT_CLOSED:
+            self.__set_state(host, circuit, API_CIRCUIT_CLOSED)
+
+    def record_failure(self, host: str):
+        """Record connection error. Circuit opens after threshold is reached."""
+        circuit = self.__circuits.get(host)
+        if circuit is None:
+            circuit = self.__circuits[host] = CircuitState()
+        circuit.failures += 1
+        if circuit.state == API_CIRCUIT_HALF_OPEN:
+            circuit.trial_in_progress = False
+            self.__open(host, circuit, min(circuit.open_window * 2, self.max_open_window))
+        elif circuit.state == API_CIRCUIT_CLOSED and circuit.failures >= self.failure_threshold:
+            self.__open(host, circuit, self.open_window)
+
+    def release_trial(self, host: str):
+        """Allow next trial request after request which did not end with result."""
+        circuit = self.__circuits.get(host)
+        if circuit is not None:
+            circuit.trial_in_progress = False
+
+    def reset(self, host: str = None):
+        """Close circuit of given host or all circuits."""
+        hosts = [host] if host is not None else list(self.__circuits)
+        for circuit_host in hosts:
+            self.record_success(circuit_host)
+
+    def __open(self, host: str, circuit: CircuitState, window: float):
+        """Open circuit for window with jitter."""
+        circuit.open_window = window
+        circuit.open_until = time.monotonic() + window * random.uniform(
+            1 - self.jitter, 1 + self.jitter)
+        self.__set_state(host, circuit, API_CIRCUIT_OPEN)
+
+    def __set_state(self, host: str, circuit: CircuitState, state: str):
+        """Change circuit state and call hooks."""
+        old_state = circuit.state
+        circuit.state = state
+        _LOGGER.info("Circuit of %s changed from %s to %s.", host, old_state, state)
+        for hook in list(self.__state_change_hooks):
+            try:
+                hook(host, old_state, state)
+            except Exception as exception:
+                _LOGGER.error("Circuit state change hook failed: %s", exception)
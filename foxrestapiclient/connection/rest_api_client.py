@@ -1,5 +1,8 @@
 """F&F Fox devices RestAPI client. See www.fif.com.pl/fox."""
-import json
+from __future__ import annotations
+
+import asyncio
+import time
 
 import aiohttp
 import requests
@@ -10,11 +13,23 @@ from foxrestapiclient.connection import _LOGGER
 from .const import (API_CLIENT_CONNECTION_TIMEOUT, API_COMMON_DEVICE_OFF,
                     API_COMMON_DEVICE_ON, API_COMMON_GET_DEVICE_INFO,
                     API_COMMON_GET_STATE, API_COMMON_SET_STATE,
-                    API_RESPONSE_STATUS_FAIL, REQUEST_CHANNEL_KEY,
+                    API_RESPONSE_STATUS_DROPPED, API_RESPONSE_STATUS_FAIL,
+                    API_SCHEDULER_PRIORITY_READ, API_SCHEDULER_PRIORITY_WRITE,
+                    API_TRACE_PHASE_BUDGET, API_TRACE_PHASE_QUEUE,
+                    API_TRACE_SPAN_REQUEST, REQUEST_CHANNEL_KEY,
                     REQUEST_STATE_KEY)
+from .rest_api_budget import RestApiRequestBudget
+from .rest_api_cache import RestApiResponseCache
+from .rest_api_circuit_breaker import CircuitOpenError, RestApiCircuitBreaker
+from .rest_api_metrics import RestApiMetrics
 from .rest_api_responses import (RestApiBaseResponse,
                                  RestApiDeviceInfoResponse,
-                                 RestApiDeviceStateResponse, RestApiError)
+                                 RestApiDeviceStateResponse, RestApiError,
+                                 parse_response)
+from .rest_api_retry import RestApiRetryPolicy
+from .rest_api_scheduler import RequestDroppedError, RestApiRequestScheduler
+from .rest_api_session import RestApiSessionPool
+from .rest_api_tracing import RestApiSpan, RestApiTracer
 
 
 class RestApiClient:
@@ -22,16 +37,105 @@ class RestApiClient:
 
     Provides base communication with F&F Fox devices.
     F&F Fox device supports only HTTP GET request method.
+    Connections are taken from RestApiSessionPool, by default process-wide pool is used.
+    Client can be used as async context manager, pool is released on exit.
+    Read responses are stored in RestApiResponseCache and identical reads in
+    progress are merged into one request. Idempotent reads are retried and
+    optionally hedged according to RestApiRetryPolicy. Requests are queued in
+    RestApiRequestScheduler, by default one request is sent to device at once
+    and writes go before queued reads. Requests of all clients share
+    RestApiRequestBudget limiting request rate and concurrency in process.
+    Latency, errors and size of responses are passed to RestApiMetrics sinks.
+    Requests and response parsing are traced by RestApiTracer if enabled.
     """
 
-    def __init__(self, host: str, api_key: str):
-        """Default construcring object. Host and api_key are required to make connection."""
+    def __init__(self, host: str, api_key: str, session_pool: RestApiSessionPool = None,
+                response_cache: RestApiResponseCache = None,
+                circuit_breaker: RestApiCircuitBreaker = None,
+                retry_policy: RestApiRetryPolicy = None,
+                request_budget: RestApiRequestBudget = None,
+                metrics: RestApiMetrics = None):
+        """Default construcring object. Host and api_key are required to make connection.
+
+        Keyword arguments:
+        session_pool -- optional, pool to take connections from. Process-wide pool is
+            used if not provided.
+        response_cache -- optional, cache for read responses. Process-wide cache is
+            used if not provided.
+        circuit_breaker -- optional, circuit breaker of unreachable hosts. Process-wide
+            circuit breaker is used if not provided.
+        retry_policy -- optional, retry and hedging policy. Process-wide policy is
+            used if not provided.
+        request_budget -- optional, request budget shared with other clients.
+            Process-wide budget is used if not provided.
+        metrics -- optional, metrics receiving request statistics. Process-wide
+            metrics are used if not provided.
+        """
         self._host = host
         self._api_key = api_key
         self._base_api_url = None
         self.__response_error_hook = None
         self.__session_timeout =  aiohttp.ClientTimeout(total=None,
             sock_connect=API_CLIENT_CONNECTION_TIMEOUT, sock_read=API_CLIENT_CONNECTION_TIMEOUT)
+        self.__session_pool = (
+            session_pool if session_pool is not None else RestApiSessionPool.get_default()
+        )
+        #Loop client is counted in by session pool, None if it is not counted
+        self.__pool_loop = self.__session_pool.acquire()
+        self.__response_cache = (
+            response_cache if response_cache is not None else RestApiResponseCache.get_default()
+        )
+        self.__circuit_breaker = (
+            circuit_breaker if circuit_breaker is not None
+            else RestApiCircuitBreaker.get_default()
+        )
+        self.__retry_policy = (
+            retry_policy if retry_policy is not None else RestApiRetryPolicy.get_default()
+        )
+        self.__request_budget = (
+            request_budget if request_budget is not None else RestApiRequestBudget.get_default()
+        )
+        self.__metrics = metrics if metrics is not None else RestApiMetrics.get_default()
+        self.__tracer = RestApiTracer.get_default()
+        #Reads in progress, key: (cache key, cache generation), read started
+        #before write invalidated host is not joined by later reads
+        self.__reads_in_progress = {}
+        #time.monotonic() of last write request, None if nothing was written
+        self.last_command_time: float = None
+        self.__closed = False
+        self.__scheduler = RestApiRequestScheduler()
+
+    async def __aenter__(self) -> RestApiClient:
+        """Enter async context."""
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        """Exit async context and release connections."""
+        await self.async_close()
+
+    async def async_close(self):
+        """Release session pool. Pool closes connections when last client is released."""
+        if self.__closed:
+            return
+        self.__closed = True
+        await self.__session_pool.async_release(self.__pool_loop)
+        self.__pool_loop = None
+
+    def set_max_parallel_requests(self, max_parallel_requests: int = None):
+        """Limit number of requests sent to device at the same time.
+
+        Keyword arguments:
+        max_parallel_requests -- max number of requests in progress, None means no limit.
+        """
+        self.__scheduler.set_max_in_flight(max_parallel_requests)
+
+    def get_max_parallel_requests(self) -> int:
+        """Return max number of requests in progress or None if not limited."""
+        return self.__scheduler.max_in_flight
+
+    def get_scheduler(self) -> RestApiRequestScheduler:
+        """Return request scheduler with queue depth and wait time statistics."""
+        return self.__scheduler
 
     def register_response_error_hook(self, response_hook):
         """Register response error hook."""
@@ -41,6 +145,19 @@ class RestApiClient:
         """Unregister response error hook."""
         self.__response_error_hook = None
 
+    def get_host(self) -> str:
+        """Return device host."""
+        return self._host
+
+    def get_api_key(self) -> str:
+        """Return RestAPI key."""
+        return self._api_key
+
+    def get_circuit_state(self) -> str:
+        """Return circuit state of device: API_CIRCUIT_CLOSED, API_CIRCUIT_OPEN or
+        API_CIRCUIT_HALF_OPEN."""
+        return self.__circuit_breaker.get_state(self._host)
+
     def get_base_api_url(self) -> str:
         """Create base_api_url if needed and return it."""
         if self._base_api_url is not None:
@@ -50,12 +167,14 @@ class RestApiClient:
         self._base_api_url = url_pattern.format(self._host, self._api_key)
         return self._base_api_url
 
-    async def async_api_get_device_state(self, channel = None) -> RestApiDeviceStateResponse:
+    async def async_api_get_device_state(self, channel = None,
+                                        max_age: float = None) -> RestApiDeviceStateResponse:
         """Get F&F Fox device state.
 
         Make HTTP GET request to device and get state.
         Keyword arguments:
         channel -- optional, get state from provided channel
+        max_age -- optional, accept cached response not older than given seconds
 
         Return: RestApiDeviceStateResponse
         """
@@ -63,12 +182,15 @@ class RestApiClient:
         if channel is not None:
             params = {REQUEST_CHANNEL_KEY: channel}
         _LOGGER.info("Making call in async_api_get_device_state().")
-        response_content = await self.async_make_api_call_get(API_COMMON_GET_STATE, params)
+        response_content = await self.async_make_api_call_get(API_COMMON_GET_STATE, params,
+            max_age)
         if response_content is None:
             return RestApiDeviceStateResponse(status=API_RESPONSE_STATUS_FAIL)
         if isinstance(response_content, RestApiError):
-            return RestApiDeviceStateResponse(API_RESPONSE_STATUS_FAIL, errorObj=response_content)
-        return RestApiDeviceStateResponse(**json.loads(response_content))
+            return RestApiDeviceStateResponse(status=API_RESPONSE_STATUS_DROPPED,
+                error_obj=response_content)
+        return parse_response(RestApiDeviceStateResponse, response_content,
+            API_COMMON_GET_STATE, self._host)
 
     async def async_api_set_device_state(self, state, channel = None) -> RestApiBaseResponse:
         """Set F&F Fox device state.
@@ -90,30 +212,45 @@ class RestApiClient:
         if response_content is None:
             return RestApiBaseResponse(API_RESPONSE_STATUS_FAIL)
         if isinstance(response_content, RestApiError):
-            return RestApiBaseResponse(API_RESPONSE_STATUS_FAIL, errorObj=response_content)
-        return RestApiBaseResponse(**json.loads(response_content))
+            return RestApiBaseResponse(API_RESPONSE_STATUS_DROPPED, error_obj=response_content)
+        return parse_response(RestApiBaseResponse, response_content, API_COMMON_SET_STATE,
+            self._host)
 
-    async def async_api_get_device_info(self) -> RestApiDeviceInfoResponse:
+    async def async_api_get_device_info(self, max_age: float = None) -> RestApiDeviceInfoResponse:
         """Get F&F Fox device info.
 
         Get device information such as firmware version, name etc.
         See RestApiDeviceInfoResponse to check what data is returnig from device.
+
+        Keyword arguments:
+        max_age -- optional, accept cached response not older than given seconds
         """
         _LOGGER.info("Making call in async_api_get_device_info().")
-        response_content = await self.async_make_api_call_get(API_COMMON_GET_DEVICE_INFO)
+        response_content = await self.async_make_api_call_get(API_COMMON_GET_DEVICE_INFO,
+            max_age=max_age)
         if response_content is None:
             return RestApiDeviceInfoResponse(status=API_RESPONSE_STATUS_FAIL)
         if isinstance(response_content, RestApiError):
-            return RestApiDeviceInfoResponse(status=API_RESPONSE_STATUS_FAIL,
-                errorObj=response_content)
-        return RestApiDeviceInfoResponse(**json.loads(response_content))
+            return RestApiDeviceInfoResponse(status=API_RESPONSE_STATUS_DROPPED,
+                error_obj=response_content)
+        return parse_response(RestApiDeviceInfoResponse, response_content,
+            API_COMMON_GET_DEVICE_INFO, self._host)
 
-    async def async_make_api_call_get(self, method: str, query_params = None):
+    async def async_make_api_call_get(self, method: str, query_params = None,
+                                    max_age: float = None):
         """Make HTTP GET request by given parameters.
 
+        Reads listed in API_CACHE_TTL are cached and identical reads in progress
+        share one request. Writes invalidate related cached reads.
+
         Keyword arguments:
         method -- method name to make request
         query_params - optional request parameters
+        max_age -- optional, accept cached response not older than given seconds.
+            Device is always asked if not provided.
+
+        Return: response content, None if request failed. RestApiError if read
+        was dropped by scheduler before it was sent, device state is unknown then.
         """
         if not isinstance(method, str):
             _LOGGER.warning("Wrong argument passed to method. Http method accept only string values.")
@@ -121,20 +258,191 @@ class RestApiClient:
         if query_params is not None and not isinstance(query_params, dict):
             _LOGGER.warning("Wrong argument passed to method. Query params must be dict.")
             return
+        if not self.__response_cache.is_cacheable(method):
+            self.last_command_time = time.monotonic()
+            response = await self.__async_request(method, query_params,
+                API_SCHEDULER_PRIORITY_WRITE)
+            self.__response_cache.invalidate_after_write(self._host, method)
+            return response
+        key = RestApiResponseCache.make_key(self._host, method, query_params)
+        if max_age is not None:
+            response = self.__response_cache.get(key, max_age)
+            if response is not None:
+                return response
+        generation = self.__response_cache.get_generation(self._host)
+        flight_key = (key, generation)
+        read = self.__reads_in_progress.get(flight_key)
+        if read is None:
+            read = asyncio.ensure_future(self.__async_cached_read(key, generation, method,
+                query_params))
+            self.__reads_in_progress[flight_key] = read
+            read.add_done_callback(lambda _: self.__reads_in_progress.pop(flight_key, None))
+        return await asyncio.shield(read)
+
+    async def __async_cached_read(self, key: tuple, generation: int, method: str,
+                                query_params: dict = None):
+        """Send read request and store response in cache if host was not invalidated."""
+        response = await self.__async_request(method, query_params)
+        if response is not None and not isinstance(response, RestApiError):
+            self.__response_cache.put(key, response, generation)
+        return response
+
+    async def __async_request(self, method: str, query_params: dict = None,
+                            priority: int = API_SCHEDULER_PRIORITY_READ):
+        """Send request to device and return response content or None if failed.
+
+        Methods allowed by retry policy are retried after connection errors and
+        hedged if enabled. Response error hook is called once with final result
+        and circuit breaker counts one failure after all attempts failed.
+        Request is not sent if device circuit is open, CircuitOpenError is passed
+        to response error hook then. Queued reads dropped by scheduler pass
+        RequestDroppedError to hook and return RestApiError, they were not sent
+        so they say nothing about device availability.
+        """
+        retryable = self.__retry_policy.is_retryable(method)
+        if retryable:
+            self.__retry_policy.record_request()
+        attempt = 1
+        while True:
+            try:
+                if retryable:
+                    response = await self.__async_hedged_attempt(method, query_params, priority)
+                else:
+                    response = await self.__async_attempt(method, query_params, priority)
+                self.__invoke_response_error_hook(None) #Raise reponse_error_hook with None errors.
+                return response
+            except CircuitOpenError as circuit_error:
+                _LOGGER.debug(circuit_error)
+                error = circuit_error
+                self.__record_not_sent(method, error)
+            except RequestDroppedError as dropped_error:
+                _LOGGER.debug(dropped_error)
+                self.__record_not_sent(method, dropped_error)
+                self.__invoke_response_error_hook(dropped_error)
+                return RestApiError(dropped_error)
+            except aiohttp.ClientConnectionError as cli_error:
+                _LOGGER.error(cli_error)
+                error = cli_error
+                if (retryable and attempt < self.__retry_policy.max_attempts
+                        and self.__retry_policy.try_retry()):
+                    await asyncio.sleep(self.__retry_policy.get_backoff(attempt))
+                    attempt += 1
+                    continue
+                #Single failure of request, however many attempts were made
+                self.__circuit_breaker.record_failure(self._host)
+            except requests.exceptions.RequestException as req_error:
+                _LOGGER.error(req_error)
+                error = req_error
+                self.__record_not_sent(method, error)
+            self.__invoke_response_error_hook(error)
+            return None
+
+    async def __async_hedged_attempt(self, method: str, query_params: dict = None,
+                                    priority: int = API_SCHEDULER_PRIORITY_READ):
+        """Send request, send second one if first did not answer within hedge delay.
+
+        Hedged request waits for scheduler like any other request. Requests to
+        device which accepts single request at a time are not hedged, hedged
+        request would only wait behind the slow one.
+
+        Return: content of first successful response. Error of last failed
+        request is raised if all failed.
+        """
+        delay = self.__retry_policy.get_hedge_delay(self._host)
+        if delay is None or self.__scheduler.max_in_flight == 1:
+            return await self.__async_attempt(method, query_params, priority)
+        tasks = [asyncio.ensure_future(self.__async_attempt(method, query_params, priority))]
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if not done and self.__retry_policy.try_hedge():
+                _LOGGER.debug("Sending hedged request %s to %s.", method, self._host)
+                tasks.append(asyncio.ensure_future(
+                    self.__async_attempt(method, query_params, priority)))
+            pending = set(tasks)
+            failed = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    failed = task
+            return failed.result()
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    async def __async_attempt(self, method: str, query_params: dict = None,
+                            priority: int = API_SCHEDULER_PRIORITY_READ):
+        """Send single request when scheduler allows it."""
+        span = self.__tracer.start_span(API_TRACE_SPAN_REQUEST, self._host, method)
         try:
-            async with aiohttp.ClientSession(timeout = self.__session_timeout) as session:
-                async with session.get(urljoin(self.get_base_api_url(), method), params=query_params) as resp:
-                    response = await resp.read()
-                    _LOGGER.info("Received RAW response %s", response)
-                    self.__invoke_response_error_hook(None) #Raise reponse_error_hook with None errors.
-                    return response
-        except aiohttp.ClientConnectionError as cli_error:
-            _LOGGER.error(cli_error)
-            self.__invoke_response_error_hook(cli_error)
-        except requests.exceptions.RequestException as req_error:
-            _LOGGER.error(req_error)
-            self.__invoke_response_error_hook(req_error)
-        return None
+            if span is not None:
+                span.start_phase(API_TRACE_PHASE_QUEUE)
+            await self.__scheduler.async_acquire(priority)
+            if span is not None:
+                span.end_phase(API_TRACE_PHASE_QUEUE)
+            try:
+                response = await self.__async_send(method, query_params, span)
+            finally:
+                self.__scheduler.release()
+        except BaseException as error:
+            self.__tracer.finish_span(span, error)
+            raise
+        self.__tracer.finish_span(span)
+        return response
+
+    async def __async_send(self, method: str, query_params: dict = None,
+                        span: RestApiSpan = None):
+        """Send single request and return response content.
+
+        Raise CircuitOpenError without sending request if device circuit is open.
+        """
+        self.__circuit_breaker.before_request(self._host)
+        if span is not None:
+            span.start_phase(API_TRACE_PHASE_BUDGET)
+        try:
+            await self.__request_budget.async_acquire()
+        except asyncio.CancelledError:
+            self.__circuit_breaker.release_trial(self._host)
+            raise
+        if span is not None:
+            span.end_phase(API_TRACE_PHASE_BUDGET)
+        if not self.__closed and self.__pool_loop is not asyncio.get_running_loop():
+            #Client created outside of loop or used in new loop
+            self.__pool_loop = self.__session_pool.acquire()
+        start = time.monotonic()
+        try:
+            response = await self.__session_pool.async_get(self._host,
+                urljoin(self.get_base_api_url(), method), query_params, self.__session_timeout,
+                span, resend=self.__retry_policy.is_safe(method))
+        except aiohttp.ClientConnectionError as error:
+            #Circuit breaker counts failed requests, not attempts, see __async_request()
+            self.__circuit_breaker.release_trial(self._host)
+            self.__request_budget.record_failure()
+            if self.__metrics.enabled:
+                self.__metrics.record_request(self._host, method, time.monotonic() - start,
+                    error)
+            raise
+        except BaseException:
+            #Request ended without result, e.g. cancelled hedged request
+            self.__circuit_breaker.release_trial(self._host)
+            raise
+        finally:
+            self.__request_budget.release()
+        latency = time.monotonic() - start
+        self.__retry_policy.record_latency(self._host, latency)
+        self.__request_budget.record_success(latency)
+        if self.__metrics.enabled:
+            self.__metrics.record_request(self._host, method, latency, None, len(response))
+        _LOGGER.info("Received RAW response %s", response)
+        self.__circuit_breaker.record_success(self._host)
+        return response
+
+    def __record_not_sent(self, method: str, error: Exception):
+        """Pass request failed without response to metrics."""
+        if self.__metrics.enabled:
+            self.__metrics.record_request(self._host, method, None, error)
 
     def __invoke_response_error_hook(self, error):
         """Invoke response error hook if registered."""
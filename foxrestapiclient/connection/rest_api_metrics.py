@@ -0,0 +1,230 @@
+"""Request metrics of F&F Fox RestAPI clients."""
+from __future__ import annotations
+
+from array import array
+from bisect import bisect_left
+
+from foxrestapiclient.connection import _LOGGER
+
+from .const import API_METRICS_LATENCY_BUCKETS
+
+
+class LatencyHistogram:
+    """Latency histogram with fixed buckets.
+
+    Observation is one binary search and one counter increment, samples are
+    not stored.
+    """
+
+    __slots__ = ("buckets", "counts", "count", "sum")
+
+    def __init__(self, buckets: tuple = API_METRICS_LATENCY_BUCKETS) -> None:
+        """Construct histogram.
+
+        Keyword arguments:
+        buckets -- sorted upper bounds of buckets in seconds, +Inf bucket is added
+        """
+        self.buckets = tuple(buckets)
+        self.counts = array("Q", bytes(8 * (len(self.buckets) + 1)))
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        """Count value in its bucket."""
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def merge(self, histogram: LatencyHistogram):
+        """Add counts of histogram with the same buckets."""
+        for index, count in enumerate(histogram.counts):
+            self.counts[index] += count
+        self.count += histogram.count
+        self.sum += histogram.sum
+
+    def get_cumulative_counts(self) -> list:
+        """Return (upper bound, count of values not greater than bound), the last bound is inf."""
+        result = []
+        total = 0
+        for bound, count in zip(self.buckets + (float("inf"),), self.counts):
+            total += count
+            result.append((bound, total))
+        return result
+
+    def get_percentile(self, percentile: float) -> float:
+        """Return upper bound of bucket holding given percentile (0-1) or None if empty.
+
+        inf is returned if percentile is above the last bucket.
+        """
+        if self.count == 0:
+            return None
+        rank = percentile * self.count
+        for bound, total in self.get_cumulative_counts():
+            if total >= rank:
+                return bound
+        return float("inf")
+
+
+class EndpointMetrics:
+    """Metrics of single api method of single host."""
+
+    __slots__ = ("requests_count", "errors", "bytes_received", "latency")
+
+    def __init__(self, buckets: tuple = API_METRICS_LATENCY_BUCKETS) -> None:
+        """Construct empty metrics."""
+        self.requests_count = 0
+        #Errors count, key: error type name
+        self.errors = {}
+        self.bytes_received = 0
+        #Latency of received responses
+        self.latency = LatencyHistogram(buckets)
+
+    def get_errors_count(self) -> int:
+        """Return number of failed requests."""
+        return sum(self.errors.values())
+
+    def merge(self, metrics: EndpointMetrics):
+        """Add values of other metrics."""
+        self.requests_count += metrics.requests_count
+        for error_type, count in metrics.errors.items():
+            self.errors[error_type] = self.errors.get(error_type, 0) + count
+        self.bytes_received += metrics.bytes_received
+        self.latency.merge(metrics.latency)
+
+
+class RestApiMetricsSink:
+    """Receiver of request metrics, override record_request()."""
+
+    def record_request(self, host: str, method: str, latency: float = None,
+                    error: Exception = None, bytes_received: int = 0):
+        """Record finished request.
+
+        Keyword arguments:
+        host -- device host
+        method -- api method, e.g. get_state/
+        latency -- seconds from sending request to reading response body,
+            None if request was not sent, e.g. circuit was open
+        error -- exception of failed request, None if succeeded
+        bytes_received -- size of response body
+        """
+
+
+class RestApiMetricsAggregator(RestApiMetricsSink):
+    """Sink keeping counters and latency histograms per host and api method.
+
+    Aggregator registered in process-wide metrics collects metrics of whole
+    fleet, use it to find slow devices and slow api methods.
+    """
+
+    def __init__(self, buckets: tuple = API_METRICS_LATENCY_BUCKETS) -> None:
+        """Construct empty aggregator."""
+        self.buckets = tuple(buckets)
+        #Metrics, key: (host, method)
+        self._endpoints = {}
+
+    def record_request(self, host: str, method: str, latency: float = None,
+                    error: Exception = None, bytes_received: int = 0):
+        """Count request in its endpoint metrics."""
+        key = (host, method)
+        metrics = self._endpoints.get(key)
+        if metrics is None:
+            metrics = self._endpoints[key] = EndpointMetrics(self.buckets)
+        metrics.requests_count += 1
+        if error is not None:
+            error_type = type(error).__name__
+            metrics.errors[error_type] = metrics.errors.get(error_type, 0) + 1
+        if latency is not None and error is None:
+            metrics.latency.observe(latency)
+        metrics.bytes_received += bytes_received
+
+    def reset(self):
+        """Remove all metrics."""
+        self._endpoints.clear()
+
+    def get_endpoint(self, host: str, method: str) -> EndpointMetrics:
+        """Return metrics of api method of host or None if no request was recorded."""
+        return self._endpoints.get((host, method))
+
+    def get_endpoints(self) -> dict:
+        """Return all metrics, key: (host, method)."""
+        return dict(self._endpoints)
+
+    def get_by_host(self) -> dict:
+        """Return metrics of all api methods merged per host, key: host."""
+        return self.__group(0)
+
+    def get_by_method(self) -> dict:
+        """Return metrics of all hosts merged per api method, key: method."""
+        return self.__group(1)
+
+    def get_total(self) -> EndpointMetrics:
+        """Return metrics of all requests."""
+        total = EndpointMetrics(self.buckets)
+        for metrics in self._endpoints.values():
+            total.merge(metrics)
+        return total
+
+    def get_slowest_hosts(self, count: int = 10, percentile: float = 0.9) -> list:
+        """Return up to count (host, latency percentile) ordered from the slowest."""
+        latencies = [(host, metrics.latency.get_percentile(percentile))
+            for host, metrics in self.get_by_host().items()]
+        latencies = [item for item in latencies if item[1] is not None]
+        latencies.sort(key=lambda item: item[1], reverse=True)
+        return latencies[:count]
+
+    def __group(self, key_index: int) -> dict:
+        """Merge metrics by part of endpoint key."""
+        groups = {}
+        for key, metrics in self._endpoints.items():
+            group = groups.get(key[key_index])
+            if group is None:
+                group = groups[key[key_index]] = EndpointMetrics(self.buckets)
+            group.merge(metrics)
+        return groups
+
+
+class RestApiMetrics:
+    """Passes request metrics of clients to registered sinks.
+
+    Clients skip measuring when no sink is registered, so disabled metrics
+    cost one attribute check per request.
+    """
+
+    __default_metrics: RestApiMetrics = None
+
+    def __init__(self) -> None:
+        """Construct metrics without sinks."""
+        self.__sinks = []
+        self.enabled = False
+
+    @classmethod
+    def get_default(cls) -> RestApiMetrics:
+        """Return process-wide metrics, create it if needed."""
+        if cls.__default_metrics is None:
+            cls.__default_metrics = cls()
+        return cls.__default_metrics
+
+    def add_sink(self, sink: RestApiMetricsSink):
+        """Register sink, e.g. RestApiMetricsAggregator."""
+        if sink not in self.__sinks:
+            self.__sinks.append(sink)
+        self.enabled = True
+
+    def remove_sink(self, sink: RestApiMetricsSink):
+        """Unregister sink."""
+        if sink in self.__sinks:
+            self.__sinks.remove(sink)
+        self.enabled = bool(self.__sinks)
+
+    def get_sinks(self) -> list:
+        """Return registered sinks."""
+        return list(self.__sinks)
+
+    def record_request(self, host: str, method: str, latency: float = None,
+                    error: Exception = None, bytes_received: int = 0):
+        """Pass finished request to all sinks, see RestApiMetricsSink.record_request()."""
+        for sink in self.__sinks:
+            try:
+                sink.record_request(host, method, latency, error, bytes_received)
+            except Exception as exception:
+                _LOGGER.error("Metrics sink %s failed: %s", sink, exception)
@@ -1,13 +1,57 @@
-"""F&F Fox device responses implmentation."""
+"""F&F Fox device responses implmentation.
 
-from foxrestapiclient.connection import _LOGGER
+Responses are created on every device poll, so all classes use __slots__ and
+repeated metadata strings are interned.
+"""
+import json
+import sys
 
-from .const import API_RESPONSE_STATUS_FAIL
+from foxrestapiclient.connection import _LOGGER
 
+from .const import (API_RESPONSE_STATUS_FAIL, API_TRACE_PHASE_JSON_DECODE,
+                    API_TRACE_PHASE_OBJECT_BUILD, API_TRACE_SPAN_PARSE)
+from .rest_api_tracing import RestApiTracer
+
+
+def intern_value(value):
+    """Return interned string or given value if it is not string."""
+    if isinstance(value, str):
+        return sys.intern(value)
+    return value
+
+def parse_response(response_class, content, method: str = None, host: str = None):
+    """Decode JSON response content and build response object.
+
+    JSON decoding and object building are traced if RestApiTracer is enabled.
+
+    Keyword arguments:
+    response_class -- class constructed with decoded values as keyword arguments
+    content -- response content
+    method -- optional, api method of response, stored in span
+    host -- optional, device host, stored in span
+    """
+    tracer = RestApiTracer.get_default()
+    span = tracer.start_span(API_TRACE_SPAN_PARSE, host, method)
+    if span is None:
+        return response_class(**json.loads(content))
+    try:
+        span.start_phase(API_TRACE_PHASE_JSON_DECODE)
+        values = json.loads(content)
+        span.end_phase(API_TRACE_PHASE_JSON_DECODE)
+        span.start_phase(API_TRACE_PHASE_OBJECT_BUILD)
+        response = response_class(**values)
+        span.end_phase(API_TRACE_PHASE_OBJECT_BUILD)
+    except Exception as error:
+        tracer.finish_span(span, error)
+        raise
+    tracer.finish_span(span)
+    return response
 
 class RestApiError:
     """RestApi error data holder."""
 
+    __slots__ = ("error",)
+
     def __init__(self, error):
         """Construct object."""
         self.error = error
@@ -15,9 +59,11 @@ class RestApiError:
 class RestApiBaseResponse:
     """Base response from Fox any device."""
 
+    __slots__ = ("status", "error", "__has_errors", "__error_obj")
+
     def __init__(self, status: str, error: str = "", error_obj = None) -> None:
         """Construct object with status and optional error params."""
-        self.status = status
+        self.status = intern_value(status)
         self.__has_errors = False
         if error != "" or error_obj is not None:
             self.__has_errors = True
@@ -35,38 +81,46 @@ class RestApiBaseResponse:
 class RestApiDeviceStateResponse(RestApiBaseResponse):
     """F&F Fox device state response."""
 
+    __slots__ = ("state", "channel_1_state", "channel_2_state", "overcurrent")
+
     def __init__(self, channel_1_state: str = None, channel_2_state: str = None,
                 overcurrent: str = None, status: str = API_RESPONSE_STATUS_FAIL,
                 state: str = None, error_obj = None) -> None:
         """Construct object with provided parameters."""
         super().__init__(status, error_obj=error_obj)
-        self.state = state
+        self.state = intern_value(state)
 		#Some of Fox devices has two channels support
-        self.channel_1_state = channel_1_state
-        self.channel_2_state = channel_2_state
+        self.channel_1_state = intern_value(channel_1_state)
+        self.channel_2_state = intern_value(channel_2_state)
 		#Some of Fox devices has overcurrent property, we can check if device can work.
-        self.overcurrent = overcurrent
+        self.overcurrent = intern_value(overcurrent)
 
 class RestApiDeviceInfoResponse(RestApiBaseResponse):
     """F&F Fox device info response."""
 
+    __slots__ = ("device_name", "firmware", "hardware", "updater", "device_friendly_name",
+                "device_commercial_name", "device_channels_name")
+
     def __init__(self, device_name: str = "", firmware: str = "", hw: str = "",
                 updater: str = "", device_friendly_name: str = "",
                 device_commercial_name: str = "", status: str = API_RESPONSE_STATUS_FAIL,
                 device_channels_name: list = None, error_obj = None) -> None:
         """Construct object with provided parameters."""
         super().__init__(status, error_obj=error_obj)
-        self.device_name = device_name
-        self.firmware = firmware
-        self.hardware = hw
-        self.updater = updater
+        #Metadata repeated across many devices
+        self.device_name = intern_value(device_name)
+        self.firmware = intern_value(firmware)
+        self.hardware = intern_value(hw)
+        self.updater = intern_value(updater)
         self.device_friendly_name = device_friendly_name
-        self.device_commercial_name = device_commercial_name
+        self.device_commercial_name = intern_value(device_commercial_name)
         self.device_channels_name = device_channels_name
 
 class RestApiBrightnessResponse(RestApiBaseResponse):
     """F&F Fox device brightness response."""
 
+    __slots__ = ("brightness", "channel_1_value", "channel_2_value")
+
     def __init__(self, channel_1_value: str = None,  channel_2_value: str = None, value: str = None,
                  status: str = API_RESPONSE_STATUS_FAIL, error_obj = None) -> None:
         """Construct object with provided parameters."""
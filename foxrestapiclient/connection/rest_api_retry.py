@@ -0,0 +1,134 @@
+"""Retry policy and hedged requests for F&F Fox RestAPI client."""
+from __future__ import annotations
+
+import random
+from collections import deque
+
+from .const import (API_HEDGE_LATENCY_SAMPLES, API_HEDGE_MIN_DELAY,
+                    API_HEDGE_MIN_SAMPLES, API_HEDGE_PERCENTILE,
+                    API_RETRY_BACKOFF, API_RETRY_BUDGET_MAX_TOKENS,
+                    API_RETRY_BUDGET_RATIO, API_RETRY_JITTER,
+                    API_RETRY_MAX_ATTEMPTS, API_RETRY_MAX_BACKOFF,
+                    API_RETRY_METHODS)
+
+
+class RestApiRetryPolicy:
+    """Decides which requests are retried or hedged and when.
+
+    Only api methods listed in retry_methods are retried, by default idempotent
+    reads. Writes are never retried unless marked safe with mark_safe().
+    Retries and hedged requests are limited by retry budget shared by all
+    clients using policy, so device outage never multiplies traffic.
+    """
+
+    __default_policy: RestApiRetryPolicy = None
+
+    def __init__(self, max_attempts: int = API_RETRY_MAX_ATTEMPTS,
+                backoff: float = API_RETRY_BACKOFF, max_backoff: float = API_RETRY_MAX_BACKOFF,
+                jitter: float = API_RETRY_JITTER, budget_ratio: float = API_RETRY_BUDGET_RATIO,
+                budget_max_tokens: float = API_RETRY_BUDGET_MAX_TOKENS,
+                hedging: bool = False, hedge_percentile: float = API_HEDGE_PERCENTILE,
+                hedge_min_delay: float = API_HEDGE_MIN_DELAY,
+                retry_methods: tuple = API_RETRY_METHODS) -> None:
+        """Construct policy.
+
+        Keyword arguments:
+        max_attempts -- max attempts of single request, 1 disables retries
+        backoff -- backoff before first retry in seconds, doubled for next retries
+        max_backoff -- max backoff in seconds
+        jitter -- random part of backoff
+        budget_ratio -- retry tokens earned by every request
+        budget_max_tokens -- max retry tokens, budget is full at start
+        hedging -- send second read when first did not answer within observed
+            latency percentile of device
+        hedge_percentile -- latency percentile after which hedged read is sent
+        hedge_min_delay -- min delay of hedged read in seconds
+        retry_methods -- api methods which are safe to retry
+        """
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.jitter = jitter
+        self.budget_ratio = budget_ratio
+        self.budget_max_tokens = budget_max_tokens
+        self.hedging = hedging
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_delay = hedge_min_delay
+        self.__retry_methods = set(retry_methods)
+        self.__tokens = float(budget_max_tokens)
+        #Recent response latencies in seconds, key: host
+        self.__latencies = {}
+        self.retries_count = 0
+        self.hedges_count = 0
+
+    @classmethod
+    def get_default(cls) -> RestApiRetryPolicy:
+        """Return process-wide retry policy, create it if needed."""
+        if cls.__default_policy is None:
+            cls.__default_policy = cls()
+        return cls.__default_policy
+
+    def mark_safe(self, method: str):
+        """Allow retries of given api method, e.g. idempotent write."""
+        self.__retry_methods.add(method)
+
+    def is_safe(self, method: str) -> bool:
+        """Return true if given api method can be sent more than once."""
+        return method in self.__retry_methods
+
+    def is_retryable(self, method: str) -> bool:
+        """Return true if given api method can be retried or hedged."""
+        return self.max_attempts > 1 and self.is_safe(method)
+
+    def get_budget(self) -> float:
+        """Return available retry tokens."""
+        return self.__tokens
+
+    def record_request(self):
+        """Earn retry tokens for first attempt of request."""
+        self.__tokens = min(self.__tokens + self.budget_ratio, self.budget_max_tokens)
+
+    def try_retry(self) -> bool:
+        """Take retry token. Return false if budget is exhausted."""
+        if self.__tokens < 1:
+            return False
+        self.__tokens -= 1
+        self.retries_count += 1
+        return True
+
+    def try_hedge(self) -> bool:
+        """Take retry token for hedged request. Return false if budget is exhausted."""
+        if self.__tokens < 1:
+            return False
+        self.__tokens -= 1
+        self.hedges_count += 1
+        return True
+
+    def get_backoff(self, retry: int) -> float:
+        """Return backoff in seconds before given retry, first retry is 1."""
+        backoff = min(self.backoff * 2 ** (retry - 1), self.max_backoff)
+        return backoff * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    def record_latency(self, host: str, latency: float):
+        """Store latency of successful response."""
+        latencies = self.__latencies.get(host)
+        if latencies is None:
+            latencies = self.__latencies[host] = deque(maxlen=API_HEDGE_LATENCY_SAMPLES)
+        latencies.append(latency)
+
+    def get_latency_percentile(self, host: str, percentile: float) -> float:
+        """Return observed latency percentile of host or None if not enough samples."""
+        latencies = self.__latencies.get(host)
+        if latencies is None or len(latencies) < API_HEDGE_MIN_SAMPLES:
+            return None
+        ordered = sorted(latencies)
+        return ordered[int(percentile * (len(ordered) - 1))]
+
+    def get_hedge_delay(self, host: str) -> float:
+        """Return delay after which hedged read is sent or None if not hedged."""
+        if not self.hedging:
+            return None
+        latency = self.get_latency_percentile(host, self.hedge_percentile)
+        if latency is None:
+            return None
+        return max(latency, self.hedge_min_delay)
@@ -0,0 +1,123 @@
+"""Per device request scheduler for F&F Fox RestAPI client."""
+from __future__ import annotations
+
+import asyncio
+import heapq
+import itertools
+import time
+
+from .const import (API_SCHEDULER_DEFAULT_MAX_IN_FLIGHT,
+                    API_SCHEDULER_MAX_READ_WAIT, API_SCHEDULER_PRIORITY_READ)
+
+
+class RequestDroppedError(Exception):
+    """Queued read was dropped, it waited longer than max read wait."""
+
+
+class RestApiRequestScheduler:
+    """Limits requests in progress and orders queued requests by priority.
+
+    Writes (user commands) are sent before queued reads, requests with the
+    same priority are sent in order. Reads waiting longer than max_read_wait
+    are dropped with RequestDroppedError, their result would be outdated
+    for caller anyway.
+    """
+
+    def __init__(self, max_in_flight: int = API_SCHEDULER_DEFAULT_MAX_IN_FLIGHT,
+                max_read_wait: float = API_SCHEDULER_MAX_READ_WAIT) -> None:
+        """Construct scheduler.
+
+        Keyword arguments:
+        max_in_flight -- max requests in progress, None means no limit
+        max_read_wait -- max seconds read waits in queue, None means no limit
+        """
+        self.max_in_flight = max_in_flight
+        self.max_read_wait = max_read_wait
+        #Queued requests: (priority, sequence number, enqueue time, future)
+        self.__queue = []
+        self.__sequence = itertools.count()
+        self.__in_flight = 0
+        self.__loop = None
+        self.dispatched_count = 0
+        self.dropped_count = 0
+        #Queue wait time of dispatched requests in seconds
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def get_queue_depth(self) -> int:
+        """Return number of queued requests."""
+        return sum(1 for entry in self.__queue if not entry[3].done())
+
+    def get_in_flight(self) -> int:
+        """Return number of requests in progress."""
+        return self.__in_flight
+
+    def get_average_wait(self) -> float:
+        """Return average queue wait time of dispatched requests in seconds."""
+        if self.dispatched_count == 0:
+            return 0.0
+        return self.total_wait / self.dispatched_count
+
+    def set_max_in_flight(self, max_in_flight: int = None):
+        """Change max requests in progress, queued requests are dispatched if possible."""
+        self.max_in_flight = max_in_flight
+        self.__dispatch()
+
+    async def async_acquire(self, priority: int = API_SCHEDULER_PRIORITY_READ):
+        """Wait until request can be sent. Call release() when request is done.
+
+        Raise RequestDroppedError if read waited too long.
+        """
+        loop = asyncio.get_running_loop()
+        if self.__loop is not loop:
+            #Futures of other event loop cannot be used.
+            self.__loop = loop
+            self.__queue = []
+            self.__in_flight = 0
+        enqueued = time.monotonic()
+        if not self.__queue and self.__has_free_slot():
+            self.__in_flight += 1
+            self.__record_wait(0.0)
+            return
+        future = loop.create_future()
+        heapq.heappush(self.__queue, (priority, next(self.__sequence), enqueued, future))
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                #Slot was granted in the meantime, pass it to next request.
+                self.release()
+            raise
+
+    def release(self):
+        """Release slot of finished request and dispatch queued requests."""
+        self.__in_flight = max(self.__in_flight - 1, 0)
+        self.__dispatch()
+
+    def __has_free_slot(self) -> bool:
+        """Return true if next request can be sent now."""
+        return self.max_in_flight is None or self.__in_flight < self.max_in_flight
+
+    def __record_wait(self, wait: float):
+        """Update dispatched requests statistics."""
+        self.dispatched_count += 1
+        self.total_wait += wait
+        self.max_wait = max(self.max_wait, wait)
+
+    def __dispatch(self):
+        """Grant free slots to queued requests by priority, drop stale reads."""
+        now = time.monotonic()
+        while self.__queue and self.__has_free_slot():
+            priority, _, enqueued, future = heapq.heappop(self.__queue)
+            if future.done():
+                #Cancelled while waiting
+                continue
+            if (priority >= API_SCHEDULER_PRIORITY_READ and self.max_read_wait is not None
+                    and now - enqueued > self.max_read_wait):
+                self.dropped_count += 1
+                future.set_exception(RequestDroppedError(
+                    "Read waited {0:.1f} s in queue.".format(now - enqueued)))
+                continue
+            self.__in_flight += 1
+            self.__record_wait(now - enqueued)
+            future.set_result(None)
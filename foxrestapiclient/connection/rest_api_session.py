@@ -0,0 +1,203 @@
+"""Shared aiohttp session pool used by F&F Fox RestAPI clients."""
+from __future__ import annotations
+
+import asyncio
+import errno
+
+import aiohttp
+
+from foxrestapiclient.connection import _LOGGER
+
+from .const import (API_SESSION_KEEPALIVE_FAILURE_THRESHOLD,
+                    API_SESSION_KEEPALIVE_TIMEOUT, API_SESSION_POOL_LIMIT,
+                    API_SESSION_POOL_LIMIT_PER_HOST, API_TRACE_PHASE_BODY_READ)
+from .rest_api_tracing import RestApiSpan, RestApiTracer
+
+
+class RestApiSessionPool:
+    """Pool of keep-alive HTTP connections shared by many RestApiClient objects.
+
+    Pool holds two aiohttp sessions created on demand. First one keeps connections
+    alive and reuses them between requests. Second one closes connection after every
+    request and is used for devices which drop idle keep-alive connections.
+    Sessions are bound to event loop, when loop changes sessions of previous loop
+    are closed and created again. Clients are counted per loop, sessions are closed
+    when last client of current loop is released.
+    """
+
+    __default_pool: RestApiSessionPool = None
+
+    def __init__(self, limit: int = API_SESSION_POOL_LIMIT,
+                limit_per_host: int = API_SESSION_POOL_LIMIT_PER_HOST,
+                keepalive_timeout: float = API_SESSION_KEEPALIVE_TIMEOUT,
+                keepalive_failure_threshold: int = API_SESSION_KEEPALIVE_FAILURE_THRESHOLD):
+        """Construct pool.
+
+        Keyword arguments:
+        limit -- total number of simultaneous connections
+        limit_per_host -- number of simultaneous connections to single device
+        keepalive_timeout -- idle connection lifetime in seconds
+        keepalive_failure_threshold -- dropped keep-alive connections count after which
+            host is switched to close-per-request mode
+        """
+        self._limit = limit
+        self._limit_per_host = limit_per_host
+        self._keepalive_timeout = keepalive_timeout
+        self._keepalive_failure_threshold = keepalive_failure_threshold
+        self.__keepalive_session: aiohttp.ClientSession = None
+        self.__close_session: aiohttp.ClientSession = None
+        self.__loop = None
+        self.__clients_count = 0
+        #Sessions of previous loop waiting to be closed
+        self.__stale_sessions = []
+        #Number of dropped keep-alive connections, key: host
+        self.__keepalive_failures = {}
+
+    @classmethod
+    def get_default(cls) -> RestApiSessionPool:
+        """Return process-wide pool, create it if needed."""
+        if cls.__default_pool is None:
+            cls.__default_pool = cls()
+        return cls.__default_pool
+
+    def acquire(self) -> asyncio.AbstractEventLoop:
+        """Register client using this pool in running event loop.
+
+        Return: loop client is registered in, pass it to async_release().
+        None if no loop is running, client must acquire again when it is used in loop.
+        """
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return None
+        self.__bind_loop(loop)
+        self.__clients_count += 1
+        return loop
+
+    async def async_release(self, loop: asyncio.AbstractEventLoop):
+        """Unregister client registered in given loop.
+
+        Sessions are closed when last client is released. Clients of previous
+        loops are not counted anymore, so they are ignored.
+        """
+        if loop is None or loop is not self.__loop:
+            return
+        self.__clients_count = max(self.__clients_count - 1, 0)
+        if self.__clients_count == 0:
+            await self.async_close()
+
+    def __bind_loop(self, loop: asyncio.AbstractEventLoop):
+        """Bind pool to given loop, sessions of previous loop are closed."""
+        if self.__loop is loop:
+            return
+        for session in (self.__keepalive_session, self.__close_session):
+            if session is None or session.closed:
+                continue
+            if self.__loop is not None and self.__loop.is_running():
+                #Loop runs in other thread, session is closed there
+                asyncio.run_coroutine_threadsafe(session.close(), self.__loop)
+            else:
+                #Closed by next request or async_close() in current loop
+                self.__stale_sessions.append(session)
+        self.__keepalive_session = None
+        self.__close_session = None
+        self.__loop = loop
+        self.__clients_count = 0
+
+    async def __async_close_stale_sessions(self):
+        """Close sessions of previous loop which does not run anymore."""
+        while self.__stale_sessions:
+            await self.__stale_sessions.pop().close()
+
+    def is_keepalive_disabled(self, host: str) -> bool:
+        """Return true if host drops keep-alive connections and is served close-per-request."""
+        return self.__keepalive_failures.get(host, 0) >= self._keepalive_failure_threshold
+
+    def __report_keepalive_failure(self, host: str):
+        """Count dropped keep-alive connection for given host."""
+        failures = self.__keepalive_failures.get(host, 0) + 1
+        self.__keepalive_failures[host] = failures
+        if failures == self._keepalive_failure_threshold:
+            _LOGGER.info("Device %s drops keep-alive connections, using close-per-request.", host)
+
+    def __create_session(self, force_close: bool) -> aiohttp.ClientSession:
+        """Create aiohttp session with pool limits."""
+        connector = aiohttp.TCPConnector(
+            limit=self._limit,
+            limit_per_host=self._limit_per_host,
+            keepalive_timeout=None if force_close else self._keepalive_timeout,
+            force_close=force_close
+        )
+        return aiohttp.ClientSession(connector=connector,
+            trace_configs=[RestApiTracer.get_default().trace_config])
+
+    def get_session(self, host: str) -> aiohttp.ClientSession:
+        """Return session for given host. Must be called from running event loop."""
+        self.__bind_loop(asyncio.get_running_loop())
+        if self.is_keepalive_disabled(host):
+            if self.__close_session is None or self.__close_session.closed:
+                self.__close_session = self.__create_session(True)
+            return self.__close_session
+        if self.__keepalive_session is None or self.__keepalive_session.closed:
+            self.__keepalive_session = self.__create_session(False)
+        return self.__keepalive_session
+
+    async def async_get(self, host: str, url: str, params: dict = None,
+                        timeout: aiohttp.ClientTimeout = None,
+                        span: RestApiSpan = None, resend: bool = False) -> bytes:
+        """Make HTTP GET request and return response body.
+
+        If device dropped reused keep-alive connection, request is repeated once
+        on fresh connection only if it is safe to send twice. Otherwise error is
+        raised, device could have received the request.
+
+        Keyword arguments:
+        host -- device host, used to track keep-alive support
+        url -- request url
+        params -- optional query parameters
+        timeout -- request timeout
+        span -- optional, span which receives connect, ttfb and body read phases
+        resend -- true if request can be sent again, e.g. read allowed by retry policy
+        """
+        await self.__async_close_stale_sessions()
+        keepalive_used = not self.is_keepalive_disabled(host)
+        try:
+            return await self.__async_read(self.get_session(host), url, params, timeout, span)
+        except aiohttp.ClientConnectionError as error:
+            if not keepalive_used or not self.__is_dropped_connection(error):
+                raise
+            self.__report_keepalive_failure(host)
+            if not resend:
+                raise
+        async with self.__create_session(True) as session:
+            return await self.__async_read(session, url, params, timeout, span)
+
+    async def __async_read(self, session: aiohttp.ClientSession, url: str, params: dict,
+                        timeout: aiohttp.ClientTimeout, span: RestApiSpan = None) -> bytes:
+        """Make request with given session and read response body."""
+        async with session.get(url, params=params, timeout=timeout,
+                trace_request_ctx=span) as resp:
+            body = await resp.read()
+        if span is not None:
+            span.end_phase(API_TRACE_PHASE_BODY_READ)
+        return body
+
+    @staticmethod
+    def __is_dropped_connection(error: aiohttp.ClientConnectionError) -> bool:
+        """Return true if error means that device closed idle connection."""
+        if isinstance(error, aiohttp.ServerDisconnectedError):
+            return True
+        return (isinstance(error, aiohttp.ClientOSError)
+            and error.errno in (errno.ECONNRESET, errno.EPIPE))
+
+    async def async_close(self):
+        """Close all pool sessions."""
+        await self.__async_close_stale_sessions()
+        if self.__loop is asyncio.get_running_loop():
+            for session in (self.__keepalive_session, self.__close_session):
+                if session is not None and not session.closed:
+                    await session.close()
+        self.__keepalive_session = None
+        self.__close_session = None
+        self.__loop = None
+        self.__clients_count = 0
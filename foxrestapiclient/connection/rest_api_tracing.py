@@ -0,0 +1,231 @@
+"""Opt-in phase-level tracing of F&F Fox RestAPI requests."""
+from __future__ import annotations
+
+import contextvars
+import itertools
+import json
+import time
+from contextlib import contextmanager
+
+import aiohttp
+
+from foxrestapiclient.connection import _LOGGER
+
+from .const import (API_TRACE_PHASE_BODY_READ, API_TRACE_PHASE_CONNECT,
+                    API_TRACE_PHASE_TTFB)
+
+
+class TraceContext:
+    """Device refresh cycle which requests belong to."""
+
+    __slots__ = ("trace_id", "device")
+
+    def __init__(self, trace_id: int, device: str) -> None:
+        """Construct context.
+
+        Keyword arguments:
+        trace_id -- id of single async_fetch_update() call
+        device -- device mac address
+        """
+        self.trace_id = trace_id
+        self.device = device
+
+
+#Context of traced device refresh, inherited by tasks started during refresh
+TRACE_CONTEXT: contextvars.ContextVar = contextvars.ContextVar("fox_trace_context",
+    default=None)
+
+
+class RestApiSpan:
+    """Timings of single request or response parsing.
+
+    Phase durations are in seconds, start is time.time() of span start.
+    """
+
+    __slots__ = ("name", "trace_id", "device", "host", "method", "start", "duration",
+                "phases", "connection_reused", "error", "__started", "__phase_starts")
+
+    def __init__(self, name: str, host: str = None, method: str = None) -> None:
+        """Construct span started now in current trace context."""
+        context = TRACE_CONTEXT.get()
+        self.name = name
+        self.trace_id = context.trace_id if context is not None else None
+        self.device = context.device if context is not None else None
+        self.host = host
+        self.method = method
+        self.start = time.time()
+        self.duration: float = None
+        #Phase durations, key: phase name
+        self.phases = {}
+        self.connection_reused: bool = None
+        self.error: str = None
+        self.__started = time.perf_counter()
+        self.__phase_starts = {}
+
+    def start_phase(self, phase: str):
+        """Start measuring phase."""
+        self.__phase_starts[phase] = time.perf_counter()
+
+    def end_phase(self, phase: str):
+        """Store duration of phase if it was started."""
+        started = self.__phase_starts.pop(phase, None)
+        if started is not None:
+            self.phases[phase] = time.perf_counter() - started
+
+    def finish(self, error: BaseException = None):
+        """Store span duration and error type name of failed span."""
+        self.duration = time.perf_counter() - self.__started
+        if error is not None:
+            self.error = type(error).__name__
+
+    def to_dict(self) -> dict:
+        """Return span as JSON serializable dict."""
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "device": self.device,
+            "host": self.host,
+            "method": self.method,
+            "start": self.start,
+            "duration": self.duration,
+            "phases": self.phases,
+            "connection_reused": self.connection_reused,
+            "error": self.error
+        }
+
+
+class RestApiSpanExporter:
+    """Receiver of finished spans, override export()."""
+
+    def export(self, span: RestApiSpan):
+        """Handle finished span."""
+
+
+class JsonLinesSpanExporter(RestApiSpanExporter):
+    """Appends finished spans to JSON lines file for offline analysis."""
+
+    def __init__(self, file_path: str) -> None:
+        """Construct exporter, file is opened on first span."""
+        self.file_path = file_path
+        self.__file = None
+
+    def export(self, span: RestApiSpan):
+        """Write span as single line."""
+        if self.__file is None:
+            self.__file = open(self.file_path, "a", encoding="utf-8")
+        self.__file.write(json.dumps(span.to_dict()) + "\n")
+
+    def flush(self):
+        """Write buffered spans to file."""
+        if self.__file is not None:
+            self.__file.flush()
+
+    def close(self):
+        """Close file."""
+        if self.__file is not None:
+            self.__file.close()
+            self.__file = None
+
+
+class RestApiTracer:
+    """Creates spans of requests and passes finished ones to exporters.
+
+    Tracing is enabled when any exporter is registered, otherwise no span is
+    created. Network phases are measured with aiohttp TraceConfig added to
+    sessions of RestApiSessionPool, parsing phases by parse_response().
+    Spans created during FoxBaseDevice.async_fetch_update() hold device and
+    trace id of refresh, see trace().
+    """
+
+    __default_tracer: RestApiTracer = None
+
+    def __init__(self) -> None:
+        """Construct disabled tracer."""
+        self.__exporters = []
+        self.__trace_ids = itertools.count(1)
+        self.enabled = False
+        self.trace_config = aiohttp.TraceConfig()
+        self.trace_config.on_connection_create_start.append(self.__on_connection_create_start)
+        self.trace_config.on_connection_create_end.append(self.__on_connection_create_end)
+        self.trace_config.on_connection_reuseconn.append(self.__on_connection_reuseconn)
+        self.trace_config.on_request_end.append(self.__on_request_end)
+
+    @classmethod
+    def get_default(cls) -> RestApiTracer:
+        """Return process-wide tracer, create it if needed."""
+        if cls.__default_tracer is None:
+            cls.__default_tracer = cls()
+        return cls.__default_tracer
+
+    def add_exporter(self, exporter: RestApiSpanExporter):
+        """Register exporter, e.g. JsonLinesSpanExporter, and enable tracing."""
+        if exporter not in self.__exporters:
+            self.__exporters.append(exporter)
+        self.enabled = True
+
+    def remove_exporter(self, exporter: RestApiSpanExporter):
+        """Unregister exporter, tracing is disabled when no exporter is left."""
+        if exporter in self.__exporters:
+            self.__exporters.remove(exporter)
+        self.enabled = bool(self.__exporters)
+
+    @contextmanager
+    def trace(self, device: str):
+        """Tie spans created in context to device and new trace id."""
+        if not self.enabled:
+            yield
+            return
+        token = TRACE_CONTEXT.set(TraceContext(next(self.__trace_ids), device))
+        try:
+            yield
+        finally:
+            TRACE_CONTEXT.reset(token)
+
+    def start_span(self, name: str, host: str = None, method: str = None) -> RestApiSpan:
+        """Return started span or None if tracing is disabled."""
+        if not self.enabled:
+            return None
+        return RestApiSpan(name, host, method)
+
+    def finish_span(self, span: RestApiSpan, error: BaseException = None):
+        """Finish span and pass it to exporters. None span is ignored."""
+        if span is None:
+            return
+        span.finish(error)
+        for exporter in self.__exporters:
+            try:
+                exporter.export(span)
+            except Exception as exception:
+                _LOGGER.error("Span exporter %s failed: %s", exporter, exception)
+
+    @staticmethod
+    async def __on_connection_create_start(session, context, params):
+        """Start measuring connect phase."""
+        span = context.trace_request_ctx
+        if isinstance(span, RestApiSpan):
+            span.connection_reused = False
+            span.start_phase(API_TRACE_PHASE_CONNECT)
+
+    @staticmethod
+    async def __on_connection_create_end(session, context, params):
+        """Store connect phase and wait for response headers."""
+        span = context.trace_request_ctx
+        if isinstance(span, RestApiSpan):
+            span.end_phase(API_TRACE_PHASE_CONNECT)
+            span.start_phase(API_TRACE_PHASE_TTFB)
+
+    @staticmethod
+    async def __on_connection_reuseconn(session, context, params):
+        """Wait for response headers on reused connection."""
+        span = context.trace_request_ctx
+        if isinstance(span, RestApiSpan):
+            span.connection_reused = True
+            span.start_phase(API_TRACE_PHASE_TTFB)
+
+    @staticmethod
+    async def __on_request_end(session, context, params):
+        """Store time to response headers and start measuring body read."""
+        span = context.trace_request_ctx
+        if isinstance(span, RestApiSpan):
+            span.end_phase(API_TRACE_PHASE_TTFB)
+            span.start_phase(API_TRACE_PHASE_BODY_READ)
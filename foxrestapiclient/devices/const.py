@@ -2,6 +2,11 @@
 API_RESPONSE_STATUS_OK = "ok"
 API_RESPONSE_STATUS_FAIL = "false"
 API_RESPONSE_STATUS_INVALID = "invalid_action_name"
+#Queued read was dropped before it was sent, device state is unknown
+API_RESPONSE_STATUS_DROPPED = "dropped"
+#Returned by device setters when coalesced write was replaced by newer value
+#before it was sent. It is true in boolean context, newer value was written.
+WRITE_RESULT_SUPERSEDED = "superseded"
 
 #Common RestApi methods
 API_METHOD_COMMON_GET_STATE = "get_state/"
@@ -81,7 +86,139 @@ DEVICE_PLATFORM = {
     DEVICE_TYPE_STR1S2: SUPPORTED_PLATFORM_COVER
 }
 
+#State change detection values
+#Field of device availability in state changes
+DEVICE_STATE_AVAILABLE = "available"
+#Numeric change smaller or equal to deadband is not reported, key: field name.
+#Deadband is compared with last reported value, so slow drift is reported too.
+DEVICE_STATE_DEADBANDS = {
+    "voltage": 1.0,
+    "current": 0.05,
+    "power_active": 5.0,
+    "power_reactive": 5.0,
+    "frequency": 0.05,
+    "power_factor": 0.02
+}
+
+#Max parallel requests in concurrent refresh mode, key: device type.
+#Lower values for firmware which cannot handle many sockets at once.
+DEVICE_DEFAULT_MAX_PARALLEL_REQUESTS = 1
+DEVICE_MAX_PARALLEL_REQUESTS = {
+    DEVICE_TYPE_DIM1S2: 2,
+    DEVICE_TYPE_LED2S2: 2,
+    DEVICE_TYPE_RGBW: 2,
+    DEVICE_TYPE_R1S1: 3,
+    DEVICE_TYPE_R2S2: 1,
+    DEVICE_TYPE_STR1S2: 2
+}
+
 #Service discovery values
 DEVICE_DISCOVERY_RESPONSE_HEADER = 'F&F-WiFi-device-discovery-response:1'
 DEVICE_DISCOVERY_REQUEST_HEADER = 'F&F-WiFi-device-discovery-request:1'
-MIN_DATA_SIZE_TO_PARSE = 45
\ No newline at end of file
+MIN_DATA_SIZE_TO_PARSE = 45
+DISCOVERY_BROADCAST_ADDRESS = '255.255.255.255'
+DISCOVERY_DEVICE_PORT = 1918
+DISCOVERY_LOCAL_PORT = 1395
+#Probe broadcast backoff in seconds: first interval, multiplier and max interval
+DISCOVERY_PROBE_INITIAL_INTERVAL = 0.5
+DISCOVERY_PROBE_BACKOFF = 2
+DISCOVERY_PROBE_MAX_INTERVAL = 4
+#Stream stops if no new device replied for quiet period, values in seconds
+DISCOVERY_DEFAULT_QUIET_PERIOD = 5
+DISCOVERY_DEFAULT_TIMEOUT = 20
+#Discovery listener probe interval and silent device expiry time in seconds
+DISCOVERY_LISTENER_PROBE_INTERVAL = 60
+DISCOVERY_LISTENER_EXPIRE_AFTER = 180
+DISCOVERY_EVENT_ADDED = "added"
+DISCOVERY_EVENT_CHANGED = "changed"
+DISCOVERY_EVENT_REMOVED = "removed"
+#Unicast sweep: max probes per second, probes sent at once, probes per host
+#and time in seconds to wait for responses after last probe
+DISCOVERY_SWEEP_RATE = 1000
+DISCOVERY_SWEEP_BURST = 32
+DISCOVERY_SWEEP_PASSES = 2
+DISCOVERY_SWEEP_REPLY_TIMEOUT = 1
+
+#Fleet polling values
+FLEET_DEFAULT_MAX_CONCURRENCY = 32
+#Single device poll timeout in seconds
+FLEET_DEFAULT_POLL_TIMEOUT = 15
+#Part of poll interval used to spread devices poll start
+FLEET_DEFAULT_SPREAD_RATIO = 0.5
+
+#Adaptive polling values in seconds
+POLL_DEFAULT_MIN_INTERVAL = 2
+POLL_DEFAULT_MAX_INTERVAL = 60
+#Unavailable device interval grows up to this value
+POLL_UNAVAILABLE_MAX_INTERVAL = 300
+#First poll after command, gives device time to apply it
+POLL_AFTER_COMMAND_DELAY = 0.5
+#Interval multiplier after poll without change and after failed poll
+POLL_INTERVAL_GROWTH = 1.5
+POLL_UNAVAILABLE_BACKOFF = 2
+#Learned interval gives this number of polls per expected state change
+POLL_TARGET_POLLS_PER_CHANGE = 2
+#Weight of newest sample in smoothed change rate
+POLL_CHANGE_RATE_SMOOTHING = 0.3
+
+#Device inventory values
+INVENTORY_FILE_VERSION = 1
+#Max devices checked at the same time by inventory validation
+INVENTORY_VALIDATION_CONCURRENCY = 8
+
+#R1S1 sensor history values
+#Stored AC parameters and energy counters
+R1S1_HISTORY_FIELDS = ("voltage", "current", "power_active", "power_reactive", "frequency",
+    "power_factor", "active_energy", "reactive_energy", "active_energy_import",
+    "reactive_energy_import")
+#Number of raw samples
+R1S1_HISTORY_RAW_CAPACITY = 360
+#Downsampled tiers: (resolution in seconds, number of min/mean/max samples)
+R1S1_HISTORY_TIERS = ((60, 240), (900, 96))
+
+#Fleet snapshot values
+#State values exported to snapshot columns, device wide values are stored in channel 0 row
+SNAPSHOT_STATE_FIELDS = ("state", "brightness", "hue", "saturation", "value",
+    "cover_position", "tilt_position") + R1S1_HISTORY_FIELDS
+#Snapshot columns describing row: availability (1/0), time.time() of last update,
+#device type, channel and group code
+SNAPSHOT_META_FIELDS = ("available", "updated", "dev_type", "channel", "group")
+
+#Update subscription values
+#Overflow policies of full subscription queue: drop the oldest update, keep
+#latest update per device merged with queued one, or wait for consumer
+SUBSCRIPTION_OVERFLOW_DROP_OLDEST = "drop_oldest"
+SUBSCRIPTION_OVERFLOW_CONFLATE = "conflate"
+SUBSCRIPTION_OVERFLOW_BLOCK = "block"
+SUBSCRIPTION_DEFAULT_MAX_SIZE = 100
+#Max seconds publisher waits for slow consumer in block policy,
+#the oldest update is dropped then
+SUBSCRIPTION_BLOCK_TIMEOUT = 1
+
+#OpenMetrics exporter values
+OPENMETRICS_CONTENT_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+OPENMETRICS_PATH = "/metrics"
+OPENMETRICS_DEFAULT_PORT = 9420
+#Metric families of device state fields: (field, family name, type, help).
+#Counter samples get _total suffix.
+OPENMETRICS_STATE_FAMILIES = (
+    ("state", "fox_channel_on", "gauge", "Channel is on (1) or off (0)"),
+    ("brightness", "fox_channel_brightness", "gauge", "Channel brightness"),
+    ("hue", "fox_color_hue", "gauge", "Color hue"),
+    ("saturation", "fox_color_saturation", "gauge", "Color saturation"),
+    ("value", "fox_color_value", "gauge", "Color value (brightness of HSV color)"),
+    ("cover_position", "fox_cover_position", "gauge", "Cover position"),
+    ("tilt_position", "fox_cover_tilt_position", "gauge", "Cover tilt position"),
+    ("voltage", "fox_meter_voltage", "gauge", "AC voltage"),
+    ("current", "fox_meter_current", "gauge", "AC current"),
+    ("power_active", "fox_meter_power_active", "gauge", "Active power"),
+    ("power_reactive", "fox_meter_power_reactive", "gauge", "Reactive power"),
+    ("frequency", "fox_meter_frequency", "gauge", "AC frequency"),
+    ("power_factor", "fox_meter_power_factor", "gauge", "Power factor"),
+    ("active_energy", "fox_meter_active_energy", "counter", "Total active energy"),
+    ("reactive_energy", "fox_meter_reactive_energy", "counter", "Total reactive energy"),
+    ("active_energy_import", "fox_meter_active_energy_import", "counter",
+        "Total imported active energy"),
+    ("reactive_energy_import", "fox_meter_reactive_energy_import", "counter",
+        "Total imported reactive energy")
+)
@@ -0,0 +1,194 @@
+"""Adaptive polling of F&F Fox fleet. Every device gets own interval."""
+from __future__ import annotations
+
+import asyncio
+import time
+
+from .const import (POLL_AFTER_COMMAND_DELAY, POLL_CHANGE_RATE_SMOOTHING,
+                    POLL_DEFAULT_MAX_INTERVAL, POLL_DEFAULT_MIN_INTERVAL,
+                    POLL_INTERVAL_GROWTH, POLL_TARGET_POLLS_PER_CHANGE,
+                    POLL_UNAVAILABLE_BACKOFF, POLL_UNAVAILABLE_MAX_INTERVAL)
+from .fox_base_device import FoxBaseDevice
+from .fox_fleet import FoxFleet, FoxFleetPollResult
+
+
+class DevicePollState:
+    """Polling state of single device."""
+
+    __slots__ = ("interval", "next_poll", "last_poll", "values", "change_rate",
+                "command_seen", "in_progress")
+
+    def __init__(self, interval: float, next_poll: float) -> None:
+        """Construct state, first poll at next_poll."""
+        self.interval = interval
+        self.next_poll = next_poll
+        self.last_poll: float = None
+        self.values: dict = None
+        #Smoothed number of observed state changes per second
+        self.change_rate = 0.0
+        self.command_seen: float = None
+        self.in_progress = False
+
+
+class FoxAdaptivePoller:
+    """Polls fleet devices with intervals learned from their state changes.
+
+    Device which changed state is polled with min_interval, then interval
+    grows towards value learned from its change rate, up to max_interval.
+    Device is polled soon after command is sent to it. Unavailable devices
+    are backed off up to unavailable_max_interval.
+    """
+
+    def __init__(self, fleet: FoxFleet, min_interval: float = POLL_DEFAULT_MIN_INTERVAL,
+                max_interval: float = POLL_DEFAULT_MAX_INTERVAL,
+                unavailable_max_interval: float = POLL_UNAVAILABLE_MAX_INTERVAL) -> None:
+        """Construct poller.
+
+        Keyword arguments:
+        fleet -- polled devices, fleet limits concurrency and poll timeout
+        min_interval -- min poll interval of device in seconds
+        max_interval -- max poll interval of available device in seconds
+        unavailable_max_interval -- max poll interval of unavailable device in seconds
+        """
+        self._fleet = fleet
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.unavailable_max_interval = unavailable_max_interval
+        #Poll states, key: device mac address
+        self._states = {}
+        self.__running = False
+        self.__wakeup: asyncio.Event = None
+        self.__poll_tasks = set()
+
+    def get_interval(self, mac_addr: str) -> float:
+        """Return current poll interval of device or None if not polled yet."""
+        state = self._states.get(mac_addr)
+        return state.interval if state is not None else None
+
+    def get_intervals(self) -> dict:
+        """Return current poll intervals, key: device mac address."""
+        return {mac_addr: state.interval for mac_addr, state in self._states.items()}
+
+    def notify_command(self, mac_addr: str):
+        """Poll device soon, e.g. after it was controlled without this library."""
+        state = self._states.get(mac_addr)
+        if state is None:
+            return
+        state.interval = self.min_interval
+        state.next_poll = min(state.next_poll, time.monotonic() + POLL_AFTER_COMMAND_DELAY)
+        if self.__wakeup is not None:
+            self.__wakeup.set()
+
+    async def async_run(self, callback = None):
+        """Poll devices when they are due until stop() is called.
+
+        Keyword arguments:
+        callback -- optional, called with FoxFleetPollResult of every polled batch
+        """
+        self.__running = True
+        self.__wakeup = asyncio.Event()
+        try:
+            while self.__running:
+                now = time.monotonic()
+                self.__sync_states(now)
+                due = [
+                    device for device in self._fleet.get_devices()
+                    if not self._states[device.mac_addr].in_progress
+                    and self._states[device.mac_addr].next_poll <= now
+                ]
+                if due:
+                    task = asyncio.ensure_future(self.__async_poll_batch(due, callback))
+                    self.__poll_tasks.add(task)
+                    task.add_done_callback(self.__poll_tasks.discard)
+                await self.__async_wait(now)
+        finally:
+            self.__running = False
+            for task in list(self.__poll_tasks):
+                task.cancel()
+            if self.__poll_tasks:
+                await asyncio.gather(*self.__poll_tasks, return_exceptions=True)
+
+    def stop(self):
+        """Stop polling started by async_run()."""
+        self.__running = False
+        if self.__wakeup is not None:
+            self.__wakeup.set()
+
+    def __sync_states(self, now: float):
+        """Create states of new devices, drop removed ones and notice sent commands."""
+        devices = self._fleet.get_devices()
+        for device in devices:
+            state = self._states.get(device.mac_addr)
+            if state is None:
+                self._states[device.mac_addr] = DevicePollState(self.min_interval, now)
+                continue
+            command_time = device.get_last_command_time()
+            if command_time is not None and command_time != state.command_seen:
+                state.command_seen = command_time
+                state.interval = self.min_interval
+                state.next_poll = min(state.next_poll, command_time + POLL_AFTER_COMMAND_DELAY)
+        if len(self._states) != len(devices):
+            macs = {device.mac_addr for device in devices}
+            for mac_addr in [mac_addr for mac_addr in self._states if mac_addr not in macs]:
+                del self._states[mac_addr]
+
+    async def __async_wait(self, now: float):
+        """Sleep until next device is due or poller is woken up.
+
+        Commands are checked at least every min_interval.
+        """
+        next_poll = now + self.min_interval
+        for state in self._states.values():
+            if not state.in_progress and state.next_poll < next_poll:
+                next_poll = state.next_poll
+        self.__wakeup.clear()
+        try:
+            await asyncio.wait_for(self.__wakeup.wait(), max(next_poll - now, 0))
+        except asyncio.TimeoutError:
+            pass
+
+    async def __async_poll_batch(self, devices: list, callback = None):
+        """Poll devices and update their intervals."""
+        for device in devices:
+            self._states[device.mac_addr].in_progress = True
+        try:
+            result = await self._fleet.async_poll(devices=devices)
+        finally:
+            now = time.monotonic()
+            for device in devices:
+                state = self._states.get(device.mac_addr)
+                if state is not None:
+                    state.in_progress = False
+        for device in devices:
+            state = self._states.get(device.mac_addr)
+            if state is not None:
+                self.__update_state(device, state, result, now)
+        if self.__wakeup is not None:
+            self.__wakeup.set()
+        if callback is not None:
+            callback(result)
+
+    def __update_state(self, device: FoxBaseDevice, state: DevicePollState,
+                        result: FoxFleetPollResult, now: float):
+        """Calculate next device poll after poll result."""
+        if device.mac_addr not in result.succeeded:
+            state.interval = min(max(state.interval * POLL_UNAVAILABLE_BACKOFF, self.min_interval),
+                self.unavailable_max_interval)
+            state.next_poll = now + state.interval
+            return
+        values = device.get_state_values()
+        changed = state.values is not None and values != state.values
+        if state.last_poll is not None and now > state.last_poll:
+            sample = (1 if changed else 0) / (now - state.last_poll)
+            state.change_rate += POLL_CHANGE_RATE_SMOOTHING * (sample - state.change_rate)
+        state.values = values
+        state.last_poll = now
+        if changed:
+            state.interval = self.min_interval
+        else:
+            learned_interval = self.max_interval
+            if state.change_rate > 0:
+                learned_interval = 1 / (state.change_rate * POLL_TARGET_POLLS_PER_CHANGE)
+            state.interval = min(state.interval * POLL_INTERVAL_GROWTH, learned_interval)
+        state.interval = min(max(state.interval, self.min_interval), self.max_interval)
+        state.next_poll = now + state.interval
@@ -2,27 +2,44 @@
 from __future__ import annotations
 
 import abc
+import asyncio
+from typing import Callable
 
 from aiohttp.client_exceptions import ClientConnectionError
 
+from foxrestapiclient.connection import _LOGGER
 from foxrestapiclient.connection.rest_api_client import RestApiClient
-from foxrestapiclient.connection.rest_api_responses import \
-    RestApiDeviceInfoResponse
-
-from .const import (API_RESPONSE_STATUS_FAIL, API_RESPONSE_STATUS_INVALID, API_RESPONSE_STATUS_OK,
-                    DEVICE_OFF, DEVICE_ON, DEVICE_PLATFORM, DEVICES,
-                    MANUFACTURER_NAME)
+from foxrestapiclient.connection.rest_api_responses import (
+    RestApiDeviceInfoResponse, intern_value)
+from foxrestapiclient.connection.rest_api_scheduler import RestApiRequestScheduler
+from foxrestapiclient.connection.rest_api_session import RestApiSessionPool
+from foxrestapiclient.connection.rest_api_tracing import RestApiTracer
+
+from .const import (API_RESPONSE_STATUS_DROPPED, API_RESPONSE_STATUS_FAIL,
+                    API_RESPONSE_STATUS_INVALID, API_RESPONSE_STATUS_OK,
+                    DEVICE_DEFAULT_MAX_PARALLEL_REQUESTS,
+                    DEVICE_MAX_PARALLEL_REQUESTS, DEVICE_OFF, DEVICE_ON,
+                    DEVICE_STATE_AVAILABLE, DEVICE_STATE_DEADBANDS,
+                    DEVICE_PLATFORM, DEVICES, MANUFACTURER_NAME,
+                    SUBSCRIPTION_BLOCK_TIMEOUT, SUBSCRIPTION_DEFAULT_MAX_SIZE,
+                    SUBSCRIPTION_OVERFLOW_BLOCK, SUBSCRIPTION_OVERFLOW_DROP_OLDEST,
+                    WRITE_RESULT_SUPERSEDED)
+from .fox_sensor_history import to_float
+from .fox_subscription import FoxDeviceUpdate, FoxStateChange, FoxSubscription
+from .fox_write_coalescer import CoalescedWriteResult, FoxWriteCoalescer
 
 
 class DeviceData:
     """DeviceData holder. Used for simple object creation."""
 
+    __slots__ = ("name", "host", "api_key", "mac_addr", "dev_type", "channels", "skip")
+
     def __init__(self, name: str, host: str, api_key: str, mac_addr: str, dev_type: int,
             channels: list = None, skip: bool = False):
         """Init all required values."""
-        self.name = name
+        self.name = intern_value(name)
         self.host = host
-        self.api_key = api_key
+        self.api_key = intern_value(api_key)
         self.mac_addr = mac_addr
         self.dev_type = dev_type
         self.channels = channels
@@ -36,16 +53,48 @@ class FoxBaseDevice:
     """F&F Fox base device class."""
 
     __metaclass__ = abc.ABCMeta
-    def __init__(self, device_data: DeviceData):
-        """Construct object with data passed. Warning! can be exception raised."""
+    def __init__(self, device_data: DeviceData, session_pool: RestApiSessionPool = None):
+        """Construct object with data passed. Warning! can be exception raised.
+
+        Keyword arguments:
+        device_data -- device connection data
+        session_pool -- optional, connection pool shared with other devices.
+            Process-wide pool is used if not provided.
+        """
         self.dev_type = device_data.dev_type
         self.name = device_data.name
         self.mac_addr = device_data.mac_addr
         self.device_info_data: RestApiDeviceInfoResponse = None
         self.is_available = False
-        self._rest_api_client = RestApiClient(device_data.host, device_data.api_key)
+        #Concurrent refresh mode, independent reads are sent together.
+        self.concurrent_refresh = False
+        #Latest-wins coalescing of frequent writes, e.g. from UI sliders. Off by default,
+        #it changes result of replaced writes, see set_write_coalescing().
+        self.write_coalescing = False
+        self._write_coalescer = FoxWriteCoalescer()
+        #Numeric deadbands of state change detection, key: field name.
+        self.state_deadbands = dict(DEVICE_STATE_DEADBANDS)
+        #Last reported state values, key: (field, channel)
+        self.__reported_values: dict = None
+        self.__state_listeners = []
+        self.__subscriptions = []
+        self._rest_api_client = RestApiClient(device_data.host, device_data.api_key,
+            session_pool)
         self.__init_device_platform(device_data.dev_type)
 
+    async def __aenter__(self) -> FoxBaseDevice:
+        """Enter async context."""
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        """Exit async context and close device client."""
+        await self.async_close()
+
+    async def async_close(self):
+        """Cancel pending coalesced writes and close device RestAPI client."""
+        self._write_coalescer.cancel()
+        await self._rest_api_client.async_close()
+
     def __init_device_platform(self, dev_type: int):
         """Initialize device platform.
 
@@ -61,6 +110,77 @@ class FoxBaseDevice:
         except:
             raise UnsupportedDevice("Not supported device. Check type param.")
 
+    def set_concurrent_refresh(self, enabled: bool, max_parallel_requests: int = None):
+        """Enable or disable concurrent refresh mode.
+
+        In concurrent mode independent reads made by async_fetch_update() are sent
+        together, so refresh takes about as long as the slowest single read.
+        Otherwise single request is sent to device at once.
+
+        Keyword arguments:
+        enabled -- true to enable concurrent refresh
+        max_parallel_requests -- optional, max requests sent to device at the same time.
+            If not provided value from DEVICE_MAX_PARALLEL_REQUESTS is used.
+        """
+        self.concurrent_refresh = enabled
+        if not enabled:
+            self._rest_api_client.set_max_parallel_requests(DEVICE_DEFAULT_MAX_PARALLEL_REQUESTS)
+            return
+        if max_parallel_requests is None:
+            max_parallel_requests = DEVICE_MAX_PARALLEL_REQUESTS.get(
+                self.dev_type, DEVICE_DEFAULT_MAX_PARALLEL_REQUESTS)
+        self._rest_api_client.set_max_parallel_requests(max_parallel_requests)
+
+    def set_write_coalescing(self, enabled: bool, min_interval: float = 0):
+        """Enable or disable write coalescing.
+
+        When enabled only one brightness, color or position write per channel is
+        in progress. Values set in the meantime are collapsed into one write
+        with the latest value. Callers of replaced values are not sent to device,
+        their async_set_* / async_update_* calls return result of the write which
+        replaced them. Disabled by default, every call is sent then.
+
+        Keyword arguments:
+        enabled -- true to enable write coalescing
+        min_interval -- min time in seconds between writes of the same setting
+        """
+        self.write_coalescing = enabled
+        self._write_coalescer.min_interval = min_interval
+
+    async def _async_coalesced_write(self, key, value, write_callback,
+                                    merge = None) -> CoalescedWriteResult:
+        """Send write through write coalescer if enabled.
+
+        Keyword arguments:
+        key -- setting identifier, e.g. channel brightness
+        value -- value passed to write callback
+        write_callback -- coroutine function called with value to write
+        merge -- optional, function merging pending value with new one
+
+        Return: CoalescedWriteResult with write callback result, never superseded
+        if coalescing is disabled.
+        """
+        if not self.write_coalescing:
+            return CoalescedWriteResult(await write_callback(value))
+        return await self._write_coalescer.async_submit(key, value, write_callback, merge)
+
+    @staticmethod
+    def _get_write_result(write_result: CoalescedWriteResult):
+        """Return setter result of successful write, WRITE_RESULT_SUPERSEDED or True."""
+        return WRITE_RESULT_SUPERSEDED if write_result.superseded else True
+
+    async def _async_run_reads(self, *callbacks) -> list:
+        """Run independent reads and return their results in the same order.
+
+        Reads are awaited one after another unless concurrent refresh is enabled.
+
+        Keyword arguments:
+        callbacks -- coroutine functions without arguments
+        """
+        if not self.concurrent_refresh:
+            return [await callback() for callback in callbacks]
+        return list(await asyncio.gather(*[callback() for callback in callbacks]))
+
     def equals(self, fox_base_device: FoxBaseDevice) -> bool:
         """Compare object and return that are equal.
 
@@ -78,6 +198,144 @@ class FoxBaseDevice:
             return True
         return False
 
+    def get_circuit_state(self) -> str:
+        """Return device circuit state, open circuit means requests fail immediately."""
+        return self._rest_api_client.get_circuit_state()
+
+    def get_request_scheduler(self) -> RestApiRequestScheduler:
+        """Return device request scheduler with queue depth and wait time statistics."""
+        return self._rest_api_client.get_scheduler()
+
+    def get_last_command_time(self) -> float:
+        """Return time.monotonic() of last command sent to device or None."""
+        return self._rest_api_client.last_command_time
+
+    def get_state_values(self) -> dict:
+        """Return last fetched state values.
+
+        Return: dict, key: (field name, channel), channel is None for device wide values.
+        """
+        return {}
+
+    def add_state_change_listener(
+            self, callback: Callable[[FoxBaseDevice, list], None]) -> Callable[[], None]:
+        """Register callback called with device and list of FoxStateChange.
+
+        Callback is called after async_fetch_update() only if any field changed.
+        First update reports all fields.
+
+        Return: function which unregisters callback.
+        """
+        self.__state_listeners.append(callback)
+        return lambda: self.__state_listeners.remove(callback)
+
+    def subscribe(self, max_size: int = SUBSCRIPTION_DEFAULT_MAX_SIZE,
+                overflow: str = SUBSCRIPTION_OVERFLOW_DROP_OLDEST,
+                block_timeout: float = SUBSCRIPTION_BLOCK_TIMEOUT) -> FoxSubscription:
+        """Return subscription of device updates, use: async for update in subscription.
+
+        Every update holds changes of single async_fetch_update(). Updates are
+        queued per subscription, so slow consumer does not delay others.
+        Close subscription when it is not used anymore.
+
+        Keyword arguments:
+        max_size -- max queued updates
+        overflow -- policy of full queue, see FoxSubscription
+        block_timeout -- max seconds refresh waits for consumer in block policy
+        """
+        subscription = FoxSubscription(max_size, overflow, block_timeout,
+            on_close=self._remove_subscription)
+        self._add_subscription(subscription)
+        return subscription
+
+    def _add_subscription(self, subscription: FoxSubscription):
+        """Start publishing updates to subscription."""
+        if subscription not in self.__subscriptions:
+            self.__subscriptions.append(subscription)
+
+    def _remove_subscription(self, subscription: FoxSubscription):
+        """Stop publishing updates to subscription."""
+        if subscription in self.__subscriptions:
+            self.__subscriptions.remove(subscription)
+
+    async def _async_publish_state_changes(self) -> list:
+        """Publish state changes to listeners and subscriptions.
+
+        Called by device classes at the end of async_fetch_update().
+        Waits only for subscriptions with block policy, at most their block timeout.
+
+        Return: list of FoxStateChange.
+        """
+        changes = self._publish_state_changes()
+        if not changes or not self.__subscriptions:
+            return changes
+        update = FoxDeviceUpdate(self, changes)
+        blocking = []
+        for subscription in list(self.__subscriptions):
+            if subscription.overflow == SUBSCRIPTION_OVERFLOW_BLOCK:
+                blocking.append(subscription.async_put(update))
+            else:
+                subscription.put_nowait(update)
+        if blocking:
+            await asyncio.gather(*blocking)
+        return changes
+
+    def _publish_state_changes(self) -> list:
+        """Compare state values with last reported ones and notify listeners.
+
+        Return: list of FoxStateChange.
+        """
+        values = self.get_state_values()
+        values[(DEVICE_STATE_AVAILABLE, None)] = self.is_available
+        reported = self.__reported_values
+        if reported is None:
+            reported = self.__reported_values = {}
+            changes = [FoxStateChange(field, channel, None, value)
+                for (field, channel), value in values.items()]
+        else:
+            changes = [
+                FoxStateChange(field, channel, reported.get((field, channel)), value)
+                for (field, channel), value in values.items()
+                if (field, channel) not in reported
+                    or self.__is_changed(field, reported[(field, channel)], value)
+            ]
+        if not changes:
+            return changes
+        for change in changes:
+            reported[(change.field, change.channel)] = change.new_value
+        for callback in list(self.__state_listeners):
+            try:
+                callback(self, changes)
+            except Exception as exception:
+                _LOGGER.error("State change listener of %s failed: %s", self.mac_addr, exception)
+        return changes
+
+    def __is_changed(self, field: str, old_value, new_value) -> bool:
+        """Return true if value changed more than field deadband."""
+        if old_value == new_value:
+            return False
+        deadband = self.state_deadbands.get(field)
+        if not deadband:
+            return True
+        old_number = to_float(old_value)
+        new_number = to_float(new_value)
+        if old_number != old_number or new_number != new_number:
+            #NaN, value appeared or disappeared
+            return True
+        return abs(new_number - old_number) > deadband
+
+    def _trace_update(self):
+        """Return context tying traced requests to device and refresh cycle.
+
+        Used by device classes around body of async_fetch_update().
+        """
+        return RestApiTracer.get_default().trace(self.mac_addr)
+
+    def get_device_data(self) -> DeviceData:
+        """Return device connection data."""
+        return DeviceData(self.name, self._rest_api_client.get_host(),
+            self._rest_api_client.get_api_key(), self.mac_addr, self.dev_type)
+
     def __track_available(self, error):
         """Track device availability."""
         if isinstance(error, ClientConnectionError):
@@ -119,7 +377,8 @@ class FoxBaseDevice:
             "sw_version": sw_version
         }
 
-    async def async_fetch_channel_state(self, channel: int = None) -> bool | list:
+    async def async_fetch_channel_state(self, channel: int = None,
+                                        max_age: float = None) -> bool | list:
         """Fetch device state.
 
         Fetch F&F Fox device state by given channel. If None provided
@@ -128,13 +387,18 @@ class FoxBaseDevice:
 
         Keyword arguments:
         channel -- optional, fetch state by given channel
+        max_age -- optional, accept cached response not older than given seconds
 
         Return:
         list[bool] - if no channel provided and device has more than one channel
                      index 0 idicates to channel 1, index 1 to channel 2
         bool - device has only one channel, true or false.
+        None - read was dropped before it was sent, availability and state are unknown
+               so caller keeps previous values.
         """
-        device_response = await self._rest_api_client.async_api_get_device_state(channel)
+        device_response = await self._rest_api_client.async_api_get_device_state(channel, max_age)
+        if device_response.status == API_RESPONSE_STATUS_DROPPED:
+            return None
         if device_response.status in (API_RESPONSE_STATUS_FAIL, API_RESPONSE_STATUS_INVALID):
             self.is_available = False
             return False
@@ -171,17 +435,21 @@ class FoxBaseDevice:
             return False
         return device_response.status == API_RESPONSE_STATUS_OK
 
-    async def async_fetch_device_info(self):
+    async def async_fetch_device_info(self, max_age: float = None):
         """Fetch device info.
 
         Fetch F&F Fox device info. Name, firmware version etc. see RestApiDeviceInfoResponse.
         Warning! this method will override device name provided in constructor. Device name defined
         in Fox mobile application has priority.
+
+        Keyword arguments:
+        max_age -- optional, accept cached response not older than given seconds
         """
         device_response: RestApiDeviceInfoResponse = (
-            await self._rest_api_client.async_api_get_device_info()
+            await self._rest_api_client.async_api_get_device_info(max_age)
         )
-        if device_response.status in (API_RESPONSE_STATUS_FAIL, API_RESPONSE_STATUS_INVALID):
+        if device_response.status in (API_RESPONSE_STATUS_FAIL, API_RESPONSE_STATUS_INVALID,
+                API_RESPONSE_STATUS_DROPPED):
             return False
         self.device_info_data = device_response
         #Overwrite device name from user app config
@@ -191,8 +459,7 @@ class FoxBaseDevice:
 
     async def async_fetch_device_available_data(self):
         """Fetch all available data from device."""
-        await self.async_fetch_device_info()
-        await self.async_fetch_update()
+        await self._async_run_reads(self.async_fetch_device_info, self.async_fetch_update)
 
     @abc.abstractmethod
     def is_on(self, channel: int = None):
@@ -0,0 +1,39 @@
+"""Create F&F Fox device objects by device type."""
+from foxrestapiclient.connection.rest_api_session import RestApiSessionPool
+
+from .const import (DEVICE_TYPE_DIM1S2, DEVICE_TYPE_LED2S2, DEVICE_TYPE_R1S1,
+                    DEVICE_TYPE_R2S2, DEVICE_TYPE_RGBW, DEVICE_TYPE_STR1S2)
+from .fox_base_device import DeviceData, FoxBaseDevice, UnsupportedDevice
+from .fox_dim1s2_device import FoxDIM1S2Device
+from .fox_led2s2_device import FoxLED2S2Device
+from .fox_r1s1_device import FoxR1S1Device
+from .fox_r2s2_device import FoxR2S2Device
+from .fox_rgbw_device import FoxRGBWDevice
+from .fox_str1s2_device import FoxSTR1S2Device
+
+#Device classes, key: device type
+DEVICE_CLASSES = {
+    DEVICE_TYPE_DIM1S2: FoxDIM1S2Device,
+    DEVICE_TYPE_LED2S2: FoxLED2S2Device,
+    DEVICE_TYPE_R1S1: FoxR1S1Device,
+    DEVICE_TYPE_R2S2: FoxR2S2Device,
+    DEVICE_TYPE_RGBW: FoxRGBWDevice,
+    DEVICE_TYPE_STR1S2: FoxSTR1S2Device
+}
+
+
+def create_device(device_data: DeviceData,
+                session_pool: RestApiSessionPool = None) -> FoxBaseDevice:
+    """Create device object matching device type.
+
+    Keyword arguments:
+    device_data -- device connection data
+    session_pool -- optional, connection pool shared with other devices
+
+    Warning! UnsupportedDevice is raised for unknown device type.
+    """
+    try:
+        device_class = DEVICE_CLASSES[device_data.dev_type]
+    except KeyError:
+        raise UnsupportedDevice("Not supported device. Check type param.")
+    return device_class(device_data, session_pool)
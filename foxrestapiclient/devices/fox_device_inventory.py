@@ -0,0 +1,257 @@
+"""Persistent inventory of F&F Fox devices used to skip discovery on start."""
+from __future__ import annotations
+
+import asyncio
+import copy
+import json
+import os
+import tempfile
+
+from foxrestapiclient.connection import _LOGGER
+from foxrestapiclient.connection.rest_api_responses import RestApiDeviceInfoResponse
+from foxrestapiclient.connection.rest_api_session import RestApiSessionPool
+
+from .const import (API_RESPONSE_STATUS_OK, DEVICE_TYPE_GATE, DEVICES,
+                    INVENTORY_FILE_VERSION, INVENTORY_VALIDATION_CONCURRENCY)
+from .fox_base_device import DeviceData, FoxBaseDevice, UnsupportedDevice
+from .fox_device_factory import create_device
+
+
+def device_info_to_dict(device_info: RestApiDeviceInfoResponse) -> dict:
+    """Convert device info response to dict accepted by its constructor."""
+    return {
+        "device_name": device_info.device_name,
+        "firmware": device_info.firmware,
+        "hw": device_info.hardware,
+        "updater": device_info.updater,
+        "device_friendly_name": device_info.device_friendly_name,
+        "device_commercial_name": device_info.device_commercial_name,
+        "device_channels_name": device_info.device_channels_name,
+        "status": device_info.status
+    }
+
+
+class FoxDeviceInventory:
+    """Devices connection data and device info stored in JSON file, key: mac address.
+
+    Inventory is loaded on start, so devices are usable without discovery and
+    without fetching device info. Entries are checked against devices later:
+    entry is invalidated when device IP address or firmware changes.
+    """
+
+    def __init__(self, file_path: str) -> None:
+        """Construct inventory.
+
+        Keyword arguments:
+        file_path -- path of inventory JSON file
+        """
+        self.file_path = file_path
+        #Entries, key: mac address, value: (DeviceData, RestApiDeviceInfoResponse or None)
+        self._entries = {}
+
+    def __len__(self) -> int:
+        """Return number of stored devices."""
+        return len(self._entries)
+
+    def __contains__(self, mac_addr: str) -> bool:
+        """Return true if device is stored."""
+        return mac_addr in self._entries
+
+    def load(self) -> bool:
+        """Load inventory from file. Invalid entries are skipped.
+
+        Return: true if file was loaded.
+        """
+        self._entries = {}
+        try:
+            with open(self.file_path, encoding="utf-8") as inventory_file:
+                content = json.load(inventory_file)
+        except FileNotFoundError:
+            return False
+        except (OSError, ValueError) as exc:
+            _LOGGER.error("Cannot read device inventory %s: %s", self.file_path, exc)
+            return False
+        if not isinstance(content, dict) or content.get("version") != INVENTORY_FILE_VERSION:
+            _LOGGER.warning("Device inventory %s has unsupported format.", self.file_path)
+            return False
+        devices = content.get("devices")
+        if not isinstance(devices, dict):
+            return False
+        for mac_addr, entry in devices.items():
+            try:
+                self._entries[mac_addr] = self.__parse_entry(mac_addr, entry)
+            except (KeyError, TypeError, ValueError):
+                _LOGGER.warning("Skipped invalid device inventory entry %s.", mac_addr)
+        return True
+
+    @staticmethod
+    def __parse_entry(mac_addr: str, entry: dict) -> tuple:
+        """Parse and validate single entry. Raise ValueError if it is not valid."""
+        if len(mac_addr) != 12:
+            raise ValueError(mac_addr)
+        bytes.fromhex(mac_addr)
+        dev_type = entry["dev_type"]
+        if (not isinstance(dev_type, int) or dev_type not in DEVICES
+                or dev_type == DEVICE_TYPE_GATE):
+            raise ValueError(dev_type)
+        if not isinstance(entry["host"], str) or not isinstance(entry["api_key"], str):
+            raise ValueError(entry)
+        device_data = DeviceData(entry.get("name"), entry["host"], entry["api_key"],
+            mac_addr, dev_type)
+        device_info = None
+        if entry.get("device_info") is not None:
+            device_info = RestApiDeviceInfoResponse(**entry["device_info"])
+        return device_data, device_info
+
+    def save(self):
+        """Save inventory to file.
+
+        File is replaced atomically, so crash during save never leaves broken inventory.
+        """
+        devices = {}
+        for mac_addr, (device_data, device_info) in self._entries.items():
+            devices[mac_addr] = {
+                "name": device_data.name,
+                "host": device_data.host,
+                "api_key": device_data.api_key,
+                "dev_type": device_data.dev_type,
+                "device_info": (
+                    device_info_to_dict(device_info) if device_info is not None else None
+                )
+            }
+        directory = os.path.dirname(os.path.abspath(self.file_path))
+        file_descriptor, temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(file_descriptor, "w", encoding="utf-8") as temp_file:
+                json.dump({"version": INVENTORY_FILE_VERSION, "devices": devices}, temp_file)
+                temp_file.flush()
+                os.fsync(temp_file.fileno())
+            os.replace(temp_path, self.file_path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+
+    def get_device_data(self, mac_addr: str = None) -> DeviceData | list:
+        """Return DeviceData of given device or list of all stored devices."""
+        if mac_addr is not None:
+            entry = self._entries.get(mac_addr)
+            return entry[0] if entry is not None else None
+        return [device_data for device_data, _ in self._entries.values()]
+
+    def get_device_info(self, mac_addr: str) -> RestApiDeviceInfoResponse:
+        """Return cached device info or None."""
+        entry = self._entries.get(mac_addr)
+        return entry[1] if entry is not None else None
+
+    def update(self, device_data: DeviceData,
+                device_info: RestApiDeviceInfoResponse = None) -> bool:
+        """Add or update device entry.
+
+        Cached device info is dropped when IP address changes, new device info
+        replaces cached one. Copy of device data is stored, given object is not changed.
+
+        Keyword arguments:
+        device_data -- device connection data
+        device_info -- optional, fetched device info
+
+        Return: true if entry was added or changed.
+        """
+        device_data = copy.copy(device_data)
+        entry = self._entries.get(device_data.mac_addr)
+        if entry is None:
+            self._entries[device_data.mac_addr] = (device_data, device_info)
+            return True
+        stored_data, stored_info = entry
+        changed = False
+        if stored_data.host != device_data.host or stored_data.dev_type != device_data.dev_type:
+            stored_info = None
+            changed = True
+        if device_info is not None:
+            if stored_info is None or stored_info.firmware != device_info.firmware:
+                changed = True
+            stored_info = device_info
+        if stored_data.name != device_data.name and device_data.name is not None:
+            changed = True
+        if not changed:
+            return False
+        if device_data.name is None:
+            device_data.name = stored_data.name
+        self._entries[device_data.mac_addr] = (device_data, stored_info)
+        return True
+
+    def remove(self, mac_addr: str):
+        """Remove device entry."""
+        self._entries.pop(mac_addr, None)
+
+    def apply_discovery(self, discovered_devices: list) -> list:
+        """Update entries with discovered devices.
+
+        Keyword arguments:
+        discovered_devices -- DeviceData list returned by FoxServiceDiscovery
+
+        Return: mac addresses of new devices and devices with changed IP address.
+        Device objects of these devices should be created again.
+        """
+        changed = []
+        for discovered in discovered_devices:
+            stored = self.get_device_data(discovered.mac_addr)
+            if stored is not None and stored.host == discovered.host:
+                continue
+            api_key = stored.api_key if stored is not None else discovered.api_key
+            self.update(DeviceData(None, discovered.host, api_key, discovered.mac_addr,
+                discovered.dev_type))
+            changed.append(discovered.mac_addr)
+        return changed
+
+    def create_devices(self, session_pool: RestApiSessionPool = None) -> list:
+        """Create device objects of all stored devices.
+
+        Cached device info is restored, so devices are usable without
+        calling async_fetch_device_info().
+
+        Keyword arguments:
+        session_pool -- optional, connection pool shared with devices
+        """
+        devices = []
+        for device_data, device_info in self._entries.values():
+            try:
+                device = create_device(device_data, session_pool)
+            except UnsupportedDevice:
+                continue
+            if device_info is not None:
+                device.device_info_data = device_info
+                if device_info.device_name is not None:
+                    device.name = device_info.device_friendly_name
+            devices.append(device)
+        return devices
+
+    async def async_validate(self, devices: list,
+                            max_concurrency: int = INVENTORY_VALIDATION_CONCURRENCY,
+                            save: bool = True) -> list:
+        """Check stored entries against devices. Can be run in background after start.
+
+        Device info is fetched from every device and replaces cached one. Entry is
+        invalidated when firmware changed. Unreachable devices keep cached data.
+
+        Keyword arguments:
+        devices -- FoxBaseDevice objects to check
+        max_concurrency -- max devices checked at the same time
+        save -- save inventory file if any entry changed
+
+        Return: mac addresses of changed entries.
+        """
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async def async_validate_device(device: FoxBaseDevice) -> bool:
+            async with semaphore:
+                #Cached response would hide firmware change.
+                fetched = await device.async_fetch_device_info(max_age=0)
+            if not fetched or device.device_info_data.status != API_RESPONSE_STATUS_OK:
+                return False
+            return self.update(device.get_device_data(), device.device_info_data)
+
+        results = await asyncio.gather(*[async_validate_device(device) for device in devices])
+        changed = [device.mac_addr for device, result in zip(devices, results) if result]
+        if changed and save:
+            self.save()
+        return changed
@@ -1,5 +1,7 @@
 """F&F Fox DIM1S2 device implementation."""
 
+from foxrestapiclient.connection.rest_api_session import RestApiSessionPool
+
 from .fox_base_device import DeviceData
 from .fox_dimmable_device import FoxDimmableDevice
 
@@ -7,9 +9,9 @@ from .fox_dimmable_device import FoxDimmableDevice
 class FoxDIM1S2Device(FoxDimmableDevice):
     """DIM1S2 device one channel dimmer 230V."""
 
-    def __init__(self, device_data: DeviceData):
+    def __init__(self, device_data: DeviceData, session_pool: RestApiSessionPool = None):
         """Initalize object."""
-        super().__init__(device_data)
+        super().__init__(device_data, session_pool)
         self.brightness = 0
         self.state = False
 
@@ -17,11 +19,20 @@ class FoxDIM1S2Device(FoxDimmableDevice):
         """Return device state idicates to turn on or off."""
         return self.state
 
+    def get_state_values(self) -> dict:
+        """Return last fetched state and brightness."""
+        return {("state", None): self.state, ("brightness", None): self.brightness}
+
     async def async_fetch_update(self):
         """Fetch all available data from device."""
-        self.state = await self.async_fetch_channel_state()
-        channel_brightness = await self.async_fetch_channel_brightness()
-        if isinstance(channel_brightness, list) and channel_brightness:
-            self.brightness = channel_brightness[0]
-        else:
-            self.brightness = 0
+        with self._trace_update():
+            state, channel_brightness = await self._async_run_reads(
+                self.async_fetch_channel_state, self.async_fetch_channel_brightness)
+            #None means read was dropped, previous value is kept
+            if state is not None:
+                self.state = state
+            if isinstance(channel_brightness, list) and channel_brightness:
+                self.brightness = channel_brightness[0]
+            elif channel_brightness is not None:
+                self.brightness = 0
+            await self._async_publish_state_changes()
@@ -1,14 +1,14 @@
 """Fox dimmable device implementation."""
 
-import json
-
 from foxrestapiclient.connection import _LOGGER
-from foxrestapiclient.connection.const import (API_RESPONSE_STATUS_FAIL,
+from foxrestapiclient.connection.const import (API_RESPONSE_STATUS_DROPPED,
+                                               API_RESPONSE_STATUS_FAIL,
                                                API_RESPONSE_STATUS_INVALID,
                                                REQUEST_CHANNEL_KEY)
 from foxrestapiclient.connection.rest_api_client import RestApiClient
 from foxrestapiclient.connection.rest_api_responses import (
-    RestApiBaseResponse, RestApiBrightnessResponse)
+    RestApiBaseResponse, RestApiBrightnessResponse, RestApiError, parse_response)
+from foxrestapiclient.connection.rest_api_session import RestApiSessionPool
 
 from .const import API_DIMMABLE_GET_BRIGHTNESS, API_DIMMABLE_SET_BRIGHTNESS
 from .fox_base_device import DeviceData, FoxBaseDevice
@@ -17,9 +17,9 @@ from .fox_base_device import DeviceData, FoxBaseDevice
 class FoxDimmableDevice(FoxBaseDevice):
     """Fox Dimmable device implementation. Base class for any device with dimmable feature."""
 
-    def __init__(self, device_data: DeviceData):
+    def __init__(self, device_data: DeviceData, session_pool: RestApiSessionPool = None):
         """Initialize object."""
-        super().__init__(device_data)
+        super().__init__(device_data, session_pool)
         #Extened RestApi methods, specific for device
         self.__device_api_client = self.DeviceRestApiImplementer(self._rest_api_client)
 
@@ -30,19 +30,24 @@ class FoxDimmableDevice(FoxBaseDevice):
             """Initialize object."""
             self._rest_api_client = rest_api_client
 
-        async def async_get_brightness_value(self, params) -> RestApiBrightnessResponse:
+        async def async_get_brightness_value(self, params,
+                                            max_age: float = None) -> RestApiBrightnessResponse:
             """Get brightness value by given channel.
 
             Keyword arguments:
             params -- params dictionary, should contain channel number
+            max_age -- optional, accept cached response not older than given seconds
             Return:
             RestApiBrightnessResponse
             """
             device_response = await self._rest_api_client.async_make_api_call_get(
-                API_DIMMABLE_GET_BRIGHTNESS, params)
+                API_DIMMABLE_GET_BRIGHTNESS, params, max_age)
             if device_response is None:
                 return RestApiBrightnessResponse(status=API_RESPONSE_STATUS_FAIL)
-            return RestApiBrightnessResponse(**json.loads(device_response))
+            if isinstance(device_response, RestApiError):
+                return RestApiBrightnessResponse(status=API_RESPONSE_STATUS_DROPPED)
+            return parse_response(RestApiBrightnessResponse, device_response,
+                API_DIMMABLE_GET_BRIGHTNESS, self._rest_api_client.get_host())
 
         async def async_set_brighntess_value(self, params) -> RestApiBaseResponse:
             """Set brightness value.
@@ -56,24 +61,30 @@ class FoxDimmableDevice(FoxBaseDevice):
                 API_DIMMABLE_SET_BRIGHTNESS, params)
             if device_response is None:
                 return RestApiBaseResponse(API_RESPONSE_STATUS_FAIL)
-            return RestApiBaseResponse(**json.loads(device_response))
+            return parse_response(RestApiBaseResponse, device_response,
+                API_DIMMABLE_SET_BRIGHTNESS, self._rest_api_client.get_host())
 
-    async def async_fetch_channel_brightness(self, channel: int = 0) -> list:
+    async def async_fetch_channel_brightness(self, channel: int = 0,
+                                            max_age: float = None) -> list:
         """Fetch device brightness value by given channel.
 
         If channel number not provided fetch brightness from all channels.
 
         Keyword arguments:
         channel -- channel number
+        max_age -- optional, accept cached response not older than given seconds
         Return:
         list(int) -- readed values.
+        None -- read was dropped before it was sent.
         """
         params = None
         if channel != 0:
             params = {
                 REQUEST_CHANNEL_KEY: str(channel)
             }
-        device_response = await self.__device_api_client.async_get_brightness_value(params)
+        device_response = await self.__device_api_client.async_get_brightness_value(params, max_age)
+        if device_response.status == API_RESPONSE_STATUS_DROPPED:
+            return None
         if device_response.status in (API_RESPONSE_STATUS_FAIL, API_RESPONSE_STATUS_INVALID):
             return [0,0]
         values = []
@@ -91,6 +102,9 @@ class FoxDimmableDevice(FoxBaseDevice):
         Keyword arguments:
         brightness -- value from range <0-255>
         channel -- value from range <1-2> or None.
+
+        Return: False if arguments are out of range, WRITE_RESULT_SUPERSEDED if
+        coalesced write was replaced by newer value, True otherwise.
         """
         if brightness < 0 or brightness > 255:
             _LOGGER.warning(
@@ -105,8 +119,9 @@ class FoxDimmableDevice(FoxBaseDevice):
         }
         if channel is not None:
             params.update({REQUEST_CHANNEL_KEY: channel})
-        device_response = await self.__device_api_client.async_set_brighntess_value(params)
-        if device_response.status in (API_RESPONSE_STATUS_FAIL, API_RESPONSE_STATUS_INVALID):
+        write_result = await self._async_coalesced_write(("brightness", channel), params,
+            self.__device_api_client.async_set_brighntess_value)
+        if write_result.result.status in (API_RESPONSE_STATUS_FAIL, API_RESPONSE_STATUS_INVALID):
             _LOGGER.error("Setting brightness value in async_update_channel_brightness() failed.")
-        return True
+        return self._get_write_result(write_result)
 
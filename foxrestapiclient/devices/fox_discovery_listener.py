@@ -0,0 +1,189 @@
+"""Continuous discovery of F&F Fox devices keeping live devices index."""
+from __future__ import annotations
+
+import asyncio
+import time
+from typing import Callable, Tuple
+
+from foxrestapiclient.connection import _LOGGER
+
+from .const import (DISCOVERY_EVENT_ADDED, DISCOVERY_EVENT_CHANGED,
+                    DISCOVERY_EVENT_REMOVED,
+                    DISCOVERY_LISTENER_EXPIRE_AFTER,
+                    DISCOVERY_LISTENER_PROBE_INTERVAL, DISCOVERY_LOCAL_PORT,
+                    DISCOVERY_PROBE_BACKOFF, DISCOVERY_PROBE_INITIAL_INTERVAL)
+from .fox_base_device import DeviceData
+from .fox_network import get_probe_targets
+from .fox_service_discovery import (async_open_probe_endpoints, close_probe_endpoints,
+                                    parse_discovery_datagram, send_probes)
+
+
+class FoxDiscoveryEvent:
+    """Change of discovered devices index."""
+
+    __slots__ = ("kind", "device", "previous")
+
+    def __init__(self, kind: str, device: DeviceData, previous: DeviceData = None) -> None:
+        """Construct event.
+
+        Keyword arguments:
+        kind -- DISCOVERY_EVENT_ADDED, DISCOVERY_EVENT_CHANGED or DISCOVERY_EVENT_REMOVED
+        device -- current device data, last known data for removed device
+        previous -- previous device data of changed device
+        """
+        self.kind = kind
+        self.device = device
+        self.previous = previous
+
+
+class FoxDiscoveryListener:
+    """Long running discovery service.
+
+    Stays bound to discovery port and probes network at low rate, so devices
+    which reboot, change IP address or join later are noticed without full
+    rediscovery. Devices silent for expire_after seconds are removed.
+    Subscribers receive FoxDiscoveryEvent for every index change.
+    """
+
+    def __init__(self, discovery_address: Tuple[str, int] = None,
+                local_port: int = DISCOVERY_LOCAL_PORT, interface_names: list = None,
+                probe_interval: float = DISCOVERY_LISTENER_PROBE_INTERVAL,
+                expire_after: float = DISCOVERY_LISTENER_EXPIRE_AFTER,
+                known_devices: list = None) -> None:
+        """Construct listener.
+
+        Keyword arguments:
+        discovery_address -- optional, fixed address and port where probes are sent
+            instead of per interface broadcasts
+        local_port -- local UDP port used to receive responses
+        interface_names -- optional, send broadcasts only on given interfaces
+        probe_interval -- interval between probes in seconds, first probes after
+            start are sent more often
+        expire_after -- remove device not seen for given seconds, should be few
+            times longer than probe_interval
+        known_devices -- optional, DeviceData list used as initial index, e.g.
+            from FoxDeviceInventory. These devices are expired like others.
+        """
+        self.discovery_address = discovery_address
+        self.local_port = local_port
+        self.interface_names = interface_names
+        self.probe_interval = probe_interval
+        self.expire_after = expire_after
+        #Known devices, key: mac address
+        self._devices = {}
+        #Last response time, key: mac address
+        self._last_seen = {}
+        self.__subscribers = []
+        self.__endpoints = []
+        self.__probe_task: asyncio.Task = None
+        now = time.monotonic()
+        for device in known_devices or []:
+            self._devices[device.mac_addr] = device
+            self._last_seen[device.mac_addr] = now
+
+    async def __aenter__(self) -> FoxDiscoveryListener:
+        """Start listener."""
+        await self.async_start()
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        """Stop listener."""
+        self.stop()
+
+    def subscribe(self, callback: Callable[[FoxDiscoveryEvent], None]) -> Callable[[], None]:
+        """Register callback called with every FoxDiscoveryEvent.
+
+        Return: function which unregisters callback.
+        """
+        self.__subscribers.append(callback)
+        return lambda: self.__subscribers.remove(callback)
+
+    def get_devices(self) -> list:
+        """Return known devices."""
+        return list(self._devices.values())
+
+    def get_device(self, mac_addr: str) -> DeviceData:
+        """Return known device by mac address or None."""
+        return self._devices.get(mac_addr)
+
+    def get_last_seen(self, mac_addr: str) -> float:
+        """Return time.monotonic() of last device response or None."""
+        return self._last_seen.get(mac_addr)
+
+    def is_running(self) -> bool:
+        """Return true if listener is started."""
+        return self.__probe_task is not None
+
+    async def async_start(self):
+        """Bind discovery port and start probing."""
+        if self.is_running():
+            return
+        self.__endpoints = await async_open_probe_endpoints(
+            get_probe_targets(self.discovery_address, self.interface_names),
+            self.local_port, self.parse_received_datagram)
+        self.__probe_task = asyncio.get_running_loop().create_task(self.__async_probe())
+
+    def stop(self):
+        """Stop probing and close discovery port. Index is kept."""
+        if self.__probe_task is not None:
+            self.__probe_task.cancel()
+            self.__probe_task = None
+        close_probe_endpoints(self.__endpoints)
+        self.__endpoints = []
+
+    def probe(self):
+        """Send discovery probe now."""
+        send_probes(self.__endpoints)
+
+    def parse_received_datagram(self, data: bytes, addr):
+        """Parse UDP message and update devices index."""
+        device = parse_discovery_datagram(data, addr)
+        if device is None:
+            return
+        self._last_seen[device.mac_addr] = time.monotonic()
+        previous = self._devices.get(device.mac_addr)
+        if previous is None:
+            self._devices[device.mac_addr] = device
+            self.__notify(FoxDiscoveryEvent(DISCOVERY_EVENT_ADDED, device))
+            return
+        if previous.host == device.host and previous.dev_type == device.dev_type:
+            return
+        #Keep api key and name of known device
+        device.api_key = previous.api_key
+        device.name = previous.name
+        self._devices[device.mac_addr] = device
+        self.__notify(FoxDiscoveryEvent(DISCOVERY_EVENT_CHANGED, device, previous))
+
+    def expire(self, now: float = None) -> list:
+        """Remove devices not seen for expire_after seconds.
+
+        Return: removed devices.
+        """
+        if now is None:
+            now = time.monotonic()
+        removed = []
+        for mac_addr, last_seen in list(self._last_seen.items()):
+            if now - last_seen < self.expire_after:
+                continue
+            del self._last_seen[mac_addr]
+            device = self._devices.pop(mac_addr)
+            removed.append(device)
+            self.__notify(FoxDiscoveryEvent(DISCOVERY_EVENT_REMOVED, device))
+        return removed
+
+    def __notify(self, event: FoxDiscoveryEvent):
+        """Send event to subscribers."""
+        for callback in list(self.__subscribers):
+            try:
+                callback(event)
+            except Exception as exception:
+                _LOGGER.error("Discovery event subscriber failed: %s", exception)
+
+    async def __async_probe(self):
+        """Probe network until stopped. First probes are sent with backoff."""
+        interval = min(DISCOVERY_PROBE_INITIAL_INTERVAL, self.probe_interval)
+        while True:
+            self.probe()
+            await asyncio.sleep(interval)
+            self.expire()
+            interval = min(interval * DISCOVERY_PROBE_BACKOFF, self.probe_interval)
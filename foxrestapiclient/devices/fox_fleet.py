@@ -0,0 +1,213 @@
+"""F&F Fox fleet implementation. Polls many devices with bounded concurrency."""
+from __future__ import annotations
+
+import asyncio
+import time
+
+from foxrestapiclient.connection import _LOGGER
+
+from .const import (FLEET_DEFAULT_MAX_CONCURRENCY, FLEET_DEFAULT_POLL_TIMEOUT,
+                    FLEET_DEFAULT_SPREAD_RATIO, SUBSCRIPTION_BLOCK_TIMEOUT,
+                    SUBSCRIPTION_DEFAULT_MAX_SIZE, SUBSCRIPTION_OVERFLOW_DROP_OLDEST)
+from .fox_base_device import FoxBaseDevice
+from .fox_fleet_snapshot import FoxFleetSnapshot
+from .fox_subscription import FoxSubscription
+
+
+class FoxFleetPollResult:
+    """Result of single fleet poll cycle."""
+
+    def __init__(self) -> None:
+        """Construct empty result."""
+        #Lists of device mac addresses
+        self.succeeded = []
+        self.failed = []
+        self.timed_out = []
+        #Poll duration in seconds, key: device mac address
+        self.device_durations = {}
+        #Whole cycle duration in seconds
+        self.duration = 0.0
+
+    def get_polled_count(self) -> int:
+        """Return number of polled devices."""
+        return len(self.succeeded) + len(self.failed) + len(self.timed_out)
+
+
+class FoxFleet:
+    """Holds many F&F Fox devices and refreshes them with bounded concurrency.
+
+    Devices poll start is spread across given time to avoid request bursts
+    on WiFi network on every poll cycle. State of polled devices is written
+    to columnar snapshot used for fleet-wide aggregation.
+    """
+
+    def __init__(self, devices: list = None,
+                max_concurrency: int = FLEET_DEFAULT_MAX_CONCURRENCY,
+                poll_timeout: float = FLEET_DEFAULT_POLL_TIMEOUT,
+                spread_ratio: float = FLEET_DEFAULT_SPREAD_RATIO):
+        """Construct fleet.
+
+        Keyword arguments:
+        devices -- optional, list of FoxBaseDevice objects
+        max_concurrency -- max number of devices polled at the same time
+        poll_timeout -- single device poll timeout in seconds
+        spread_ratio -- part of poll interval used to spread devices poll start,
+            used by async_run()
+        """
+        self.max_concurrency = max_concurrency
+        self.poll_timeout = poll_timeout
+        self.spread_ratio = spread_ratio
+        self.last_poll_result: FoxFleetPollResult = None
+        self.snapshot = FoxFleetSnapshot()
+        self._devices = {}
+        #Incremented when device is added or removed
+        self.devices_version = 0
+        self.__subscriptions = []
+        self.__running = False
+        self.__semaphore = None
+        self.__semaphore_loop = None
+        for device in devices or []:
+            self.add_device(device)
+
+    def add_device(self, device: FoxBaseDevice):
+        """Add device to fleet. Device with the same mac address is replaced."""
+        if device.mac_addr in self._devices:
+            self.remove_device(device.mac_addr)
+        self._devices[device.mac_addr] = device
+        self.devices_version += 1
+        for subscription in self.__subscriptions:
+            device._add_subscription(subscription)
+
+    def remove_device(self, mac_addr: str) -> FoxBaseDevice:
+        """Remove device from fleet and return it or None if not exist."""
+        self.snapshot.remove_device(mac_addr)
+        device = self._devices.pop(mac_addr, None)
+        if device is not None:
+            self.devices_version += 1
+            for subscription in self.__subscriptions:
+                device._remove_subscription(subscription)
+        return device
+
+    def subscribe(self, max_size: int = SUBSCRIPTION_DEFAULT_MAX_SIZE,
+                overflow: str = SUBSCRIPTION_OVERFLOW_DROP_OLDEST,
+                block_timeout: float = SUBSCRIPTION_BLOCK_TIMEOUT) -> FoxSubscription:
+        """Return subscription of updates of all fleet devices, devices added later included.
+
+        Keyword arguments are the same as in FoxBaseDevice.subscribe().
+        Conflate policy keeps the latest update per device.
+        """
+        subscription = FoxSubscription(max_size, overflow, block_timeout,
+            on_close=self.__remove_subscription)
+        self.__subscriptions.append(subscription)
+        for device in self._devices.values():
+            device._add_subscription(subscription)
+        return subscription
+
+    def __remove_subscription(self, subscription: FoxSubscription):
+        """Detach closed subscription from all devices."""
+        if subscription in self.__subscriptions:
+            self.__subscriptions.remove(subscription)
+        for device in self._devices.values():
+            device._remove_subscription(subscription)
+
+    def get_device(self, mac_addr: str) -> FoxBaseDevice:
+        """Return device by mac address or None if not exist."""
+        return self._devices.get(mac_addr)
+
+    def get_devices(self) -> list:
+        """Return all fleet devices."""
+        return list(self._devices.values())
+
+    def __get_semaphore(self) -> asyncio.Semaphore:
+        """Return semaphore limiting devices polled at the same time.
+
+        Semaphore is shared by polls running at once, e.g. by adaptive poller.
+        """
+        loop = asyncio.get_running_loop()
+        if self.__semaphore is None or self.__semaphore_loop is not loop:
+            self.__semaphore = asyncio.Semaphore(self.max_concurrency)
+            self.__semaphore_loop = loop
+        return self.__semaphore
+
+    async def async_poll(self, spread: float = 0, devices: list = None) -> FoxFleetPollResult:
+        """Refresh all devices once.
+
+        Keyword arguments:
+        spread -- time in seconds across which devices poll start is spread.
+        devices -- optional, refresh only given devices
+
+        Return: FoxFleetPollResult
+        """
+        result = FoxFleetPollResult()
+        if devices is None:
+            devices = self.get_devices()
+        if not devices:
+            return result
+        semaphore = self.__get_semaphore()
+        step = spread / len(devices)
+        cycle_start = time.monotonic()
+        await asyncio.gather(*[
+            self.__async_poll_device(device, index * step, semaphore, result)
+            for index, device in enumerate(devices)
+        ])
+        result.duration = time.monotonic() - cycle_start
+        self.last_poll_result = result
+        return result
+
+    async def __async_poll_device(self, device: FoxBaseDevice, delay: float,
+                                semaphore: asyncio.Semaphore, result: FoxFleetPollResult):
+        """Poll single device after given delay and store outcome in result."""
+        if delay > 0:
+            await asyncio.sleep(delay)
+        async with semaphore:
+            start = time.monotonic()
+            try:
+                await asyncio.wait_for(device.async_fetch_update(), self.poll_timeout)
+                self.snapshot.update_device(device)
+                if device.is_available:
+                    result.succeeded.append(device.mac_addr)
+                else:
+                    result.failed.append(device.mac_addr)
+            except asyncio.TimeoutError:
+                _LOGGER.warning("Device %s poll timed out.", device.mac_addr)
+                await self.__async_mark_unavailable(device)
+                result.timed_out.append(device.mac_addr)
+            except Exception as exception:
+                _LOGGER.error("Device %s poll failed, %s", device.mac_addr, exception)
+                await self.__async_mark_unavailable(device)
+                result.failed.append(device.mac_addr)
+            result.device_durations[device.mac_addr] = time.monotonic() - start
+
+    async def __async_mark_unavailable(self, device: FoxBaseDevice):
+        """Mark device which did not finish poll unavailable and publish the change."""
+        device.is_available = False
+        self.snapshot.mark_unavailable(device)
+        try:
+            await device._async_publish_state_changes()
+        except Exception as exception:
+            _LOGGER.error("Device %s state publish failed, %s", device.mac_addr, exception)
+
+    async def async_run(self, interval: float, callback = None):
+        """Poll devices every interval seconds until stop() is called.
+
+        Keyword arguments:
+        interval -- poll cycle interval in seconds
+        callback -- optional, called with FoxFleetPollResult after each cycle
+        """
+        self.__running = True
+        while self.__running:
+            cycle_start = time.monotonic()
+            result = await self.async_poll(interval * self.spread_ratio)
+            if callback is not None:
+                callback(result)
+            await asyncio.sleep(max(interval - (time.monotonic() - cycle_start), 0))
+
+    def stop(self):
+        """Stop polling started by async_run()."""
+        self.__running = False
+
+    async def async_close(self):
+        """Stop polling and close all devices clients."""
+        self.stop()
+        for device in self.get_devices():
+            await device.async_close()
@@ -0,0 +1,252 @@
+"""Columnar snapshot of F&F Fox fleet state used for fleet-wide aggregation."""
+from __future__ import annotations
+
+import time
+from array import array
+from typing import Callable
+
+try:
+    import numpy
+except ImportError:
+    #Optional, columns are returned as array.array without it
+    numpy = None
+
+from .const import SNAPSHOT_META_FIELDS, SNAPSHOT_STATE_FIELDS
+from .fox_base_device import FoxBaseDevice
+from .fox_sensor_history import NAN, to_float
+
+#Group code of rows without group
+NO_GROUP = -1
+
+
+class FoxFleetSnapshot:
+    """Current state of fleet stored in columns, one row per device channel.
+
+    Every column is array of doubles, booleans are stored as 1/0 and missing
+    values as NaN. Rows are updated in place when device refreshes, so
+    snapshot is never rebuilt from device objects. Columns are exported as
+    NumPy arrays if NumPy is installed.
+    """
+
+    def __init__(self) -> None:
+        """Construct empty snapshot."""
+        self.fields = SNAPSHOT_STATE_FIELDS + SNAPSHOT_META_FIELDS
+        self._columns = {field: array("d") for field in self.fields}
+        #Row keys: (mac address, channel), channel 0 holds device wide values
+        self._row_keys = []
+        #Row index, key: (mac address, channel)
+        self._rows = {}
+        #Row keys, key: mac address
+        self._device_rows = {}
+        #Group labels, index is group code
+        self._group_labels = []
+        #Group code, key: mac address
+        self._device_groups = {}
+
+    def __len__(self) -> int:
+        """Return number of rows."""
+        return len(self._row_keys)
+
+    def get_row_keys(self) -> list:
+        """Return (mac address, channel) of every row in column order."""
+        return list(self._row_keys)
+
+    def set_group(self, mac_addr: str, label: str):
+        """Assign device to group, e.g. floor or room, used by group aggregations."""
+        if label is None:
+            code = NO_GROUP
+        elif label in self._group_labels:
+            code = self._group_labels.index(label)
+        else:
+            code = len(self._group_labels)
+            self._group_labels.append(label)
+        self._device_groups[mac_addr] = code
+        column = self._columns["group"]
+        for key in self._device_rows.get(mac_addr, ()):
+            column[self._rows[key]] = code
+
+    def update_device(self, device: FoxBaseDevice, timestamp: float = None):
+        """Write current device state into its rows.
+
+        Keyword arguments:
+        device -- refreshed device
+        timestamp -- optional, time.time() of update, current time if not provided
+        """
+        if timestamp is None:
+            timestamp = time.time()
+        channel_values = {}
+        for (field, channel), value in device.get_state_values().items():
+            channel_values.setdefault(channel or 0, {})[field] = value
+        if not channel_values:
+            channel_values[0] = {}
+        available = 1.0 if device.is_available else 0.0
+        for channel, values in channel_values.items():
+            row = self.__get_row(device, channel)
+            for field in SNAPSHOT_STATE_FIELDS:
+                self._columns[field][row] = to_number(values.get(field))
+            self._columns["available"][row] = available
+            self._columns["updated"][row] = timestamp
+
+    def mark_unavailable(self, device: FoxBaseDevice, timestamp: float = None):
+        """Mark rows of device which did not answer refresh as unavailable, values are kept.
+
+        Keyword arguments:
+        device -- device which refresh timed out or failed
+        timestamp -- optional, time.time() of update, current time if not provided
+        """
+        if timestamp is None:
+            timestamp = time.time()
+        keys = self._device_rows.get(device.mac_addr)
+        rows = ([self._rows[key] for key in keys] if keys
+            else [self.__get_row(device, 0)])
+        for row in rows:
+            self._columns["available"][row] = 0.0
+            self._columns["updated"][row] = timestamp
+
+    def remove_device(self, mac_addr: str):
+        """Remove rows of device."""
+        for key in self._device_rows.pop(mac_addr, ()):
+            row = self._rows.pop(key)
+            last = len(self._row_keys) - 1
+            if row != last:
+                #Move last row into the gap, order of rows is not kept.
+                last_key = self._row_keys[last]
+                for column in self._columns.values():
+                    column[row] = column[last]
+                self._row_keys[row] = last_key
+                self._rows[last_key] = row
+            self._row_keys.pop()
+            for column in self._columns.values():
+                column.pop()
+
+    def get_column(self, field: str):
+        """Return copy of column, numpy.ndarray if NumPy is installed, array.array otherwise."""
+        column = self._columns[field]
+        if numpy is not None:
+            return numpy.array(column, dtype=numpy.float64)
+        return array("d", column)
+
+    def __view(self, field: str):
+        """Return NumPy view of column without copying, used only inside aggregation.
+
+        Column cannot be resized while view exists, so view must not be kept.
+        """
+        column = self._columns[field]
+        if not column:
+            return numpy.empty(0, dtype=numpy.float64)
+        return numpy.frombuffer(column, dtype=numpy.float64)
+
+    def get_columns(self) -> dict:
+        """Return copies of all columns, key: field name."""
+        return {field: self.get_column(field) for field in self.fields}
+
+    def mask(self, field: str, predicate: Callable) -> list:
+        """Return rows selection where predicate of field value is true.
+
+        Predicate must accept single value and NumPy array, e.g. lambda value: value > 0.
+        Selections can be combined with & and | when NumPy is installed.
+        """
+        if numpy is not None:
+            return numpy.array(predicate(self.__view(field)), dtype=bool)
+        return [bool(predicate(value)) for value in self._columns[field]]
+
+    def sum(self, field: str, where = None) -> float:
+        """Return sum of field values of selected rows, NaN values are skipped.
+
+        Keyword arguments:
+        field -- field name
+        where -- optional, rows selection returned by mask()
+        """
+        if numpy is not None:
+            column = self.__view(field)
+            if where is not None:
+                column = column[where]
+            return float(numpy.nansum(column))
+        return sum(value for value in self.__selected(field, where) if value == value)
+
+    def count(self, where = None) -> int:
+        """Return number of selected rows."""
+        if where is None:
+            return len(self._row_keys)
+        if numpy is not None:
+            return int(numpy.count_nonzero(where))
+        return int(sum(1 for selected in where if selected))
+
+    def group_sum(self, field: str, where = None) -> dict:
+        """Return sum of field values per group, key: group label. NaN values are skipped."""
+        sums, counts = self.__group_reduce(field, where)
+        return {self.__get_group_label(code): sums[code]
+            for code in range(len(counts)) if counts[code]}
+
+    def group_count(self, where = None) -> dict:
+        """Return number of selected rows per group, key: group label."""
+        _, counts = self.__group_reduce(None, where)
+        return {self.__get_group_label(code): counts[code]
+            for code in range(len(counts)) if counts[code]}
+
+    def __group_reduce(self, field: str = None, where = None) -> tuple:
+        """Return sums of field and rows count per group code shifted by one.
+
+        Index 0 holds rows without group.
+        """
+        groups_count = len(self._group_labels) + 1
+        if numpy is not None:
+            codes = self.__view("group").astype(numpy.int64) + 1
+            values = (numpy.nan_to_num(self.__view(field)) if field is not None
+                else numpy.zeros(len(codes)))
+            if where is not None:
+                codes = codes[where]
+                values = values[where]
+            sums = numpy.bincount(codes, weights=values, minlength=groups_count)
+            counts = numpy.bincount(codes, minlength=groups_count)
+            return [float(value) for value in sums], [int(value) for value in counts]
+        sums = [0.0] * groups_count
+        counts = [0] * groups_count
+        groups = self._columns["group"]
+        values = self._columns[field] if field is not None else None
+        for row in range(len(self._row_keys)):
+            if where is not None and not where[row]:
+                continue
+            code = int(groups[row]) + 1
+            counts[code] += 1
+            if values is not None and values[row] == values[row]:
+                sums[code] += values[row]
+        return sums, counts
+
+    def __get_group_label(self, code: int) -> str:
+        """Return group label of shifted group code, None for rows without group."""
+        return self._group_labels[code - 1] if code > 0 else None
+
+    def __selected(self, field: str, where = None):
+        """Yield field values of selected rows."""
+        values = self._columns[field]
+        if where is None:
+            yield from values
+            return
+        for value, selected in zip(values, where):
+            if selected:
+                yield value
+
+    def __get_row(self, device: FoxBaseDevice, channel: int) -> int:
+        """Return row index of device channel, append row if needed."""
+        key = (device.mac_addr, channel)
+        row = self._rows.get(key)
+        if row is not None:
+            return row
+        row = len(self._row_keys)
+        self._row_keys.append(key)
+        self._rows[key] = row
+        self._device_rows.setdefault(device.mac_addr, []).append(key)
+        for column in self._columns.values():
+            column.append(NAN)
+        self._columns["dev_type"][row] = device.dev_type
+        self._columns["channel"][row] = channel
+        self._columns["group"][row] = self._device_groups.get(device.mac_addr, NO_GROUP)
+        return row
+
+
+def to_number(value) -> float:
+    """Convert state value to float, booleans to 1/0 and missing values to NaN."""
+    if isinstance(value, bool):
+        return 1.0 if value else 0.0
+    return to_float(value)
@@ -1,6 +1,7 @@
 """F&F Fox LED2S2 device implementation."""
 
 from foxrestapiclient.connection import _LOGGER
+from foxrestapiclient.connection.rest_api_session import RestApiSessionPool
 
 from .fox_base_device import DeviceData
 from .fox_dimmable_device import FoxDimmableDevice
@@ -9,9 +10,9 @@ from .fox_dimmable_device import FoxDimmableDevice
 class FoxLED2S2Device(FoxDimmableDevice):
     """LED2S2 Device implementation."""
 
-    def __init__(self, device_data: DeviceData):
+    def __init__(self, device_data: DeviceData, session_pool: RestApiSessionPool = None):
         """Initialze object."""
-        super().__init__(device_data)
+        super().__init__(device_data, session_pool)
         #This device has two channels
         self.channels = [1, 2]
         self.channel_one_state = False
@@ -31,6 +32,15 @@ class FoxLED2S2Device(FoxDimmableDevice):
             return False
         return self.channel_one_state if channel == 1 else self.channel_two_state
 
+    def get_state_values(self) -> dict:
+        """Return last fetched channels state and brightness."""
+        return {
+            ("state", 1): self.channel_one_state,
+            ("state", 2): self.channel_two_state,
+            ("brightness", 1): self.channel_one_brightness,
+            ("brightness", 2): self.channel_two_brightness
+        }
+
     async def async_fetch_channel_one_state(self) -> bool:
         """Fetch device state on channel one."""
         self.channel_one_state = await self.async_fetch_channel_state(self.channels[0])
@@ -91,15 +101,16 @@ class FoxLED2S2Device(FoxDimmableDevice):
 
     async def async_fetch_update(self):
         """Fetch all available data from device."""
-        states = await self.async_fetch_channel_state()
-        if not isinstance(states, list):
-            self.__reset_channels_state()
-        else:
-            self.channel_one_state, self.channel_two_state = states
-        brightness = await self.async_fetch_channel_brightness()
-        if not isinstance(brightness, list):
-            self.__reset_channels_brightness()
-        elif isinstance(brightness, list) and len(brightness) < 2:
-            self.__reset_channels_brightness()
-        else:
-            self.channel_one_brightness, self.channel_two_brightness = brightness
+        with self._trace_update():
+            states, brightness = await self._async_run_reads(
+                self.async_fetch_channel_state, self.async_fetch_channel_brightness)
+            #None means read was dropped, previous values are kept
+            if isinstance(states, list):
+                self.channel_one_state, self.channel_two_state = states
+            elif states is not None:
+                self.__reset_channels_state()
+            if isinstance(brightness, list) and len(brightness) >= 2:
+                self.channel_one_brightness, self.channel_two_brightness = brightness
+            elif brightness is not None:
+                self.__reset_channels_brightness()
+            await self._async_publish_state_changes()
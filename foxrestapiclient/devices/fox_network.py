@@ -0,0 +1,106 @@
+"""Local network interfaces used by F&F Fox devices discovery."""
+from __future__ import annotations
+
+import ipaddress
+import socket
+import struct
+from typing import Tuple
+
+try:
+    import fcntl
+except ImportError:
+    #Not available on Windows
+    fcntl = None
+
+from foxrestapiclient.connection import _LOGGER
+
+from .const import DISCOVERY_BROADCAST_ADDRESS, DISCOVERY_DEVICE_PORT
+
+#Linux ioctl requests, see <linux/sockios.h>
+SIOCGIFFLAGS = 0x8913
+SIOCGIFADDR = 0x8915
+SIOCGIFNETMASK = 0x891b
+IFF_UP = 0x1
+IFF_BROADCAST = 0x2
+IFF_LOOPBACK = 0x8
+
+
+class NetworkInterface:
+    """Local IPv4 interface."""
+
+    __slots__ = ("name", "address", "netmask", "broadcast")
+
+    def __init__(self, name: str, address: str, netmask: str) -> None:
+        """Construct object, broadcast address is calculated from address and netmask."""
+        self.name = name
+        self.address = address
+        self.netmask = netmask
+        self.broadcast = str(
+            ipaddress.IPv4Network("{0}/{1}".format(address, netmask), strict=False)
+                .broadcast_address
+        )
+
+
+def _ioctl(sock: socket.socket, request: int, name: str) -> bytes:
+    """Call interface ioctl and return ifreq data."""
+    return fcntl.ioctl(sock.fileno(), request, struct.pack("256s", name[:15].encode()))
+
+
+def get_ipv4_interfaces(names: list = None) -> list:
+    """Return up, non loopback IPv4 interfaces supporting broadcast.
+
+    Interfaces are read with ioctl, empty list is returned on systems without
+    it, then discovery falls back to limited broadcast.
+
+    Keyword arguments:
+    names -- optional, return only interfaces with given names
+    """
+    interfaces = []
+    if fcntl is None:
+        return interfaces
+    try:
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    except OSError:
+        return interfaces
+    with sock:
+        try:
+            interface_names = [name for _, name in socket.if_nameindex()]
+        except (AttributeError, OSError):
+            return interfaces
+        for name in interface_names:
+            if names is not None and name not in names:
+                continue
+            try:
+                flags = struct.unpack("H", _ioctl(sock, SIOCGIFFLAGS, name)[16:18])[0]
+                if flags & IFF_LOOPBACK or not flags & IFF_UP or not flags & IFF_BROADCAST:
+                    continue
+                address = socket.inet_ntoa(_ioctl(sock, SIOCGIFADDR, name)[20:24])
+                netmask = socket.inet_ntoa(_ioctl(sock, SIOCGIFNETMASK, name)[20:24])
+            except OSError:
+                #No IPv4 address assigned
+                continue
+            interfaces.append(NetworkInterface(name, address, netmask))
+    return interfaces
+
+
+def get_probe_targets(discovery_address: Tuple[str, int] = None,
+                    interface_names: list = None) -> list:
+    """Return discovery probe targets.
+
+    Keyword arguments:
+    discovery_address -- optional, fixed address and port where probes are sent.
+        If not provided, directed broadcast is sent on every local interface.
+    interface_names -- optional, use only interfaces with given names
+
+    Return: list of (local address to bind, (address, port) where probe is sent).
+    """
+    if discovery_address is not None:
+        return [("0.0.0.0", discovery_address)]
+    targets = [
+        (interface.address, (interface.broadcast, DISCOVERY_DEVICE_PORT))
+        for interface in get_ipv4_interfaces(interface_names)
+    ]
+    if not targets:
+        _LOGGER.info("No broadcast interfaces found, limited broadcast is used.")
+        return [("0.0.0.0", (DISCOVERY_BROADCAST_ADDRESS, DISCOVERY_DEVICE_PORT))]
+    return targets
@@ -0,0 +1,237 @@
+"""OpenMetrics (Prometheus) text exporter of F&F Fox fleet and client statistics."""
+from __future__ import annotations
+
+from aiohttp import web
+
+from foxrestapiclient.connection.rest_api_metrics import RestApiMetricsAggregator
+
+from .const import (OPENMETRICS_CONTENT_TYPE, OPENMETRICS_DEFAULT_PORT,
+                    OPENMETRICS_PATH, OPENMETRICS_STATE_FAMILIES)
+from .fox_base_device import FoxBaseDevice
+from .fox_fleet import FoxFleet
+from .fox_fleet_snapshot import to_number
+
+AVAILABLE_FAMILY = ("fox_device_available", "gauge", "Device answered last refresh (1) or not (0)")
+#Client request metric families: (family name, type, unit, help)
+API_REQUESTS_FAMILY = ("fox_api_requests", "counter", None, "RestAPI requests")
+API_ERRORS_FAMILY = ("fox_api_errors", "counter", None, "Failed RestAPI requests by error type")
+API_BYTES_FAMILY = ("fox_api_received_bytes", "counter", "bytes", "Received response bodies size")
+API_DURATION_FAMILY = ("fox_api_request_duration_seconds", "histogram", "seconds",
+    "Latency of received RestAPI responses")
+
+
+class FoxOpenMetricsExporter:
+    """Renders device state and request metrics as OpenMetrics text.
+
+    Samples of device are rendered again only after device reported state
+    change (see FoxBaseDevice.add_state_change_listener), text of metric
+    family is rebuilt only if any of its samples changed. Request metrics of
+    host and api method are rendered again only if new request was recorded.
+    So scrape of big fleet mostly joins cached strings.
+    """
+
+    def __init__(self, fleet: FoxFleet = None, metrics: RestApiMetricsAggregator = None) -> None:
+        """Construct exporter.
+
+        Keyword arguments:
+        fleet -- optional, exported fleet, devices added to fleet later are exported too
+        metrics -- optional, request metrics aggregator registered in RestApiMetrics
+        """
+        self.metrics = metrics
+        self.__fleet = fleet
+        self.__fleet_version = None
+        self.__families = {field: (family, metric_type, help_text)
+            for field, family, metric_type, help_text in OPENMETRICS_STATE_FAMILIES}
+        #Families in output order: (family name, type, unit, help)
+        self.__family_order = [AVAILABLE_FAMILY[:2] + (None, AVAILABLE_FAMILY[2])] + [
+            (family, metric_type, None, help_text)
+            for family, metric_type, help_text in self.__families.values()]
+        #Exported devices, key: mac address, value: (device, unregister listener function)
+        self.__devices = {}
+        #Macs of devices which must be rendered again
+        self.__dirty = set()
+        #Rendered sample lines, key: family name, value: dict, key: mac address
+        self.__samples = {family[0]: {} for family in self.__family_order}
+        #Rendered sample lines of device, key: mac address, value: dict, key: family name
+        self.__device_samples = {}
+        #Rendered family text, None if it must be built again
+        self.__family_texts = {family[0]: None for family in self.__family_order}
+        #Rendered request metrics, key: (host, method), value: (requests count, lines by family)
+        self.__endpoint_samples = {}
+        self.__runner: web.AppRunner = None
+        #Number of device renders, shows how much work scrapes did
+        self.device_renders_count = 0
+
+    def add_device(self, device: FoxBaseDevice):
+        """Export device. Device with the same mac address is replaced."""
+        self.remove_device(device.mac_addr)
+        unregister = device.add_state_change_listener(self.__on_state_change)
+        self.__devices[device.mac_addr] = (device, unregister)
+        self.__dirty.add(device.mac_addr)
+
+    def remove_device(self, mac_addr: str):
+        """Stop exporting device."""
+        entry = self.__devices.pop(mac_addr, None)
+        if entry is None:
+            return
+        entry[1]()
+        self.__dirty.discard(mac_addr)
+        for family in self.__device_samples.pop(mac_addr, {}):
+            self.__samples[family].pop(mac_addr, None)
+            self.__family_texts[family] = None
+
+    def render(self) -> str:
+        """Return OpenMetrics text of exported devices and request metrics."""
+        self.__sync_fleet()
+        for mac_addr in self.__dirty:
+            self.__render_device(self.__devices[mac_addr][0])
+        self.__dirty.clear()
+        parts = []
+        for family, metric_type, unit, help_text in self.__family_order:
+            text = self.__family_texts[family]
+            if text is None:
+                samples = self.__samples[family]
+                text = (render_header(family, metric_type, unit, help_text)
+                    + "".join(samples.values())) if samples else ""
+                self.__family_texts[family] = text
+            parts.append(text)
+        if self.metrics is not None:
+            parts.append(self.__render_request_metrics())
+        parts.append("# EOF\n")
+        return "".join(parts)
+
+    async def async_start(self, host: str = "127.0.0.1",
+                        port: int = OPENMETRICS_DEFAULT_PORT) -> int:
+        """Serve rendered text on OPENMETRICS_PATH of HTTP endpoint.
+
+        Keyword arguments:
+        host -- listen address, local only by default
+        port -- listen port, 0 means free port
+
+        Return: listen port
+        """
+        app = web.Application()
+        app.router.add_get(OPENMETRICS_PATH, self.__async_handle_request)
+        self.__runner = web.AppRunner(app, access_log=None)
+        await self.__runner.setup()
+        site = web.TCPSite(self.__runner, host, port)
+        await site.start()
+        return self.__runner.addresses[0][1]
+
+    async def async_stop(self):
+        """Stop HTTP endpoint."""
+        if self.__runner is not None:
+            await self.__runner.cleanup()
+            self.__runner = None
+
+    async def __async_handle_request(self, request: web.Request) -> web.Response:
+        """Return rendered text."""
+        return web.Response(body=self.render().encode(),
+            headers={"Content-Type": OPENMETRICS_CONTENT_TYPE})
+
+    def __on_state_change(self, device: FoxBaseDevice, changes: list):
+        """Mark device to be rendered again."""
+        self.__dirty.add(device.mac_addr)
+
+    def __sync_fleet(self):
+        """Follow devices added to and removed from fleet."""
+        if self.__fleet is None or self.__fleet.devices_version == self.__fleet_version:
+            return
+        self.__fleet_version = self.__fleet.devices_version
+        devices = {device.mac_addr: device for device in self.__fleet.get_devices()}
+        for mac_addr in [mac_addr for mac_addr in self.__devices if mac_addr not in devices]:
+            self.remove_device(mac_addr)
+        for mac_addr, device in devices.items():
+            entry = self.__devices.get(mac_addr)
+            if entry is None or entry[0] is not device:
+                self.add_device(device)
+
+    def __render_device(self, device: FoxBaseDevice):
+        """Render samples of device and invalidate changed families."""
+        self.device_renders_count += 1
+        labels = 'mac="{0}",name="{1}"'.format(escape_label(device.mac_addr),
+            escape_label(device.name))
+        rendered = {AVAILABLE_FAMILY[0]: "{0}{{{1}}} {2}\n".format(
+            AVAILABLE_FAMILY[0], labels, 1 if device.is_available else 0)}
+        for (field, channel), value in device.get_state_values().items():
+            family = self.__families.get(field)
+            number = to_number(value)
+            if family is None or number != number:
+                #Not exported field or missing value
+                continue
+            name, metric_type, _ = family
+            sample_labels = labels if channel is None else '{0},channel="{1}"'.format(
+                labels, channel)
+            line = "{0}{1}{{{2}}} {3}\n".format(name,
+                "_total" if metric_type == "counter" else "", sample_labels, format_value(number))
+            rendered[name] = rendered.get(name, "") + line
+        previous = self.__device_samples.get(device.mac_addr, {})
+        for family in previous.keys() | rendered.keys():
+            line = rendered.get(family)
+            if previous.get(family) == line:
+                continue
+            if line is None:
+                self.__samples[family].pop(device.mac_addr, None)
+            else:
+                self.__samples[family][device.mac_addr] = line
+            self.__family_texts[family] = None
+        self.__device_samples[device.mac_addr] = rendered
+
+    def __render_request_metrics(self) -> str:
+        """Render request metrics, endpoints without new requests are taken from cache."""
+        families = (API_REQUESTS_FAMILY, API_ERRORS_FAMILY, API_BYTES_FAMILY,
+            API_DURATION_FAMILY)
+        parts = {family[0]: [] for family in families}
+        for key, metrics in self.metrics.get_endpoints().items():
+            cached = self.__endpoint_samples.get(key)
+            if cached is None or cached[0] != metrics.requests_count:
+                cached = (metrics.requests_count, render_endpoint(key[0], key[1], metrics))
+                self.__endpoint_samples[key] = cached
+            for family, lines in cached[1].items():
+                if lines:
+                    parts[family].append(lines)
+        return "".join(
+            render_header(family, metric_type, unit, help_text) + "".join(parts[family])
+            for family, metric_type, unit, help_text in families if parts[family])
+
+
+def render_endpoint(host: str, method: str, metrics) -> dict:
+    """Render request metrics of host api method, key: family name."""
+    labels = 'host="{0}",method="{1}"'.format(escape_label(host), escape_label(method))
+    errors = "".join('{0}_total{{{1},type="{2}"}} {3}\n'.format(API_ERRORS_FAMILY[0], labels,
+        escape_label(error_type), count) for error_type, count in metrics.errors.items())
+    duration = API_DURATION_FAMILY[0]
+    buckets = "".join('{0}_bucket{{{1},le="{2}"}} {3}\n'.format(duration, labels,
+        format_value(bound), count)
+        for bound, count in metrics.latency.get_cumulative_counts())
+    return {
+        API_REQUESTS_FAMILY[0]: "{0}_total{{{1}}} {2}\n".format(API_REQUESTS_FAMILY[0], labels,
+            metrics.requests_count),
+        API_ERRORS_FAMILY[0]: errors,
+        API_BYTES_FAMILY[0]: "{0}_total{{{1}}} {2}\n".format(API_BYTES_FAMILY[0], labels,
+            metrics.bytes_received),
+        duration: buckets + "{0}_count{{{1}}} {2}\n{0}_sum{{{1}}} {3}\n".format(duration, labels,
+            metrics.latency.count, format_value(metrics.latency.sum))
+    }
+
+
+def render_header(family: str, metric_type: str, unit: str, help_text: str) -> str:
+    """Render TYPE, UNIT and HELP lines of metric family."""
+    header = "# TYPE {0} {1}\n".format(family, metric_type)
+    if unit is not None:
+        header += "# UNIT {0} {1}\n".format(family, unit)
+    return header + "# HELP {0} {1}\n".format(family, help_text)
+
+
+def format_value(value: float) -> str:
+    """Format number as OpenMetrics value."""
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value))
+
+
+def escape_label(value) -> str:
+    """Escape label value, None is rendered as empty string."""
+    if value is None:
+        return ""
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
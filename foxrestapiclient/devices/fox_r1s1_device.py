@@ -1,31 +1,52 @@
 """F&F Fox R1S1 device implementation."""
 
-import json
-
-from foxrestapiclient.connection.const import API_RESPONSE_STATUS_FAIL
+from foxrestapiclient.connection.const import (API_RESPONSE_STATUS_DROPPED,
+                                               API_RESPONSE_STATUS_FAIL,
+                                               API_RESPONSE_STATUS_OK)
 from foxrestapiclient.connection.rest_api_client import RestApiClient
-from foxrestapiclient.connection.rest_api_responses import RestApiBaseResponse
+from foxrestapiclient.connection.rest_api_responses import (RestApiBaseResponse,
+                                                             RestApiError,
+                                                             parse_response)
+from foxrestapiclient.connection.rest_api_session import RestApiSessionPool
 
-from .const import API_R1S1_GET_AC_PARAMETERS, API_R1S1_GET_TOTAL_ENERGY_DATA
+from .const import (API_R1S1_GET_AC_PARAMETERS, API_R1S1_GET_TOTAL_ENERGY_DATA,
+                    R1S1_HISTORY_RAW_CAPACITY, R1S1_HISTORY_TIERS)
 from .fox_base_device import DeviceData, FoxBaseDevice
+from .fox_sensor_history import FoxSensorHistory
 
 
 class FoxR1S1Device(FoxBaseDevice):
     """F&F Fox R1S1 device. Single switch, relay with energy meter."""
 
-    def __init__(self, device_data: DeviceData):
-        """Initialize object by given device data."""
-        super().__init__(device_data)
+    def __init__(self, device_data: DeviceData, session_pool: RestApiSessionPool = None,
+                history_capacity: int = R1S1_HISTORY_RAW_CAPACITY,
+                history_tiers: tuple = R1S1_HISTORY_TIERS):
+        """Initialize object by given device data.
+
+        Keyword arguments:
+        device_data -- device connection data
+        session_pool -- optional, connection pool shared with other devices
+        history_capacity -- number of raw samples kept by sensor history
+        history_tiers -- (resolution in seconds, number of buckets) of history tiers
+        """
+        super().__init__(device_data, session_pool)
         self.__device_api_client = self.DeviceRestApiImplementer(self._rest_api_client)
         self.has_sensor_data = True
         self._state = False
         self.total_energy_data = self.EnergySensorData()
         self.ac_parameters_data = self.ACParamsSensorData()
+        #Numeric history of AC parameters and energy counters, None until it is enabled
+        self.sensor_history: FoxSensorHistory = None
+        self.__history_capacity = history_capacity
+        self.__history_tiers = history_tiers
         self.__init_all_sensor_values()
 
     class EnergySensorData(RestApiBaseResponse):
         """Energy sensor data holder."""
 
+        __slots__ = ("active_energy", "reactive_energy", "active_energy_import",
+                    "reactive_energy_import")
+
         def __init__(self, active_energy: str = None, reactive_energy: str = None,
                 active_energy_import: str = None, reactive_energy_import: str = None,
                 status: str = API_RESPONSE_STATUS_FAIL) -> None:
@@ -39,6 +60,9 @@ class FoxR1S1Device(FoxBaseDevice):
     class ACParamsSensorData(RestApiBaseResponse):
         """AC Parameters data holder."""
 
+        __slots__ = ("voltage", "current", "power_active", "power_reactive", "frequency",
+                    "power_factor")
+
         def __init__(self, voltage: str = None, current: str = None, power_active: str = None,
                     power_reactive: str = None, frequency: str = None, power_factor: str = None,
                     status: str = API_RESPONSE_STATUS_FAIL) -> None:
@@ -58,27 +82,42 @@ class FoxR1S1Device(FoxBaseDevice):
             """Initialize obiect."""
             self._rest_api_client = rest_api_client
 
-        async def async_fetch_ac_parameters_data(self):
+        async def async_fetch_ac_parameters_data(self, max_age: float = None):
             """Fetch AC parametrs from device.
 
             Get information about electricty network such as voltage, current etc.
             see ACParamsSensorData to show what data can be readed.
+
+            Keyword arguments:
+            max_age -- optional, accept cached response not older than given seconds
             """
             device_response = (
-                await self._rest_api_client.async_make_api_call_get(API_R1S1_GET_AC_PARAMETERS)
+                await self._rest_api_client.async_make_api_call_get(API_R1S1_GET_AC_PARAMETERS,
+                    max_age=max_age)
             )
             if device_response is None:
                 return FoxR1S1Device.ACParamsSensorData(status=API_RESPONSE_STATUS_FAIL)
-            return FoxR1S1Device.ACParamsSensorData(**json.loads(device_response))
+            if isinstance(device_response, RestApiError):
+                return FoxR1S1Device.ACParamsSensorData(status=API_RESPONSE_STATUS_DROPPED)
+            return parse_response(FoxR1S1Device.ACParamsSensorData, device_response,
+                API_R1S1_GET_AC_PARAMETERS, self._rest_api_client.get_host())
+
+        async def async_fetch_total_energy_data(self, max_age: float = None):
+            """Fetch total energy parametrs from device.
 
-        async def async_fetch_total_energy_data(self):
-            """Fetch total energy parametrs from device."""
+            Keyword arguments:
+            max_age -- optional, accept cached response not older than given seconds
+            """
             device_response = (
-                await self._rest_api_client.async_make_api_call_get(API_R1S1_GET_TOTAL_ENERGY_DATA)
+                await self._rest_api_client.async_make_api_call_get(API_R1S1_GET_TOTAL_ENERGY_DATA,
+                    max_age=max_age)
             )
             if device_response is None:
                 return FoxR1S1Device.EnergySensorData(status=API_RESPONSE_STATUS_FAIL)
-            return FoxR1S1Device.EnergySensorData(**json.loads(device_response))
+            if isinstance(device_response, RestApiError):
+                return FoxR1S1Device.EnergySensorData(status=API_RESPONSE_STATUS_DROPPED)
+            return parse_response(FoxR1S1Device.EnergySensorData, device_response,
+                API_R1S1_GET_TOTAL_ENERGY_DATA, self._rest_api_client.get_host())
 
     def __init_all_sensor_values(self):
         """Initialize all sensor values JSON string."""
@@ -110,6 +149,29 @@ class FoxR1S1Device(FoxBaseDevice):
         except KeyError:
             return "NaN"
 
+    def enable_sensor_history(self) -> FoxSensorHistory:
+        """Start recording sensor history and return it.
+
+        History buffers are allocated on first call, so devices which never
+        use history do not hold them.
+        """
+        if self.sensor_history is None:
+            self.sensor_history = FoxSensorHistory(raw_capacity=self.__history_capacity,
+                tiers=self.__history_tiers)
+        return self.sensor_history
+
+    def get_sensor_history(self, key: str, tier: int = 0, since: float = None) -> list:
+        """Return history of sensor value by key, see FoxSensorHistory.get_samples().
+
+        History is enabled on first call, samples are recorded from then on.
+
+        Keyword arguments:
+        key -- related value by key
+        tier -- 0 for raw samples, 1 and more for min/mean/max tiers
+        since -- optional, return samples from given time.time()
+        """
+        return self.enable_sensor_history().get_samples(key, tier, since)
+
     def get_all_electricty_data(self) -> dict:
         """Get all readed data from electricty sensor as dictionary."""
         return self.all_sensor_values
@@ -118,9 +180,31 @@ class FoxR1S1Device(FoxBaseDevice):
         """Return device is on status."""
         return self._state
 
+    def get_state_values(self) -> dict:
+        """Return last fetched state and sensor values."""
+        values = {("state", None): self._state}
+        for key, value in self.all_sensor_values.items():
+            values[(key, None)] = value
+        return values
+
     async def async_fetch_update(self):
         """Fetch all available data from device."""
-        self._state = await self.async_fetch_channel_state()
-        self.total_energy_data = await self.__device_api_client.async_fetch_total_energy_data()
-        self.ac_parameters_data = await self.__device_api_client.async_fetch_ac_parameters_data()
-        self.__init_all_sensor_values()
+        with self._trace_update():
+            state, total_energy_data, ac_parameters_data = await self._async_run_reads(
+                self.async_fetch_channel_state,
+                self.__device_api_client.async_fetch_total_energy_data,
+                self.__device_api_client.async_fetch_ac_parameters_data
+            )
+            #Dropped reads keep previous values
+            if state is not None:
+                self._state = state
+            if total_energy_data.status != API_RESPONSE_STATUS_DROPPED:
+                self.total_energy_data = total_energy_data
+            if ac_parameters_data.status != API_RESPONSE_STATUS_DROPPED:
+                self.ac_parameters_data = ac_parameters_data
+            self.__init_all_sensor_values()
+            if self.sensor_history is not None and (
+                    ac_parameters_data.status == API_RESPONSE_STATUS_OK
+                    or total_energy_data.status == API_RESPONSE_STATUS_OK):
+                self.sensor_history.append(self.all_sensor_values)
+            await self._async_publish_state_changes()
@@ -1,6 +1,7 @@
 """F&F Fox R2S2 device implementation."""
 
 from foxrestapiclient.connection import _LOGGER
+from foxrestapiclient.connection.rest_api_session import RestApiSessionPool
 
 from .fox_base_device import DeviceData, FoxBaseDevice
 
@@ -8,9 +9,9 @@ from .fox_base_device import DeviceData, FoxBaseDevice
 class FoxR2S2Device(FoxBaseDevice):
     """F&F Fox R2S2 device implementation. Two relays and two switches."""
 
-    def __init__(self, device_data: DeviceData):
+    def __init__(self, device_data: DeviceData, session_pool: RestApiSessionPool = None):
         """Initalize object."""
-        super().__init__(device_data)
+        super().__init__(device_data, session_pool)
         #This device has two channels
         self.channels = [1, 2]
         self.channel_one_state = False
@@ -31,6 +32,10 @@ class FoxR2S2Device(FoxBaseDevice):
             return False
         return self.channel_one_state if channel == 1 else self.channel_two_state
 
+    def get_state_values(self) -> dict:
+        """Return last fetched channels state."""
+        return {("state", 1): self.channel_one_state, ("state", 2): self.channel_two_state}
+
     def __set_channels_to_off(self):
         """Private method to reseting channels state."""
         self.channel_one_state = False
@@ -38,8 +43,10 @@ class FoxR2S2Device(FoxBaseDevice):
 
     async def async_fetch_update(self):
         """Abstract method implementation. Fetch all required data from device."""
-        states = await self.async_fetch_channel_state()
-        if states is not None and isinstance(states, list):
-            self.channel_one_state, self.channel_two_state = states
-        else:
-            self.__set_channels_to_off()
+        with self._trace_update():
+            states = await self.async_fetch_channel_state()
+            if isinstance(states, list):
+                self.channel_one_state, self.channel_two_state = states
+            elif states is not None:
+                self.__set_channels_to_off()
+            await self._async_publish_state_changes()
@@ -2,12 +2,15 @@
 
 from __future__ import annotations
 
-import json
 from foxrestapiclient.connection import _LOGGER
-from foxrestapiclient.connection.const import (API_RESPONSE_STATUS_FAIL,
+from foxrestapiclient.connection.const import (API_RESPONSE_STATUS_DROPPED,
+                                               API_RESPONSE_STATUS_FAIL,
                                                API_RESPONSE_STATUS_OK)
 from foxrestapiclient.connection.rest_api_client import RestApiClient
-from foxrestapiclient.connection.rest_api_responses import RestApiBaseResponse
+from foxrestapiclient.connection.rest_api_responses import (RestApiBaseResponse,
+                                                             RestApiError,
+                                                             parse_response)
+from foxrestapiclient.connection.rest_api_session import RestApiSessionPool
 
 from .const import API_RGBW_GET_COLOR_HSV, API_RGBW_SET_COLOR_HSV
 from .fox_base_device import DeviceData, FoxBaseDevice
@@ -16,9 +19,9 @@ from .fox_base_device import DeviceData, FoxBaseDevice
 class FoxRGBWDevice(FoxBaseDevice):
     """Fox RGBW device."""
 
-    def __init__(self, device_data: DeviceData):
+    def __init__(self, device_data: DeviceData, session_pool: RestApiSessionPool = None):
         """Initalize object."""
-        super().__init__(device_data)
+        super().__init__(device_data, session_pool)
         self.hsv_color = [0, 0, 0]
         self.__device_api_client = self.DeviceRestApiImplementer(self._rest_api_client)
         self._state = False
@@ -26,6 +29,8 @@ class FoxRGBWDevice(FoxBaseDevice):
     class HSVColorData(RestApiBaseResponse):
         """HSV color data holder."""
 
+        __slots__ = ("hue", "saturation", "value")
+
         def __init__(self, h: str = None, s: str = None, v: str = None,
                     status: str = API_RESPONSE_STATUS_FAIL) -> None:
             """Initalize object."""
@@ -54,14 +59,22 @@ class FoxRGBWDevice(FoxBaseDevice):
             """Initialize object."""
             self._rest_api_client = rest_api_client
 
-        async def async_get_hsv_color(self) -> FoxRGBWDevice.HSVColorData:
-            """Get HSV values by given channel."""
+        async def async_get_hsv_color(self, max_age: float = None) -> FoxRGBWDevice.HSVColorData:
+            """Get HSV values by given channel.
+
+            Keyword arguments:
+            max_age -- optional, accept cached response not older than given seconds
+            """
             device_response = (
-                await self._rest_api_client.async_make_api_call_get(API_RGBW_GET_COLOR_HSV)
+                await self._rest_api_client.async_make_api_call_get(API_RGBW_GET_COLOR_HSV,
+                    max_age=max_age)
             )
             if device_response is None:
                 return FoxRGBWDevice.HSVColorData(status=API_RESPONSE_STATUS_FAIL)
-            return FoxRGBWDevice.HSVColorData(**json.loads(device_response))
+            if isinstance(device_response, RestApiError):
+                return FoxRGBWDevice.HSVColorData(status=API_RESPONSE_STATUS_DROPPED)
+            return parse_response(FoxRGBWDevice.HSVColorData, device_response,
+                API_RGBW_GET_COLOR_HSV, self._rest_api_client.get_host())
 
         async def async_set_hsv_color(self, params = None) -> RestApiBaseResponse:
             """Set HSV values by given channel."""
@@ -70,7 +83,8 @@ class FoxRGBWDevice(FoxBaseDevice):
             )
             if device_response is None:
                 return RestApiBaseResponse(status=API_RESPONSE_STATUS_FAIL)
-            return RestApiBaseResponse(**json.loads(device_response))
+            return parse_response(RestApiBaseResponse, device_response,
+                API_RGBW_SET_COLOR_HSV, self._rest_api_client.get_host())
 
     def get_hs_color(self):
         """Get HS values in following format [hue, saturation].
@@ -94,12 +108,18 @@ class FoxRGBWDevice(FoxBaseDevice):
         """
         return self.hsv_color[2]
 
-    async def async_fetch_color_hsv(self):
+    async def async_fetch_color_hsv(self, max_age: float = None):
         """Fetch HSV color from device.
 
+        Keyword arguments:
+        max_age -- optional, accept cached response not older than given seconds
+
         Return: list with hue, saturation and value. If error occured 0,0,0 will be returned.
         """
-        hsv_data = await self.__device_api_client.async_get_hsv_color()
+        hsv_data = await self.__device_api_client.async_get_hsv_color(max_age)
+        if hsv_data.status == API_RESPONSE_STATUS_DROPPED:
+            #Read was not sent, keep previous values
+            return self.hsv_color
         if hsv_data.status != API_RESPONSE_STATUS_OK:
             self._state = False
             return [0, 0, 0]
@@ -124,6 +144,9 @@ class FoxRGBWDevice(FoxBaseDevice):
         hue -- value from range <0,359>
         saturation -- value from range <0,100>
         value -- value from range <0,100>
+
+        Return: False if failed, WRITE_RESULT_SUPERSEDED if coalesced write was
+        replaced by newer value, True otherwise.
         """
         params = {}
         if hue is not None:
@@ -141,17 +164,31 @@ class FoxRGBWDevice(FoxBaseDevice):
                 _LOGGER.warning("Value is out of range. Accepted <0;100>")
                 return False
             params.update({"v": int(value)})
-        device_response = await self.__device_api_client.async_set_hsv_color(params)
-        if device_response.status != API_RESPONSE_STATUS_OK:
+        write_result = await self._async_coalesced_write("color_hsv", params,
+            self.__device_api_client.async_set_hsv_color, lambda pending, new: {**pending, **new})
+        if write_result.result.status != API_RESPONSE_STATUS_OK:
             self._state = False
             return False
-        return True
+        return self._get_write_result(write_result)
 
     def is_on(self, channel: int = None):
         """Return device is on status."""
         return self._state
 
+    def get_state_values(self) -> dict:
+        """Return last fetched state and HSV color."""
+        return {
+            ("state", None): self._state,
+            ("hue", None): self.hsv_color[0],
+            ("saturation", None): self.hsv_color[1],
+            ("value", None): self.hsv_color[2]
+        }
+
     async def async_fetch_update(self):
         """Fetch all available data from device."""
-        self._state = await self.async_fetch_channel_state()
-        await self.async_fetch_color_hsv()
+        with self._trace_update():
+            state, _ = await self._async_run_reads(self.async_fetch_channel_state,
+                self.async_fetch_color_hsv)
+            if state is not None:
+                self._state = state
+            await self._async_publish_state_changes()
@@ -0,0 +1,204 @@
+"""Fixed size sensor history with min/mean/max downsampling."""
+from __future__ import annotations
+
+import math
+import time
+from array import array
+
+from .const import R1S1_HISTORY_FIELDS, R1S1_HISTORY_RAW_CAPACITY, R1S1_HISTORY_TIERS
+
+NAN = float("nan")
+
+
+class SensorRingBuffer:
+    """Ring buffer of timestamped rows stored in arrays of doubles.
+
+    Every column is single array, so samples do not create Python objects.
+    Append is O(1), the oldest row is overwritten when buffer is full.
+    """
+
+    def __init__(self, capacity: int, columns_count: int) -> None:
+        """Construct buffer.
+
+        Keyword arguments:
+        capacity -- max number of rows
+        columns_count -- number of values in row, timestamp excluded
+        """
+        self.capacity = capacity
+        self.timestamps = array("d", bytes(8 * capacity))
+        self.columns = [array("d", bytes(8 * capacity)) for _ in range(columns_count)]
+        #Index of next written row
+        self.__next = 0
+        self.__size = 0
+
+    def __len__(self) -> int:
+        """Return number of stored rows."""
+        return self.__size
+
+    def append(self, timestamp: float, values):
+        """Store row, values must have one value per column."""
+        index = self.__next
+        self.timestamps[index] = timestamp
+        for column, value in zip(self.columns, values):
+            column[index] = value
+        self.__next = (index + 1) % self.capacity
+        if self.__size < self.capacity:
+            self.__size += 1
+
+    def get_indexes(self, since: float = None) -> list:
+        """Return array indexes of rows from the oldest, optionally only rows from since."""
+        start = (self.__next - self.__size) % self.capacity
+        indexes = [(start + offset) % self.capacity for offset in range(self.__size)]
+        if since is not None:
+            indexes = [index for index in indexes if self.timestamps[index] >= since]
+        return indexes
+
+    def get_last_index(self) -> int:
+        """Return array index of the newest row or None if empty."""
+        if self.__size == 0:
+            return None
+        return (self.__next - 1) % self.capacity
+
+
+class TierState:
+    """Downsampled tier with aggregation of bucket in progress."""
+
+    __slots__ = ("resolution", "buffer", "bucket_start", "minimums", "sums", "counts",
+                "maximums")
+
+    def __init__(self, resolution: float, buffer: SensorRingBuffer, fields_count: int) -> None:
+        """Construct tier."""
+        self.resolution = resolution
+        self.buffer = buffer
+        self.bucket_start: float = None
+        self.minimums = array("d", [math.inf] * fields_count)
+        self.sums = array("d", bytes(8 * fields_count))
+        self.counts = array("L", [0] * fields_count)
+        self.maximums = array("d", [-math.inf] * fields_count)
+
+    def add(self, timestamp: float, row: list):
+        """Aggregate row, store finished bucket when row starts new one."""
+        bucket_start = timestamp - timestamp % self.resolution
+        if self.bucket_start is not None and bucket_start != self.bucket_start:
+            self.flush()
+        self.bucket_start = bucket_start
+        for index, value in enumerate(row):
+            if value != value:
+                #NaN
+                continue
+            if value < self.minimums[index]:
+                self.minimums[index] = value
+            if value > self.maximums[index]:
+                self.maximums[index] = value
+            self.sums[index] += value
+            self.counts[index] += 1
+
+    def flush(self):
+        """Store aggregated bucket and reset aggregation."""
+        fields_count = len(self.counts)
+        values = [NAN] * (3 * fields_count)
+        for index in range(fields_count):
+            count = self.counts[index]
+            if count > 0:
+                values[index] = self.minimums[index]
+                values[fields_count + index] = self.sums[index] / count
+                values[2 * fields_count + index] = self.maximums[index]
+            self.minimums[index] = math.inf
+            self.sums[index] = 0
+            self.counts[index] = 0
+            self.maximums[index] = -math.inf
+        self.buffer.append(self.bucket_start, values)
+
+
+class FoxSensorHistory:
+    """History of numeric sensor values.
+
+    Raw samples are kept in ring buffer of raw_capacity rows. Every tier keeps
+    min, mean and max of samples in buckets of its resolution, so older data
+    is kept with lower resolution. Missing values are stored as NaN and
+    skipped by aggregation.
+    """
+
+    def __init__(self, fields: tuple = R1S1_HISTORY_FIELDS,
+                raw_capacity: int = R1S1_HISTORY_RAW_CAPACITY,
+                tiers: tuple = R1S1_HISTORY_TIERS) -> None:
+        """Construct history.
+
+        Keyword arguments:
+        fields -- names of stored values
+        raw_capacity -- number of raw samples
+        tiers -- (resolution in seconds, number of buckets) of downsampled tiers
+        """
+        self.fields = tuple(fields)
+        self.__field_indexes = {field: index for index, field in enumerate(self.fields)}
+        self._raw = SensorRingBuffer(raw_capacity, len(self.fields))
+        self._tiers = []
+        for resolution, capacity in tiers:
+            #Columns: min of every field, then mean, then max
+            self._tiers.append(TierState(resolution,
+                SensorRingBuffer(capacity, 3 * len(self.fields)), len(self.fields)))
+
+    def __len__(self) -> int:
+        """Return number of raw samples."""
+        return len(self._raw)
+
+    def get_resolutions(self) -> list:
+        """Return resolutions of downsampled tiers in seconds. Tier 0 is raw data."""
+        return [tier.resolution for tier in self._tiers]
+
+    def append(self, values: dict, timestamp: float = None):
+        """Store sample.
+
+        Keyword arguments:
+        values -- sample values by field name, numbers or numeric strings.
+            Missing and invalid values are stored as NaN.
+        timestamp -- optional, time.time() of sample, current time if not provided
+        """
+        if timestamp is None:
+            timestamp = time.time()
+        row = [to_float(values.get(field)) for field in self.fields]
+        self._raw.append(timestamp, row)
+        for tier in self._tiers:
+            tier.add(timestamp, row)
+
+    def get_samples(self, field: str, tier: int = 0, since: float = None) -> list:
+        """Return stored samples of field from the oldest.
+
+        Keyword arguments:
+        field -- field name
+        tier -- 0 for raw samples, 1 and more for downsampled tiers
+        since -- optional, return samples with timestamp from given time.time()
+
+        Return: list of (timestamp, value) for raw samples, list of
+        (bucket start timestamp, min, mean, max) for downsampled tiers.
+        Bucket in progress is not returned.
+        """
+        field_index = self.__field_indexes[field]
+        if tier == 0:
+            column = self._raw.columns[field_index]
+            return [(self._raw.timestamps[index], column[index])
+                for index in self._raw.get_indexes(since)]
+        buffer = self._tiers[tier - 1].buffer
+        fields_count = len(self.fields)
+        minimums = buffer.columns[field_index]
+        means = buffer.columns[fields_count + field_index]
+        maximums = buffer.columns[2 * fields_count + field_index]
+        return [(buffer.timestamps[index], minimums[index], means[index], maximums[index])
+            for index in buffer.get_indexes(since)]
+
+    def get_latest(self, field: str) -> float:
+        """Return the newest raw value of field or None if history is empty."""
+        index = self._raw.get_last_index()
+        if index is None:
+            return None
+        return self._raw.columns[self.__field_indexes[field]][index]
+
+
+def to_float(value) -> float:
+    """Convert sensor value to float, NaN if it is missing or invalid."""
+    if value is None:
+        return NAN
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return NAN
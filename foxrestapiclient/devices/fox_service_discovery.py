@@ -1,13 +1,55 @@
 """Service discovery for F&F Fox devices."""
 import asyncio
-from typing import Tuple
+import ipaddress
+import time
+from typing import AsyncIterator, Tuple
 
 from foxrestapiclient.connection import _LOGGER
 
 from .const import (DEVICE_DISCOVERY_REQUEST_HEADER,
                     DEVICE_DISCOVERY_RESPONSE_HEADER, DEVICE_TYPE_GATE, DEVICES,
+                    DISCOVERY_DEFAULT_QUIET_PERIOD, DISCOVERY_DEFAULT_TIMEOUT,
+                    DISCOVERY_DEVICE_PORT, DISCOVERY_LOCAL_PORT, DISCOVERY_PROBE_BACKOFF,
+                    DISCOVERY_PROBE_INITIAL_INTERVAL, DISCOVERY_PROBE_MAX_INTERVAL,
+                    DISCOVERY_SWEEP_BURST, DISCOVERY_SWEEP_PASSES,
+                    DISCOVERY_SWEEP_RATE, DISCOVERY_SWEEP_REPLY_TIMEOUT,
                     MIN_DATA_SIZE_TO_PARSE)
 from .fox_base_device import DeviceData
+from .fox_network import get_probe_targets
+
+
+def parse_discovery_datagram(data: bytes, addr: Tuple[str, int]) -> DeviceData:
+    """Parse discovery response datagram.
+
+    Keyword arguments:
+    data -- byte array response from device
+    addr -- typle with sender ip address and port.
+
+    Return: DeviceData or None if datagram is not valid response of supported device.
+    """
+    if len(data) < MIN_DATA_SIZE_TO_PARSE:
+        _LOGGER.warning("Received data size is not enough to parsing it.")
+    if len(data) < len(DEVICE_DISCOVERY_RESPONSE_HEADER.encode()):
+        _LOGGER.error("Parsing UDP response error. Cannot discover F&F Fox device.")
+        return None
+    if data[0:36] != DEVICE_DISCOVERY_RESPONSE_HEADER.encode():
+        _LOGGER.warning("Response not indicate to F&F Fox device.")
+        return None
+    device_type = int.from_bytes(data[42:44], "little")
+    #Gate is not supported yet
+    if device_type == DEVICE_TYPE_GATE:
+        return None
+    if device_type not in DEVICES:
+        _LOGGER.error("Unsupported! F&F Fox device not implmeneted yet.")
+        return None
+    _LOGGER.info("Received datagram from %s. Successfuly parsed.", addr)
+    return DeviceData(
+        DEVICES[device_type],
+        addr[0],
+        "000",
+        data[36:42].hex(),
+        device_type
+    )
 
 
 class DeviceDiscoverProtocol(asyncio.DatagramProtocol):
@@ -35,25 +77,97 @@ class DeviceDiscoverProtocol(asyncio.DatagramProtocol):
         """Error received in UDP data."""
         _LOGGER.error("Exception thrown in UDP data receiving: %s", exc)
 
+async def async_open_probe_endpoints(targets: list, local_port: int,
+                                    datagram_parser_callback) -> list:
+    """Open UDP endpoints for all probe targets in parallel.
+
+    Keyword arguments:
+    targets -- list returned by get_probe_targets()
+    local_port -- local UDP port used to receive responses
+    datagram_parser_callback -- called with every received datagram
+
+    Return: list of (transport, address where probe is sent). Targets which
+    cannot be bound are skipped.
+    """
+    loop = asyncio.get_running_loop()
+    results = await asyncio.gather(*[
+        loop.create_datagram_endpoint(
+            lambda: DeviceDiscoverProtocol(datagram_parser_callback),
+            local_addr=(local_address, local_port),
+            reuse_port=True,
+            allow_broadcast=True
+        ) for local_address, _ in targets
+    ], return_exceptions=True)
+    endpoints = []
+    for (local_address, probe_address), result in zip(targets, results):
+        if isinstance(result, Exception):
+            _LOGGER.error("Cannot bind discovery port on %s: %s", local_address, result)
+            continue
+        endpoints.append((result[0], probe_address))
+    return endpoints
+
+
+def close_probe_endpoints(endpoints: list):
+    """Close endpoints opened by async_open_probe_endpoints()."""
+    for transport, _ in endpoints:
+        transport.close()
+
+
+def send_probes(endpoints: list):
+    """Send discovery probe through every endpoint."""
+    for transport, probe_address in endpoints:
+        transport.sendto(DEVICE_DISCOVERY_REQUEST_HEADER.encode(), probe_address)
+
+
+def expand_sweep_targets(targets: list) -> list:
+    """Return unique host addresses of given CIDR ranges and host addresses.
+
+    Raise ValueError if target is not valid IPv4 address or network.
+    """
+    hosts = {}
+    for target in targets:
+        network = ipaddress.IPv4Network(target, strict=False)
+        if network.num_addresses == 1:
+            hosts[str(network.network_address)] = None
+            continue
+        for host in network.hosts():
+            hosts[str(host)] = None
+    return list(hosts)
+
+
 class FoxServiceDiscovery:
-    """Discover F&F Fox devices in local network over UDP broadcast."""
+    """Discover F&F Fox devices in local network over UDP broadcast.
 
-    def __init__(self) -> None:
-        """Construct object."""
+    By default directed broadcast is sent on every local IPv4 interface at the
+    same time and responses are merged by MAC address.
+    """
+
+    def __init__(self, discovery_address: Tuple[str, int] = None,
+                local_port: int = DISCOVERY_LOCAL_PORT, interface_names: list = None) -> None:
+        """Construct object.
+
+        Keyword arguments:
+        discovery_address -- optional, fixed address and port where probes are sent
+            instead of per interface broadcasts
+        local_port -- local UDP port used to receive responses
+        interface_names -- optional, send broadcasts only on given interfaces
+        """
         self._loop = asyncio.get_running_loop()
-        self._discovered_devices = []
+        #Discovered devices, key: mac address
+        self._discovered_devices = {}
+        self.discovery_address = discovery_address
+        self.local_port = local_port
+        self.interface_names = interface_names
+        #New devices queue of running stream
+        self.__stream_queue: asyncio.Queue = None
 
-    def get_discovered_devices(self):
+    def get_discovered_devices(self) -> list:
         """Get dicovered devices."""
-        return self._discovered_devices
+        return list(self._discovered_devices.values())
 
-    def __check_exsist_device(self, device: DeviceData):
-        for dev in self._discovered_devices:
-            if dev.mac_addr == device.mac_addr:
-                return True
-        return False
-
-    async def async_discover_devices(self, default_tries = 5) -> list:
+    async def async_discover_devices(self, default_tries = 5, expected_macs: list = None,
+                                    expected_count: int = None,
+                                    quiet_period: float = None) -> list:
         """Async discovering devices.
 
         Send request to all devices in local network to discover them.
@@ -61,55 +175,155 @@ class FoxServiceDiscovery:
         Keyword arguments:
         default_tries -- default probes to discover Fox devices. This
             value extends discovering time by following formula:
-            default_tries * 4 s = discovering time in seconds.
+            default_tries * 4 s = maximum discovering time in seconds.
+        expected_macs, expected_count, quiet_period -- optional early stop
+            conditions, see stream()
 
         Return: discovered devices list.
         """
-        transport, protocol = await self._loop.create_datagram_endpoint(
-            lambda: DeviceDiscoverProtocol(self.parse_received_datagram),
-            local_addr=('0.0.0.0', 1395),
-            reuse_port=True,
-            allow_broadcast=True
-        )
+        async for _ in self.stream(expected_macs, expected_count, quiet_period,
+                default_tries * DISCOVERY_PROBE_MAX_INTERVAL):
+            pass
+        return self.get_discovered_devices()
+
+    async def stream(self, expected_macs: list = None, expected_count: int = None,
+                    quiet_period: float = DISCOVERY_DEFAULT_QUIET_PERIOD,
+                    timeout: float = DISCOVERY_DEFAULT_TIMEOUT,
+                    probe_interval: float = DISCOVERY_PROBE_INITIAL_INTERVAL,
+                    max_probe_interval: float = DISCOVERY_PROBE_MAX_INTERVAL
+                    ) -> AsyncIterator[DeviceData]:
+        """Yield devices as soon as their responses are parsed.
+
+        Probes are sent with backoff: first after probe_interval, every next
+        interval is longer up to max_probe_interval. Stream stops when first
+        of conditions is met. Only one stream of object can run at once.
+
+        Keyword arguments:
+        expected_macs -- optional, stop when all of these devices are found
+        expected_count -- optional, stop when given number of devices is found
+        quiet_period -- optional, stop when no new device replied for given
+            seconds, None disables it
+        timeout -- stop after given seconds
+        probe_interval -- first interval between probes in seconds
+        max_probe_interval -- max interval between probes in seconds
+        """
+        endpoints = await async_open_probe_endpoints(
+            get_probe_targets(self.discovery_address, self.interface_names),
+            self.local_port, self.parse_received_datagram)
+        async for device in self.__async_collect(endpoints,
+                self.__async_send_probes(endpoints, probe_interval, max_probe_interval),
+                expected_macs, expected_count, quiet_period, timeout):
+            yield device
+
+    async def sweep(self, targets: list, expected_macs: list = None,
+                    expected_count: int = None, rate: float = DISCOVERY_SWEEP_RATE,
+                    passes: int = DISCOVERY_SWEEP_PASSES,
+                    reply_timeout: float = DISCOVERY_SWEEP_REPLY_TIMEOUT,
+                    port: int = DISCOVERY_DEVICE_PORT) -> AsyncIterator[DeviceData]:
+        """Probe given hosts with unicast requests and yield devices as they reply.
+
+        Used in networks which filter broadcast traffic. Probes are paced to rate
+        per second, every host is probed passes times to recover lost datagrams.
+        Sweep stops reply_timeout seconds after last probe or when expected
+        devices are found. Only one stream of object can run at once.
+
+        Keyword arguments:
+        targets -- list of CIDR ranges (e.g. "192.168.8.0/22") and host addresses
+        expected_macs -- optional, stop when all of these devices are found
+        expected_count -- optional, stop when given number of devices is found
+        rate -- max probes sent per second
+        passes -- number of probes sent to every host
+        reply_timeout -- time in seconds to wait for responses after last probe
+        port -- device discovery port
+        """
+        hosts = expand_sweep_targets(targets)
+        endpoints = await async_open_probe_endpoints([("0.0.0.0", None)], self.local_port,
+            self.parse_received_datagram)
+        async for device in self.__async_collect(endpoints,
+                self.__async_send_sweep_probes(endpoints, hosts, port, rate, passes,
+                reply_timeout), expected_macs, expected_count):
+            yield device
+
+    async def __async_collect(self, endpoints: list, probe_coroutine,
+                            expected_macs: list = None, expected_count: int = None,
+                            quiet_period: float = None,
+                            timeout: float = None) -> AsyncIterator[DeviceData]:
+        """Run probe coroutine and yield new devices until stop condition is met.
+
+        Probe coroutine can end stream by putting None into stream queue.
+        """
+        if not endpoints:
+            probe_coroutine.close()
+            return
         #Clear discovered devices list.
-        self._discovered_devices = []
+        self._discovered_devices = {}
+        self.__stream_queue = asyncio.Queue()
+        missing_macs = set(expected_macs or [])
+        probe_task = self._loop.create_task(probe_coroutine)
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        last_reply = time.monotonic()
+        found_count = 0
         try:
-            for i in range(default_tries):
-                #Send message to UDP broadcast
-                transport.sendto(
-                    DEVICE_DISCOVERY_REQUEST_HEADER.encode(),
-                    ('255.255.255.255', 1918)
-                )
-                await asyncio.sleep(4)
+            while True:
+                now = time.monotonic()
+                wait_time = deadline - now if deadline is not None else None
+                if quiet_period is not None:
+                    quiet_wait_time = last_reply + quiet_period - now
+                    wait_time = min(wait_time, quiet_wait_time) \
+                        if wait_time is not None else quiet_wait_time
+                if wait_time is not None and wait_time <= 0:
+                    return
+                try:
+                    device = await asyncio.wait_for(self.__stream_queue.get(), wait_time)
+                except asyncio.TimeoutError:
+                    continue
+                if device is None:
+                    return
+                last_reply = time.monotonic()
+                missing_macs.discard(device.mac_addr)
+                found_count += 1
+                yield device
+                if expected_macs and not missing_macs:
+                    return
+                if expected_count is not None and found_count >= expected_count:
+                    return
         finally:
-            transport.close()
-        return self._discovered_devices
+            probe_task.cancel()
+            self.__stream_queue = None
+            close_probe_endpoints(endpoints)
+
+    @staticmethod
+    async def __async_send_probes(endpoints: list, interval: float, max_interval: float):
+        """Send discovery probes with backoff until cancelled."""
+        while True:
+            #Send message to UDP broadcast
+            send_probes(endpoints)
+            await asyncio.sleep(interval)
+            interval = min(interval * DISCOVERY_PROBE_BACKOFF, max_interval)
+
+    async def __async_send_sweep_probes(self, endpoints: list, hosts: list, port: int,
+                                        rate: float, passes: int, reply_timeout: float):
+        """Send unicast probes to hosts paced to rate, then end stream after reply timeout."""
+        transport = endpoints[0][0]
+        request = DEVICE_DISCOVERY_REQUEST_HEADER.encode()
+        burst_interval = DISCOVERY_SWEEP_BURST / rate
+        next_burst = time.monotonic()
+        for _ in range(passes):
+            for index in range(0, len(hosts), DISCOVERY_SWEEP_BURST):
+                for host in hosts[index:index + DISCOVERY_SWEEP_BURST]:
+                    transport.sendto(request, (host, port))
+                next_burst += burst_interval
+                await asyncio.sleep(max(next_burst - time.monotonic(), 0))
+        await asyncio.sleep(reply_timeout)
+        if self.__stream_queue is not None:
+            self.__stream_queue.put_nowait(None)
 
     def parse_received_datagram(self, data: bytes, addr):
         """Parse UDP message."""
-        if len(data) < MIN_DATA_SIZE_TO_PARSE:
-            _LOGGER.warring("Received data size is not enough to parsing it.")
-        if len(data) < len(DEVICE_DISCOVERY_RESPONSE_HEADER.encode()):
-            _LOGGER.error("Parsing UDP response error. Cannot discover F&F Fox device.")
-            return
-        if data[0:36].decode() != DEVICE_DISCOVERY_RESPONSE_HEADER:
-            _LOGGER.warning("Response not indicate to F&F Fox device.")
+        discovered_device = parse_discovery_datagram(data, addr)
+        if discovered_device is None:
             return
-        device_type = int.from_bytes(data[42:44], "little")
-        #Gate is not supported yet
-        if device_type == DEVICE_TYPE_GATE:
-            return
-        device_unique_id = data[36:42].hex()
-        try:
-            discovered_device = DeviceData(
-                DEVICES[device_type],
-                addr[0],
-                "000",
-                device_unique_id,
-                device_type
-            )
-            _LOGGER.info("Received datagram from %s. Successfuly parsed.", addr)
-            if self.__check_exsist_device(discovered_device) is False:
-                self._discovered_devices.append(discovered_device)
-        except KeyError:
-            _LOGGER.error("Unsupported! F&F Fox device not implmeneted yet.")
+        if discovered_device.mac_addr not in self._discovered_devices:
+            self._discovered_devices[discovered_device.mac_addr] = discovered_device
+            if self.__stream_queue is not None:
+                self.__stream_queue.put_nowait(discovered_device)
@@ -2,13 +2,15 @@
 
 from __future__ import annotations
 
-import json
-
 from foxrestapiclient.connection import _LOGGER
-from foxrestapiclient.connection.const import (API_RESPONSE_STATUS_FAIL,
+from foxrestapiclient.connection.const import (API_RESPONSE_STATUS_DROPPED,
+                                               API_RESPONSE_STATUS_FAIL,
                                                API_RESPONSE_STATUS_OK)
 from foxrestapiclient.connection.rest_api_client import RestApiClient
-from foxrestapiclient.connection.rest_api_responses import RestApiBaseResponse
+from foxrestapiclient.connection.rest_api_responses import (RestApiBaseResponse,
+                                                             RestApiError,
+                                                             parse_response)
+from foxrestapiclient.connection.rest_api_session import RestApiSessionPool
 
 from .const import (API_STR1S2_GET_OPEN_LEVEL, API_STR1S2_GET_TILT_LEVEL,
                     API_STR1S2_SET_OPEN_LEVEL, API_STR1S2_SET_TILT_LEVEL)
@@ -18,9 +20,9 @@ from .fox_base_device import DeviceData, FoxBaseDevice
 class FoxSTR1S2Device(FoxBaseDevice):
     """STR1S2 rollershutter device."""
 
-    def __init__(self, device_data: DeviceData):
+    def __init__(self, device_data: DeviceData, session_pool: RestApiSessionPool = None):
         """Initalize object."""
-        super().__init__(device_data)
+        super().__init__(device_data, session_pool)
         #State reprsents cover open or close
         self._state = False
         self.__device_api_client = self.DeviceRestApiImplementer(self._rest_api_client)
@@ -30,6 +32,8 @@ class FoxSTR1S2Device(FoxBaseDevice):
     class CoverOpenLevel(RestApiBaseResponse):
         """Cover open level data holder."""
 
+        __slots__ = ("level",)
+
         def __init__(self, level: str = None, status: str = API_RESPONSE_STATUS_FAIL) -> None:
             """Initialize object."""
             super().__init__(status)
@@ -46,27 +50,35 @@ class FoxSTR1S2Device(FoxBaseDevice):
             """Initalize object."""
             self._rest_api_client = rest_api_client
 
-        async def async_fetch_level(self, method: str) -> FoxSTR1S2Device.CoverOpenLevel:
+        async def async_fetch_level(self, method: str,
+                                    max_age: float = None) -> FoxSTR1S2Device.CoverOpenLevel:
             """Get open level api method."""
-            device_response = await self._rest_api_client.async_make_api_call_get(method)
+            device_response = await self._rest_api_client.async_make_api_call_get(method,
+                max_age=max_age)
             if device_response is None:
                 return FoxSTR1S2Device.CoverOpenLevel(status=API_RESPONSE_STATUS_FAIL)
-            return FoxSTR1S2Device.CoverOpenLevel(**json.loads(device_response))
+            if isinstance(device_response, RestApiError):
+                return FoxSTR1S2Device.CoverOpenLevel(status=API_RESPONSE_STATUS_DROPPED)
+            return parse_response(FoxSTR1S2Device.CoverOpenLevel, device_response,
+                method, self._rest_api_client.get_host())
 
-        async def async_get_open_level(self) -> FoxSTR1S2Device.CoverOpenLevel:
+        async def async_get_open_level(self,
+                                    max_age: float = None) -> FoxSTR1S2Device.CoverOpenLevel:
             """Get cover open level."""
-            return await self.async_fetch_level(API_STR1S2_GET_OPEN_LEVEL)
+            return await self.async_fetch_level(API_STR1S2_GET_OPEN_LEVEL, max_age)
 
-        async def async_get_tilt_level(self) -> FoxSTR1S2Device.CoverOpenLevel:
+        async def async_get_tilt_level(self,
+                                    max_age: float = None) -> FoxSTR1S2Device.CoverOpenLevel:
             """Get tilt level."""
-            return await self.async_fetch_level(API_STR1S2_GET_TILT_LEVEL)
+            return await self.async_fetch_level(API_STR1S2_GET_TILT_LEVEL, max_age)
 
         async def update_open_level(self, params, method)  -> RestApiBaseResponse:
             """Set open level api method."""
             device_response = await self._rest_api_client.async_make_api_call_get(method, params)
             if device_response is None:
                 return RestApiBaseResponse(status=API_RESPONSE_STATUS_FAIL)
-            return RestApiBaseResponse(**json.loads(device_response))
+            return parse_response(RestApiBaseResponse, device_response,
+                method, self._rest_api_client.get_host())
 
         async def async_set_open_level(self, params) -> RestApiBaseResponse:
             """Set open cover level."""
@@ -80,6 +92,13 @@ class FoxSTR1S2Device(FoxBaseDevice):
         """Return device state."""
         _LOGGER.warning("This device does not support is on funcionality.")
 
+    def get_state_values(self) -> dict:
+        """Return last fetched cover and tilt position."""
+        return {
+            ("cover_position", None): self._cover_position,
+            ("tilt_position", None): self._tilt_position
+        }
+
     def is_cover_opened(self):
         """Get is cover open.
 
@@ -99,11 +118,15 @@ class FoxSTR1S2Device(FoxBaseDevice):
         """Get tilt position."""
         return self._tilt_position
 
-    async def __async_fetch_open_level(self, callback = None, is_cover = True):
+    async def __async_fetch_open_level(self, callback = None, is_cover = True,
+                                    max_age: float = None):
         """Fetch cover open level."""
         if callback is None:
             return
-        cover_open = await callback()
+        cover_open = await callback(max_age)
+        if cover_open.status == API_RESPONSE_STATUS_DROPPED:
+            #Read was not sent, keep previous values
+            return
         if cover_open.status != API_RESPONSE_STATUS_OK:
             self._state = False
             return
@@ -112,13 +135,23 @@ class FoxSTR1S2Device(FoxBaseDevice):
         else:
             self._tilt_position = cover_open.level
 
-    async def async_fetch_cover_open_level(self):
-        """Fetch cover open level."""
-        await self.__async_fetch_open_level(self.__device_api_client.async_get_open_level)
+    async def async_fetch_cover_open_level(self, max_age: float = None):
+        """Fetch cover open level.
 
-    async def async_fetch_tilt_open_level(self):
-        """Fetch tilt open level."""
-        await self.__async_fetch_open_level(self.__device_api_client.async_get_tilt_level, False)
+        Keyword arguments:
+        max_age -- optional, accept cached response not older than given seconds
+        """
+        await self.__async_fetch_open_level(self.__device_api_client.async_get_open_level,
+            max_age=max_age)
+
+    async def async_fetch_tilt_open_level(self, max_age: float = None):
+        """Fetch tilt open level.
+
+        Keyword arguments:
+        max_age -- optional, accept cached response not older than given seconds
+        """
+        await self.__async_fetch_open_level(self.__device_api_client.async_get_tilt_level, False,
+            max_age)
 
     async def __async_cover_set_level(self, level = 0, is_cover = True) -> bool:
         """Set cover level.
@@ -127,7 +160,8 @@ class FoxSTR1S2Device(FoxBaseDevice):
         level -- cover position must be in range <0,100>
         callback -- function to call
 
-        Return: True if success, False otherwise.
+        Return: True if success, False otherwise. WRITE_RESULT_SUPERSEDED if
+        coalesced write was replaced by newer value.
         """
         if level < 0 or level > 100:
             _LOGGER.warning(
@@ -137,14 +171,16 @@ class FoxSTR1S2Device(FoxBaseDevice):
             "level": level
         }
         if is_cover is True:
-            device_response = await self.__device_api_client.async_set_open_level(params)
+            write_result = await self._async_coalesced_write("open_level", params,
+                self.__device_api_client.async_set_open_level)
         else:
-            device_response = await self.__device_api_client.async_set_tilt_open_level(params)
-        if device_response.status != API_RESPONSE_STATUS_OK:
+            write_result = await self._async_coalesced_write("tilt_level", params,
+                self.__device_api_client.async_set_tilt_open_level)
+        if write_result.result.status != API_RESPONSE_STATUS_OK:
             self._state = False
             return False
         self._state = True
-        return True
+        return self._get_write_result(write_result)
 
     async def async_open_cover(self) -> bool:
         """Open cover.
@@ -166,7 +202,8 @@ class FoxSTR1S2Device(FoxBaseDevice):
         Keyword arguments:
         position -- position to set up from 0 to 100%
 
-        Return: True if success, False otherwise."""
+        Return: True if success, False otherwise. WRITE_RESULT_SUPERSEDED if
+        coalesced write was replaced by newer position."""
         return await self.__async_cover_set_level(position)
 
     async def async_set_tilt_positon(self, position) -> bool:
@@ -175,7 +212,8 @@ class FoxSTR1S2Device(FoxBaseDevice):
         Keyword arguments:
         position -- position to set up from 0 to 100%
 
-        Return: True if success, False otherwise.
+        Return: True if success, False otherwise. WRITE_RESULT_SUPERSEDED if
+        coalesced write was replaced by newer position.
         """
         return await self.__async_cover_set_level(position, False)
 
@@ -183,7 +221,8 @@ class FoxSTR1S2Device(FoxBaseDevice):
         """Overriden method from base device."""
         _LOGGER.warning("This device does not support set_device_state funcionality.")
 
-    async def async_fetch_channel_state(self, channel: int = None) -> bool | list:
+    async def async_fetch_channel_state(self, channel: int = None,
+                                        max_age: float = None) -> bool | list:
         """Overriden method from base device."""
         _LOGGER.warning("This device does not support fetch_channel_state funcionality.")
 
@@ -193,5 +232,7 @@ class FoxSTR1S2Device(FoxBaseDevice):
 
     async def async_fetch_update(self):
         """Fetch all available data from device."""
-        await self.async_fetch_cover_open_level()
-        await self.async_fetch_tilt_open_level()
+        with self._trace_update():
+            await self._async_run_reads(self.async_fetch_cover_open_level,
+                self.async_fetch_tilt_open_level)
+            await self._async_publish_state_changes()
@@ -0,0 +1,206 @@
+"""Streaming subscriptions of F&F Fox device updates with bounded queues."""
+from __future__ import annotations
+
+import asyncio
+import itertools
+import time
+from collections import OrderedDict
+from typing import Callable
+
+from .const import (SUBSCRIPTION_BLOCK_TIMEOUT, SUBSCRIPTION_DEFAULT_MAX_SIZE,
+                    SUBSCRIPTION_OVERFLOW_BLOCK, SUBSCRIPTION_OVERFLOW_CONFLATE,
+                    SUBSCRIPTION_OVERFLOW_DROP_OLDEST)
+
+
+class FoxStateChange:
+    """Change of single device state field."""
+
+    __slots__ = ("field", "channel", "old_value", "new_value")
+
+    def __init__(self, field: str, channel: int, old_value, new_value) -> None:
+        """Construct change.
+
+        Keyword arguments:
+        field -- field name, e.g. state or brightness
+        channel -- channel of value, None for device wide values
+        old_value -- last reported value, None if reported first time
+        new_value -- current value
+        """
+        self.field = field
+        self.channel = channel
+        self.old_value = old_value
+        self.new_value = new_value
+
+
+class FoxDeviceUpdate:
+    """State changes of device after single refresh."""
+
+    __slots__ = ("device", "changes", "timestamp")
+
+    def __init__(self, device, changes: list, timestamp: float = None) -> None:
+        """Construct update.
+
+        Keyword arguments:
+        device -- updated FoxBaseDevice
+        changes -- list of FoxStateChange
+        timestamp -- optional, time.time() of update, current time if not provided
+        """
+        self.device = device
+        self.changes = changes
+        self.timestamp = timestamp if timestamp is not None else time.time()
+
+    def merge(self, update: FoxDeviceUpdate) -> FoxDeviceUpdate:
+        """Return update with changes of both updates, old values are kept from this one."""
+        changes = OrderedDict(((change.field, change.channel), change) for change in self.changes)
+        for change in update.changes:
+            key = (change.field, change.channel)
+            queued = changes.get(key)
+            if queued is not None:
+                change = FoxStateChange(change.field, change.channel, queued.old_value,
+                    change.new_value)
+            changes[key] = change
+        return FoxDeviceUpdate(self.device, list(changes.values()), update.timestamp)
+
+
+class FoxSubscription:
+    """Bounded queue of device updates consumed with async for.
+
+    Queue never holds more than max_size entries. When it is full:
+    drop_oldest policy drops the oldest update, conflate policy merges update
+    with queued update of the same device (new device drops the oldest
+    entry), block policy makes publisher wait up to block_timeout and drops
+    the oldest update then, so slow consumer never stalls polling for long.
+    """
+
+    def __init__(self, max_size: int = SUBSCRIPTION_DEFAULT_MAX_SIZE,
+                overflow: str = SUBSCRIPTION_OVERFLOW_DROP_OLDEST,
+                block_timeout: float = SUBSCRIPTION_BLOCK_TIMEOUT,
+                on_close: Callable[[FoxSubscription], None] = None) -> None:
+        """Construct subscription.
+
+        Keyword arguments:
+        max_size -- max queued updates, devices in conflate policy
+        overflow -- SUBSCRIPTION_OVERFLOW_DROP_OLDEST, SUBSCRIPTION_OVERFLOW_CONFLATE
+            or SUBSCRIPTION_OVERFLOW_BLOCK
+        block_timeout -- max seconds publisher waits in block policy
+        on_close -- optional, called with subscription when it is closed
+        """
+        if overflow not in (SUBSCRIPTION_OVERFLOW_DROP_OLDEST, SUBSCRIPTION_OVERFLOW_CONFLATE,
+                SUBSCRIPTION_OVERFLOW_BLOCK):
+            raise ValueError("Unknown overflow policy {0}".format(overflow))
+        self.max_size = max_size
+        self.overflow = overflow
+        self.block_timeout = block_timeout
+        self.dropped_count = 0
+        self.__on_close = on_close
+        #Queued updates, key: mac address in conflate policy, sequence number otherwise
+        self.__queue = OrderedDict()
+        self.__sequence = itertools.count()
+        self.__readable = asyncio.Event()
+        self.__writable = asyncio.Event()
+        self.__closed = False
+
+    def __len__(self) -> int:
+        """Return number of queued updates."""
+        return len(self.__queue)
+
+    def __enter__(self) -> FoxSubscription:
+        """Enter context."""
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        """Close subscription."""
+        self.close()
+
+    def __aiter__(self) -> FoxSubscription:
+        """Return async iterator of updates."""
+        return self
+
+    async def __anext__(self) -> FoxDeviceUpdate:
+        """Wait for next update, stop iteration when subscription is closed."""
+        update = await self.async_get()
+        if update is None:
+            raise StopAsyncIteration
+        return update
+
+    def is_closed(self) -> bool:
+        """Return true if subscription is closed."""
+        return self.__closed
+
+    def close(self):
+        """Stop receiving updates. Queued updates can still be read."""
+        if self.__closed:
+            return
+        self.__closed = True
+        self.__readable.set()
+        self.__writable.set()
+        if self.__on_close is not None:
+            self.__on_close(self)
+
+    def put_nowait(self, update: FoxDeviceUpdate) -> bool:
+        """Queue update according to overflow policy.
+
+        Return: false if queue is full in block policy, update is not queued then.
+        """
+        if self.__closed:
+            return True
+        if self.overflow == SUBSCRIPTION_OVERFLOW_CONFLATE:
+            key = update.device.mac_addr
+            queued = self.__queue.get(key)
+            if queued is not None:
+                self.__queue[key] = queued.merge(update)
+                return True
+        else:
+            key = next(self.__sequence)
+        if len(self.__queue) >= self.max_size:
+            if self.overflow == SUBSCRIPTION_OVERFLOW_BLOCK:
+                return False
+            self.__drop_oldest()
+        self.__queue[key] = update
+        self.__readable.set()
+        return True
+
+    async def async_put(self, update: FoxDeviceUpdate):
+        """Queue update, wait up to block_timeout for free space in block policy."""
+        if self.put_nowait(update):
+            return
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.block_timeout
+        while not self.__closed:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            self.__writable.clear()
+            try:
+                await asyncio.wait_for(self.__writable.wait(), remaining)
+            except asyncio.TimeoutError:
+                break
+            if self.put_nowait(update):
+                return
+        if self.__closed:
+            return
+        self.__drop_oldest()
+        self.__queue[next(self.__sequence)] = update
+        self.__readable.set()
+
+    def get_nowait(self) -> FoxDeviceUpdate:
+        """Return the oldest queued update or None if queue is empty."""
+        if not self.__queue:
+            return None
+        _, update = self.__queue.popitem(last=False)
+        self.__writable.set()
+        return update
+
+    async def async_get(self) -> FoxDeviceUpdate:
+        """Wait for the oldest queued update. Return None when subscription is closed."""
+        while not self.__queue:
+            if self.__closed:
+                return None
+            self.__readable.clear()
+            await self.__readable.wait()
+        return self.get_nowait()
+
+    def __drop_oldest(self):
+        """Drop the oldest queued update."""
+        self.__queue.popitem(last=False)
+        self.dropped_count += 1
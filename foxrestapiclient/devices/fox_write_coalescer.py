@@ -0,0 +1,122 @@
+"""Latest-wins write coalescing for F&F Fox devices."""
+from __future__ import annotations
+
+import asyncio
+import time
+
+
+class CoalescedWriteResult:
+    """Result of write submitted to FoxWriteCoalescer."""
+
+    def __init__(self, result, superseded: bool = False) -> None:
+        """Construct object.
+
+        Keyword arguments:
+        result -- value returned by write callback which was sent to device
+        superseded -- true if submitted value was replaced by newer one
+            and result belongs to the newer write
+        """
+        self.result = result
+        self.superseded = superseded
+
+
+class FoxWriteCoalescer:
+    """Collapse frequent writes to the same device setting into one latest value write.
+
+    Only one write per key is in progress at a time. Values submitted in the meantime
+    are collapsed into one pending write with the latest value. Callers of replaced
+    values get result of the write which replaced them, marked as superseded.
+    """
+
+    class _WriteSlot:
+        """Pending writes of single key."""
+
+        def __init__(self) -> None:
+            """Initialize object."""
+            self.pending_value = None
+            self.pending_callback = None
+            self.pending_futures = []
+            self.last_write_time = None
+            self.task: asyncio.Task = None
+
+    def __init__(self, min_interval: float = 0):
+        """Construct object.
+
+        Keyword arguments:
+        min_interval -- min time in seconds between writes with the same key
+        """
+        self.min_interval = min_interval
+        self.__slots = {}
+
+    def cancel(self):
+        """Cancel pending writes of all keys, their callers get CancelledError."""
+        for slot in self.__slots.values():
+            if slot.task is not None and not slot.task.done():
+                slot.task.cancel()
+
+    def has_pending_writes(self, key) -> bool:
+        """Return true if write with given key is waiting or in progress."""
+        slot = self.__slots.get(key)
+        return slot is not None and slot.task is not None and not slot.task.done()
+
+    async def async_submit(self, key, value, write_callback, merge = None) -> CoalescedWriteResult:
+        """Submit write and wait for its result.
+
+        Keyword arguments:
+        key -- setting identifier, e.g. channel brightness
+        value -- value to write
+        write_callback -- coroutine function called with value to write
+        merge -- optional, function called with (pending value, value) returning
+            value to write. Latest value replaces pending one if not provided.
+
+        Return: CoalescedWriteResult
+        """
+        slot = self.__slots.get(key)
+        if slot is None:
+            slot = self.__slots[key] = self._WriteSlot()
+        if slot.pending_futures and merge is not None:
+            value = merge(slot.pending_value, value)
+        slot.pending_value = value
+        slot.pending_callback = write_callback
+        future = asyncio.get_running_loop().create_future()
+        slot.pending_futures.append(future)
+        if slot.task is None or slot.task.done():
+            slot.task = asyncio.ensure_future(self.__async_drain(slot))
+        return await future
+
+    async def __async_drain(self, slot: _WriteSlot):
+        """Send pending writes of slot until there is nothing left."""
+        futures = []
+        try:
+            while slot.pending_futures:
+                if slot.last_write_time is not None and self.min_interval > 0:
+                    delay = slot.last_write_time + self.min_interval - time.monotonic()
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+                value = slot.pending_value
+                callback = slot.pending_callback
+                futures = slot.pending_futures
+                slot.pending_value = None
+                slot.pending_callback = None
+                slot.pending_futures = []
+                try:
+                    result = await callback(value)
+                except Exception as exception:
+                    for future in futures:
+                        if not future.done():
+                            future.set_exception(exception)
+                    continue
+                finally:
+                    slot.last_write_time = time.monotonic()
+                for index, future in enumerate(futures):
+                    if not future.done():
+                        future.set_result(
+                            CoalescedWriteResult(result, index != len(futures) - 1))
+        finally:
+            #Drain was cancelled, callers of written and pending values must not wait forever
+            for future in futures + slot.pending_futures:
+                if not future.done():
+                    future.cancel()
+            slot.pending_value = None
+            slot.pending_callback = None
+            slot.pending_futures = []
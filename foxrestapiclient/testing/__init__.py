@@ -0,0 +1,3 @@
+"""Simulator of F&F Fox devices for tests and benchmarks without hardware."""
+from . import fox_simulated_device
+from . import fox_simulator
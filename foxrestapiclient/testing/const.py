@@ -0,0 +1,19 @@
+#Discovery ports. Devices listen on request port and reply to sender.
+SIMULATOR_DISCOVERY_PORT = 1918
+#Discovery response size, shorter responses are rejected by parser.
+SIMULATOR_DISCOVERY_RESPONSE_SIZE = 48
+
+#Cover travel speed in percent per second
+SIMULATOR_COVER_SPEED = 20
+
+#R1S1 simulated electricity network values
+SIMULATOR_VOLTAGE = 230.0
+SIMULATOR_FREQUENCY = 50.0
+#Active power in W drawn by load connected to R1S1 when it is on
+SIMULATOR_LOAD_POWER = 1200.0
+SIMULATOR_POWER_FACTOR = 0.95
+
+#Simulated firmware info
+SIMULATOR_FIRMWARE = "1.0.0"
+SIMULATOR_HARDWARE = "1.0"
+SIMULATOR_UPDATER = "1.0"
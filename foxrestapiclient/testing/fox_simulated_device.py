@@ -0,0 +1,348 @@
+"""Simulated F&F Fox devices used by FoxSimulator."""
+from __future__ import annotations
+
+import random
+import time
+
+from foxrestapiclient.devices.const import (API_RESPONSE_STATUS_INVALID,
+                                            API_RESPONSE_STATUS_OK, DEVICE_OFF,
+                                            DEVICE_ON, DEVICE_TYPE_DIM1S2,
+                                            DEVICE_TYPE_LED2S2, DEVICE_TYPE_R1S1,
+                                            DEVICE_TYPE_R2S2, DEVICE_TYPE_RGBW,
+                                            DEVICE_TYPE_STR1S2, DEVICES)
+
+from .const import (SIMULATOR_COVER_SPEED, SIMULATOR_FIRMWARE, SIMULATOR_FREQUENCY,
+                    SIMULATOR_HARDWARE, SIMULATOR_LOAD_POWER, SIMULATOR_POWER_FACTOR,
+                    SIMULATOR_UPDATER, SIMULATOR_VOLTAGE)
+
+
+class FaultProfile:
+    """Faults injected into simulated device responses."""
+
+    def __init__(self, latency: float = 0, latency_jitter: float = 0,
+                drop_probability: float = 0, slow_read_delay: float = 0,
+                invalid_action_probability: float = 0) -> None:
+        """Construct object.
+
+        Keyword arguments:
+        latency -- added response latency in seconds
+        latency_jitter -- random extra latency in seconds, from 0 to given value
+        drop_probability -- probability of closing connection without response
+        slow_read_delay -- delay in seconds between response body chunks
+        invalid_action_probability -- probability of invalid_action_name response
+        """
+        self.latency = latency
+        self.latency_jitter = latency_jitter
+        self.drop_probability = drop_probability
+        self.slow_read_delay = slow_read_delay
+        self.invalid_action_probability = invalid_action_probability
+
+    def get_latency(self) -> float:
+        """Return latency of single response."""
+        if self.latency_jitter > 0:
+            return self.latency + random.uniform(0, self.latency_jitter)
+        return self.latency
+
+    def should_drop(self) -> bool:
+        """Return true if connection should be dropped."""
+        return self.drop_probability > 0 and random.random() < self.drop_probability
+
+    def should_answer_invalid(self) -> bool:
+        """Return true if invalid_action_name should be returned."""
+        return (self.invalid_action_probability > 0
+            and random.random() < self.invalid_action_probability)
+
+
+class FoxSimulatedDevice:
+    """Simulated device base. Handles common RestAPI methods."""
+
+    def __init__(self, dev_type: int, mac_addr: str, channels_count: int = 1,
+                fault_profile: FaultProfile = None) -> None:
+        """Initialize device state.
+
+        Keyword arguments:
+        dev_type -- device type, see DEVICES
+        mac_addr -- 12 hex digits mac address
+        channels_count -- number of device channels
+        fault_profile -- optional, faults injected into responses
+        """
+        self.dev_type = dev_type
+        self.mac_addr = mac_addr
+        self.fault_profile = fault_profile if fault_profile is not None else FaultProfile()
+        self.online = True
+        self.firmware = SIMULATOR_FIRMWARE
+        self.requests_count = 0
+        self.channels = [str(channel) for channel in range(1, channels_count + 1)]
+        self.states = dict.fromkeys(self.channels, False)
+        self._handlers = {
+            "get_state": self._get_state,
+            "set_state": self._set_state,
+            "get_device_info": self._get_device_info
+        }
+
+    def handle(self, method: str, query) -> dict:
+        """Return response body of given api method."""
+        self.requests_count += 1
+        handler = self._handlers.get(method)
+        if handler is None or self.fault_profile.should_answer_invalid():
+            return {"status": API_RESPONSE_STATUS_INVALID}
+        try:
+            body = handler(query)
+        except (KeyError, ValueError):
+            return {"status": API_RESPONSE_STATUS_INVALID}
+        body["status"] = API_RESPONSE_STATUS_OK
+        return body
+
+    @staticmethod
+    def _state_value(state: bool) -> str:
+        """Return RestAPI state value."""
+        return DEVICE_ON if state else DEVICE_OFF
+
+    def _get_channels(self, query) -> list:
+        """Return channels addressed by request."""
+        channel = query.get("channel")
+        if channel is None:
+            return self.channels
+        if channel not in self.states:
+            raise KeyError(channel)
+        return [channel]
+
+    def _get_state(self, query) -> dict:
+        """Handle get_state."""
+        if query.get("channel") is None and len(self.channels) > 1:
+            return {"channel_{0}_state".format(channel): self._state_value(self.states[channel])
+                for channel in self.channels}
+        return {"state": self._state_value(self.states[self._get_channels(query)[0]])}
+
+    def _set_state(self, query) -> dict:
+        """Handle set_state."""
+        state = query["state"]
+        if state not in (DEVICE_ON, DEVICE_OFF):
+            raise ValueError(state)
+        for channel in self._get_channels(query):
+            self.states[channel] = state == DEVICE_ON
+        return {}
+
+    def _get_device_info(self, query) -> dict:
+        """Handle get_device_info."""
+        return {
+            "device_name": DEVICES[self.dev_type],
+            "firmware": self.firmware,
+            "hw": SIMULATOR_HARDWARE,
+            "updater": SIMULATOR_UPDATER,
+            "device_friendly_name": "{0} {1}".format(DEVICES[self.dev_type], self.mac_addr[-4:]),
+            "device_commercial_name": DEVICES[self.dev_type],
+            "device_channels_name": ["Channel {0}".format(channel) for channel in self.channels]
+        }
+
+
+class FoxSimulatedR1S1(FoxSimulatedDevice):
+    """Simulated R1S1 relay with energy meter. Energy counters grow while relay is on."""
+
+    def __init__(self, mac_addr: str, fault_profile: FaultProfile = None) -> None:
+        """Initialize device state."""
+        super().__init__(DEVICE_TYPE_R1S1, mac_addr, 1, fault_profile)
+        self.active_energy = 0.0
+        self.reactive_energy = 0.0
+        self.__last_update = time.monotonic()
+        self._handlers.update({
+            "get_current_energy": self._get_current_energy,
+            "get_total_energy": self._get_total_energy
+        })
+
+    def __get_power(self) -> float:
+        """Return active power of connected load."""
+        if not self.states["1"]:
+            return 0.0
+        return SIMULATOR_LOAD_POWER * random.uniform(0.97, 1.03)
+
+    def __update_energy(self):
+        """Integrate energy since last update."""
+        now = time.monotonic()
+        hours = (now - self.__last_update) / 3600
+        self.__last_update = now
+        power = self.__get_power()
+        self.active_energy += power * hours / 1000
+        self.reactive_energy += power * 0.3 * hours / 1000
+
+    def _set_state(self, query) -> dict:
+        """Handle set_state, energy is integrated with previous state first."""
+        self.__update_energy()
+        return super()._set_state(query)
+
+    def _get_current_energy(self, query) -> dict:
+        """Handle get_current_energy."""
+        power = self.__get_power()
+        voltage = SIMULATOR_VOLTAGE + random.uniform(-2, 2)
+        return {
+            "voltage": "{0:.1f}".format(voltage),
+            "current": "{0:.2f}".format(power / voltage / SIMULATOR_POWER_FACTOR),
+            "power_active": "{0:.1f}".format(power),
+            "power_reactive": "{0:.1f}".format(power * 0.3),
+            "frequency": "{0:.2f}".format(SIMULATOR_FREQUENCY + random.uniform(-0.05, 0.05)),
+            "power_factor": "{0:.2f}".format(SIMULATOR_POWER_FACTOR if power else 0)
+        }
+
+    def _get_total_energy(self, query) -> dict:
+        """Handle get_total_energy."""
+        self.__update_energy()
+        return {
+            "active_energy": "{0:.3f}".format(self.active_energy),
+            "reactive_energy": "{0:.3f}".format(self.reactive_energy),
+            "active_energy_import": "{0:.3f}".format(self.active_energy),
+            "reactive_energy_import": "{0:.3f}".format(self.reactive_energy)
+        }
+
+
+class FoxSimulatedR2S2(FoxSimulatedDevice):
+    """Simulated R2S2 double relay."""
+
+    def __init__(self, mac_addr: str, fault_profile: FaultProfile = None) -> None:
+        """Initialize device state."""
+        super().__init__(DEVICE_TYPE_R2S2, mac_addr, 2, fault_profile)
+
+
+class FoxSimulatedDimmable(FoxSimulatedDevice):
+    """Simulated dimmable device."""
+
+    def __init__(self, dev_type: int, mac_addr: str, channels_count: int,
+                fault_profile: FaultProfile = None) -> None:
+        """Initialize device state."""
+        super().__init__(dev_type, mac_addr, channels_count, fault_profile)
+        self.brightness = dict.fromkeys(self.channels, 0)
+        self._handlers.update({
+            "get_brightness": self._get_brightness,
+            "set_brightness": self._set_brightness
+        })
+
+    def _get_brightness(self, query) -> dict:
+        """Handle get_brightness."""
+        if query.get("channel") is None and len(self.channels) > 1:
+            return {"channel_{0}_value".format(channel): str(self.brightness[channel])
+                for channel in self.channels}
+        return {"value": str(self.brightness[self._get_channels(query)[0]])}
+
+    def _set_brightness(self, query) -> dict:
+        """Handle set_brightness."""
+        value = int(query["value"])
+        if value < 0 or value > 255:
+            raise ValueError(value)
+        for channel in self._get_channels(query):
+            self.brightness[channel] = value
+        return {}
+
+
+class FoxSimulatedLED2S2(FoxSimulatedDimmable):
+    """Simulated LED2S2 two channel led dimmer."""
+
+    def __init__(self, mac_addr: str, fault_profile: FaultProfile = None) -> None:
+        """Initialize device state."""
+        super().__init__(DEVICE_TYPE_LED2S2, mac_addr, 2, fault_profile)
+
+
+class FoxSimulatedDIM1S2(FoxSimulatedDimmable):
+    """Simulated DIM1S2 one channel dimmer."""
+
+    def __init__(self, mac_addr: str, fault_profile: FaultProfile = None) -> None:
+        """Initialize device state."""
+        super().__init__(DEVICE_TYPE_DIM1S2, mac_addr, 1, fault_profile)
+
+
+class FoxSimulatedRGBW(FoxSimulatedDevice):
+    """Simulated RGBW color module."""
+
+    def __init__(self, mac_addr: str, fault_profile: FaultProfile = None) -> None:
+        """Initialize device state."""
+        super().__init__(DEVICE_TYPE_RGBW, mac_addr, 1, fault_profile)
+        self.hsv = {"h": 0, "s": 0, "v": 0}
+        self._handlers.update({
+            "get_color_hsv": self._get_color_hsv,
+            "set_color_hsv": self._set_color_hsv
+        })
+
+    def _get_color_hsv(self, query) -> dict:
+        """Handle get_color_hsv."""
+        return {key: str(value) for key, value in self.hsv.items()}
+
+    def _set_color_hsv(self, query) -> dict:
+        """Handle set_color_hsv."""
+        limits = {"h": 359, "s": 100, "v": 100}
+        values = {key: int(query[key]) for key in limits if key in query}
+        for key, value in values.items():
+            if value < 0 or value > limits[key]:
+                raise ValueError(value)
+        self.hsv.update(values)
+        return {}
+
+
+class FoxSimulatedSTR1S2(FoxSimulatedDevice):
+    """Simulated STR1S2 roller shutter. Cover and louvers move over time."""
+
+    class Motor:
+        """Position moving towards target with constant speed."""
+
+        def __init__(self) -> None:
+            """Initialize motor."""
+            self.__start_position = 0.0
+            self.__start_time = time.monotonic()
+            self.target = 0
+
+        def get_position(self) -> int:
+            """Return current position."""
+            travelled = (time.monotonic() - self.__start_time) * SIMULATOR_COVER_SPEED
+            if self.target >= self.__start_position:
+                return int(min(self.__start_position + travelled, self.target))
+            return int(max(self.__start_position - travelled, self.target))
+
+        def move_to(self, target: int):
+            """Start moving to given target."""
+            self.__start_position = self.get_position()
+            self.__start_time = time.monotonic()
+            self.target = target
+
+        def is_moving(self) -> bool:
+            """Return true if target is not reached yet."""
+            return self.get_position() != self.target
+
+    def __init__(self, mac_addr: str, fault_profile: FaultProfile = None) -> None:
+        """Initialize device state."""
+        super().__init__(DEVICE_TYPE_STR1S2, mac_addr, 1, fault_profile)
+        self.cover = self.Motor()
+        self.louvers = self.Motor()
+        self._handlers.update({
+            "get_open_level": lambda query: self._get_level(self.cover),
+            "set_open_level": lambda query: self._set_level(self.cover, query),
+            "get_open_louvers_level": lambda query: self._get_level(self.louvers),
+            "set_open_louvers_level": lambda query: self._set_level(self.louvers, query)
+        })
+
+    @staticmethod
+    def _get_level(motor: FoxSimulatedSTR1S2.Motor) -> dict:
+        """Handle get level methods."""
+        return {"level": str(motor.get_position())}
+
+    @staticmethod
+    def _set_level(motor: FoxSimulatedSTR1S2.Motor, query) -> dict:
+        """Handle set level methods."""
+        level = int(query["level"])
+        if level < 0 or level > 100:
+            raise ValueError(level)
+        motor.move_to(level)
+        return {}
+
+
+#Simulated device classes, key: device type
+SIMULATED_DEVICES = {
+    DEVICE_TYPE_DIM1S2: FoxSimulatedDIM1S2,
+    DEVICE_TYPE_LED2S2: FoxSimulatedLED2S2,
+    DEVICE_TYPE_R1S1: FoxSimulatedR1S1,
+    DEVICE_TYPE_R2S2: FoxSimulatedR2S2,
+    DEVICE_TYPE_RGBW: FoxSimulatedRGBW,
+    DEVICE_TYPE_STR1S2: FoxSimulatedSTR1S2
+}
+
+
+def create_simulated_device(dev_type: int, mac_addr: str,
+                            fault_profile: FaultProfile = None) -> FoxSimulatedDevice:
+    """Create simulated device of given type. KeyError is raised for unsupported type."""
+    return SIMULATED_DEVICES[dev_type](mac_addr, fault_profile)
@@ -0,0 +1,281 @@
+"""F&F Fox devices simulator. Serves RestAPI and answers UDP discovery requests."""
+from __future__ import annotations
+
+import asyncio
+import ipaddress
+import json
+import random
+
+from aiohttp import web
+
+from foxrestapiclient.connection import _LOGGER
+from foxrestapiclient.devices.const import (DEVICE_DISCOVERY_REQUEST_HEADER,
+                                            DEVICE_DISCOVERY_RESPONSE_HEADER)
+from foxrestapiclient.devices.fox_base_device import DeviceData
+
+from .const import SIMULATOR_DISCOVERY_PORT, SIMULATOR_DISCOVERY_RESPONSE_SIZE
+from .fox_simulated_device import (SIMULATED_DEVICES, FaultProfile,
+                                   FoxSimulatedDevice, create_simulated_device)
+
+
+def build_discovery_datagram(device: FoxSimulatedDevice) -> bytes:
+    """Build discovery response datagram of given device.
+
+    Layout: response header, 6 bytes mac address, 2 bytes little endian device type.
+    """
+    datagram = (DEVICE_DISCOVERY_RESPONSE_HEADER.encode() + bytes.fromhex(device.mac_addr)
+        + device.dev_type.to_bytes(2, "little"))
+    return datagram.ljust(SIMULATOR_DISCOVERY_RESPONSE_SIZE, b"\x00")
+
+
+class DiscoveryResponderProtocol(asyncio.DatagramProtocol):
+    """Answers discovery requests on behalf of simulated devices."""
+
+    def __init__(self, simulator: FoxSimulator, mac_addr: str = None) -> None:
+        """Construct object.
+
+        Keyword arguments:
+        simulator -- simulator answering requests
+        mac_addr -- optional, answer only on behalf of given device
+        """
+        super().__init__()
+        self._simulator = simulator
+        self._mac_addr = mac_addr
+
+    def datagram_received(self, data: bytes, addr) -> None:
+        """Reply to discovery request with datagram of every online device."""
+        if data != DEVICE_DISCOVERY_REQUEST_HEADER.encode():
+            return
+        self._simulator.answer_discovery(addr, self._mac_addr)
+
+    def error_received(self, exc):
+        """Error received in UDP data."""
+        _LOGGER.error("Simulator discovery responder error: %s", exc)
+
+
+class FoxSimulator:
+    """Simulates many F&F Fox devices on local machine.
+
+    Every device gets own HTTP server. By default all devices share one address and
+    use different ports, so DeviceData host contains port. With unique_addresses each
+    device gets own loopback address (127.0.0.0/8 is local on Linux) and the same port,
+    then device answers unicast discovery requests sent to its address and replies
+    are sent from device address like real devices do.
+    """
+
+    def __init__(self, devices: list = None, host: str = "127.0.0.1",
+                discovery_port: int = SIMULATOR_DISCOVERY_PORT,
+                unique_addresses: bool = False, http_port: int = 0) -> None:
+        """Construct simulator.
+
+        Keyword arguments:
+        devices -- optional, list of FoxSimulatedDevice objects
+        host -- address of HTTP servers and discovery responder, first address
+            if unique_addresses is used
+        discovery_port -- UDP port of discovery responder, None disables responder
+        unique_addresses -- give every device own address
+        http_port -- HTTP port, 0 means random port for every device
+        """
+        self.host = host
+        self.discovery_port = discovery_port
+        self.unique_addresses = unique_addresses
+        self.http_port = http_port
+        self._devices = {}
+        #Device (address, port), key: mac address
+        self._addresses = {}
+        self.__servers = {}
+        #Device discovery responders, key: mac address
+        self.__device_responders = {}
+        self.__responder_transport = None
+        self.__churn_task: asyncio.Task = None
+        for device in devices or []:
+            self.add_device(device)
+
+    @classmethod
+    def create_fleet(cls, devices_count: int, types: list = None,
+                    fault_profile: FaultProfile = None, **kwargs) -> FoxSimulator:
+        """Create simulator with given number of devices.
+
+        Keyword arguments:
+        devices_count -- number of devices
+        types -- optional, device types assigned in round robin order, all supported
+            types are used if not provided
+        fault_profile -- optional, fault profile shared by all devices
+        kwargs -- FoxSimulator constructor arguments
+        """
+        types = types or list(SIMULATED_DEVICES)
+        return cls([
+            create_simulated_device(types[index % len(types)],
+                "f0f0{0:08x}".format(index), fault_profile)
+            for index in range(devices_count)
+        ], **kwargs)
+
+    async def __aenter__(self) -> FoxSimulator:
+        """Start simulator."""
+        await self.async_start()
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        """Stop simulator."""
+        await self.async_stop()
+
+    def add_device(self, device: FoxSimulatedDevice):
+        """Add device. Must be called before async_start()."""
+        address = self.host
+        if self.unique_addresses:
+            address = str(ipaddress.IPv4Address(self.host) + len(self._devices))
+        self._devices[device.mac_addr] = device
+        self._addresses[device.mac_addr] = (address, self.http_port)
+
+    def get_device(self, mac_addr: str) -> FoxSimulatedDevice:
+        """Return simulated device by mac address."""
+        return self._devices.get(mac_addr)
+
+    def get_devices(self) -> list:
+        """Return all simulated devices."""
+        return list(self._devices.values())
+
+    def get_host(self, mac_addr: str) -> str:
+        """Return host used by RestApiClient to connect to device."""
+        address, port = self._addresses[mac_addr]
+        return address if port == 80 else "{0}:{1}".format(address, port)
+
+    def get_device_data(self, api_key: str = "000") -> list:
+        """Return DeviceData list for all simulated devices."""
+        return [
+            DeviceData(None, self.get_host(mac_addr), api_key, mac_addr, device.dev_type)
+            for mac_addr, device in self._devices.items()
+        ]
+
+    def get_requests_count(self) -> int:
+        """Return number of RestAPI requests served by all devices."""
+        return sum(device.requests_count for device in self._devices.values())
+
+    async def async_start(self):
+        """Start HTTP servers and discovery responder."""
+        loop = asyncio.get_running_loop()
+        for mac_addr in self._devices:
+            await self.__async_start_server(mac_addr)
+        if self.discovery_port is None:
+            return
+        self.__responder_transport, _ = await loop.create_datagram_endpoint(
+            lambda: DiscoveryResponderProtocol(self),
+            local_addr=("0.0.0.0", self.discovery_port),
+            reuse_port=True,
+            allow_broadcast=True
+        )
+        self.discovery_port = self.__responder_transport.get_extra_info("sockname")[1]
+        if not self.unique_addresses:
+            return
+        #More specific bind gets unicast requests sent to device address.
+        for mac_addr in self._devices:
+            self.__device_responders[mac_addr], _ = await loop.create_datagram_endpoint(
+                lambda mac_addr=mac_addr: DiscoveryResponderProtocol(self, mac_addr),
+                local_addr=(self._addresses[mac_addr][0], self.discovery_port),
+                reuse_port=True
+            )
+
+    async def async_stop(self):
+        """Stop all servers."""
+        self.stop_churn()
+        for mac_addr in list(self.__servers):
+            await self.__async_stop_server(mac_addr)
+        for transport in self.__device_responders.values():
+            transport.close()
+        self.__device_responders = {}
+        if self.__responder_transport is not None:
+            self.__responder_transport.close()
+            self.__responder_transport = None
+
+    async def __async_start_server(self, mac_addr: str):
+        """Start HTTP server of single device."""
+        device = self._devices[mac_addr]
+        address, port = self._addresses[mac_addr]
+        handler = web.Server(lambda request: self.__async_handle_request(device, request),
+            access_log=None)
+        server = await asyncio.get_running_loop().create_server(
+            handler, address, port, reuse_address=True)
+        self.__servers[mac_addr] = (server, handler)
+        #Keep the same port when device goes back online.
+        self._addresses[mac_addr] = (address, server.sockets[0].getsockname()[1])
+
+    async def __async_stop_server(self, mac_addr: str):
+        """Stop HTTP server of single device."""
+        server, handler = self.__servers.pop(mac_addr, (None, None))
+        if server is not None:
+            server.close()
+            #Close keep-alive connections, offline device must drop them too.
+            await handler.shutdown(0)
+            await server.wait_closed()
+
+    async def __async_handle_request(self, device: FoxSimulatedDevice,
+                                    request: web.BaseRequest) -> web.StreamResponse:
+        """Handle RestAPI request, url format: /api_key/method/."""
+        faults = device.fault_profile
+        latency = faults.get_latency()
+        if latency > 0:
+            await asyncio.sleep(latency)
+        if faults.should_drop():
+            request.transport.abort()
+            return web.Response()
+        parts = [part for part in request.path.split("/") if part]
+        method = parts[1] if len(parts) > 1 else ""
+        body = json.dumps(device.handle(method, request.query)).encode()
+        if faults.slow_read_delay <= 0:
+            return web.Response(body=body, content_type="application/json")
+        response = web.StreamResponse(headers={"Content-Type": "application/json"})
+        response.content_length = len(body)
+        await response.prepare(request)
+        for index in range(0, len(body), 8):
+            await response.write(body[index:index + 8])
+            await asyncio.sleep(faults.slow_read_delay)
+        await response.write_eof()
+        return response
+
+    def answer_discovery(self, addr, mac_addr: str = None):
+        """Send discovery response of online devices to given address.
+
+        Keyword arguments:
+        addr -- requester address
+        mac_addr -- optional, answer only on behalf of given device
+        """
+        for device_mac_addr, device in self._devices.items():
+            if not device.online or mac_addr not in (None, device_mac_addr):
+                continue
+            transport = self.__device_responders.get(device_mac_addr, self.__responder_transport)
+            transport.sendto(build_discovery_datagram(device), addr)
+
+    async def async_set_online(self, mac_addr: str, online: bool):
+        """Bring device online or offline. Offline device refuses connections."""
+        device = self._devices[mac_addr]
+        if device.online == online:
+            return
+        device.online = online
+        if online:
+            await self.__async_start_server(mac_addr)
+        else:
+            await self.__async_stop_server(mac_addr)
+
+    def start_churn(self, interval: float, offline_probability: float):
+        """Randomly toggle devices availability every interval seconds.
+
+        Keyword arguments:
+        interval -- toggle interval in seconds
+        offline_probability -- probability that device is offline in given interval
+        """
+        self.stop_churn()
+        self.__churn_task = asyncio.ensure_future(
+            self.__async_churn(interval, offline_probability))
+
+    def stop_churn(self):
+        """Stop toggling devices availability."""
+        if self.__churn_task is not None:
+            self.__churn_task.cancel()
+            self.__churn_task = None
+
+    async def __async_churn(self, interval: float, offline_probability: float):
+        """Toggle devices availability until cancelled."""
+        while True:
+            await asyncio.sleep(interval)
+            for mac_addr in list(self._devices):
+                await self.async_set_online(mac_addr, random.random() >= offline_probability)
@@ -25,4 +25,8 @@ setup(
         'aiohttp',
         'requests'
     ],
+    extras_require={
+        #Fleet snapshot columns as NumPy arrays and vectorised aggregation
+        'numpy': ['numpy']
+    },
 )
@@ -0,0 +1,83 @@
+import asyncio
+import json
+import unittest
+import sys
+from os import path
+sys.path.append( path.dirname( path.dirname( path.abspath(__file__) ) ) )
+
+from aiohttp import web
+
+from foxrestapiclient.devices.const import DEVICE_TYPE_R1S1
+from foxrestapiclient.devices.fox_r1s1_device import DeviceData, FoxR1S1Device
+
+def async_test(coro):
+    def wrapper(*args, **kwargs):
+        loop = asyncio.new_event_loop()
+        try:
+            return loop.run_until_complete(coro(*args, **kwargs))
+        finally:
+            loop.close()
+    return wrapper
+
+class SlowR1S1Server:
+    """Local R1S1 endpoint which tracks number of requests in progress."""
+
+    def __init__(self, latency):
+        self.latency = latency
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.runner = None
+
+    async def handle(self, request):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.latency)
+        finally:
+            self.in_flight -= 1
+        method = request.match_info["method"]
+        body = {"status": "ok"}
+        if method == "get_state":
+            body["state"] = "on"
+        elif method == "get_current_energy":
+            body["voltage"] = "230.1"
+        return web.Response(text=json.dumps(body))
+
+    async def async_start(self) -> str:
+        app = web.Application()
+        app.router.add_get("/{api_key}/{method}/", self.handle)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, "127.0.0.1", 0)
+        await site.start()
+        return "127.0.0.1:{0}".format(site._server.sockets[0].getsockname()[1])
+
+class ConcurrentRefreshTest(unittest.TestCase):
+
+    async def fetch_update(self, concurrent, max_parallel_requests = None):
+        server = SlowR1S1Server(0.1)
+        host = await server.async_start()
+        try:
+            async with FoxR1S1Device(DeviceData(None, host, "000", "mac", DEVICE_TYPE_R1S1)) as device:
+                device.set_concurrent_refresh(concurrent, max_parallel_requests)
+                await device.async_fetch_update()
+                self.assertTrue(device.is_on())
+                self.assertEqual(device.fetch_sensor_value_by_key("voltage"), "230.1")
+        finally:
+            await server.runner.cleanup()
+        return server.max_in_flight
+
+    @async_test
+    async def test_sequential_refresh(self):
+        self.assertEqual(await self.fetch_update(False), 1)
+
+    @async_test
+    async def test_concurrent_refresh(self):
+        self.assertEqual(await self.fetch_update(True), 3)
+
+    @async_test
+    async def test_concurrent_refresh_cap(self):
+        self.assertEqual(await self.fetch_update(True, 2), 2)
+
+if __name__ == '__main__':
+    unittest.main()
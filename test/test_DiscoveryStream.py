@@ -0,0 +1,68 @@
+import asyncio
+import time
+import unittest
+import sys
+from os import path
+sys.path.append( path.dirname( path.dirname( path.abspath(__file__) ) ) )
+
+from foxrestapiclient.devices.fox_service_discovery import FoxServiceDiscovery
+from foxrestapiclient.testing.fox_simulator import FoxSimulator
+
+def async_test(coro):
+    def wrapper(*args, **kwargs):
+        loop = asyncio.new_event_loop()
+        try:
+            return loop.run_until_complete(coro(*args, **kwargs))
+        finally:
+            loop.close()
+    return wrapper
+
+def create_discovery(simulator):
+    return FoxServiceDiscovery(("127.0.0.1", simulator.discovery_port), local_port=0)
+
+class DiscoveryStreamTest(unittest.TestCase):
+
+    @async_test
+    async def test_stops_on_expected_count(self):
+        async with FoxSimulator.create_fleet(4, discovery_port=0) as simulator:
+            start = time.monotonic()
+            found = [device async for device in
+                create_discovery(simulator).stream(expected_count=4, timeout=10)]
+            self.assertEqual(len(found), 4)
+            self.assertLess(time.monotonic() - start, 1)
+
+    @async_test
+    async def test_stops_on_expected_macs(self):
+        async with FoxSimulator.create_fleet(4, discovery_port=0) as simulator:
+            expected = [device.mac_addr for device in simulator.get_device_data()[:2]]
+            found = [device.mac_addr async for device in
+                create_discovery(simulator).stream(expected_macs=expected, timeout=10)]
+            self.assertTrue(set(expected).issubset(found))
+
+    @async_test
+    async def test_stops_on_quiet_period(self):
+        async with FoxSimulator.create_fleet(3, discovery_port=0) as simulator:
+            start = time.monotonic()
+            found = [device async for device in
+                create_discovery(simulator).stream(quiet_period=0.3, timeout=10)]
+            self.assertEqual(len(found), 3)
+            self.assertLess(time.monotonic() - start, 2)
+
+    @async_test
+    async def test_yields_each_device_once_with_many_probes(self):
+        async with FoxSimulator.create_fleet(2, discovery_port=0) as simulator:
+            discovery = create_discovery(simulator)
+            found = [device.mac_addr async for device in discovery.stream(
+                quiet_period=None, timeout=0.5, probe_interval=0.05, max_probe_interval=0.1)]
+            self.assertEqual(sorted(found), sorted(set(found)))
+            self.assertEqual(len(discovery.get_discovered_devices()), 2)
+
+    @async_test
+    async def test_discover_devices_early_stop(self):
+        async with FoxSimulator.create_fleet(2, discovery_port=0) as simulator:
+            discovered = await create_discovery(simulator).async_discover_devices(
+                expected_count=2)
+            self.assertEqual(len(discovered), 2)
+
+if __name__ == '__main__':
+    unittest.main()
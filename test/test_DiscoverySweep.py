@@ -0,0 +1,58 @@
+import asyncio
+import time
+import unittest
+import sys
+from os import path
+sys.path.append( path.dirname( path.dirname( path.abspath(__file__) ) ) )
+
+from foxrestapiclient.devices.fox_service_discovery import (FoxServiceDiscovery,
+                                                            expand_sweep_targets)
+from foxrestapiclient.testing.fox_simulator import FoxSimulator
+
+def async_test(coro):
+    def wrapper(*args, **kwargs):
+        loop = asyncio.new_event_loop()
+        try:
+            return loop.run_until_complete(coro(*args, **kwargs))
+        finally:
+            loop.close()
+    return wrapper
+
+class DiscoverySweepTest(unittest.TestCase):
+
+    def test_expand_targets(self):
+        self.assertEqual(expand_sweep_targets(["10.0.0.0/30", "10.0.0.2", "10.0.0.9"]),
+            ["10.0.0.1", "10.0.0.2", "10.0.0.9"])
+        self.assertEqual(len(expand_sweep_targets(["192.168.8.0/22"])), 1022)
+        with self.assertRaises(ValueError):
+            expand_sweep_targets(["not address"])
+
+    @async_test
+    async def test_sweep_finds_devices_by_address(self):
+        async with FoxSimulator.create_fleet(3, host="127.0.1.1", discovery_port=0,
+                unique_addresses=True) as simulator:
+            discovery = FoxServiceDiscovery(local_port=0)
+            found = [device async for device in discovery.sweep(["127.0.1.0/29"],
+                port=simulator.discovery_port, reply_timeout=0.3)]
+            self.assertEqual(sorted((device.host, device.mac_addr) for device in found),
+                sorted((simulator.get_host(device.mac_addr).split(":")[0], device.mac_addr)
+                for device in simulator.get_devices()))
+
+    @async_test
+    async def test_sweep_rate_limit_and_early_stop(self):
+        async with FoxSimulator.create_fleet(2, host="127.0.2.1", discovery_port=0,
+                unique_addresses=True) as simulator:
+            discovery = FoxServiceDiscovery(local_port=0)
+            start = time.monotonic()
+            found = [device async for device in discovery.sweep(["127.0.2.0/24"],
+                port=simulator.discovery_port, rate=1000, passes=1, reply_timeout=0.1)]
+            self.assertEqual(len(found), 2)
+            self.assertGreater(time.monotonic() - start, 0.2)
+            start = time.monotonic()
+            found = [device async for device in discovery.sweep(["127.0.2.0/24"],
+                port=simulator.discovery_port, rate=100, expected_count=2)]
+            self.assertEqual(len(found), 2)
+            self.assertLess(time.monotonic() - start, 1)
+
+if __name__ == '__main__':
+    unittest.main()
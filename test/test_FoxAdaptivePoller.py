@@ -0,0 +1,71 @@
+import asyncio
+import unittest
+import sys
+from os import path
+sys.path.append( path.dirname( path.dirname( path.abspath(__file__) ) ) )
+
+from foxrestapiclient.devices.const import DEVICE_TYPE_R1S1, DEVICE_TYPE_R2S2
+from foxrestapiclient.devices.fox_adaptive_poller import FoxAdaptivePoller
+from foxrestapiclient.devices.fox_device_factory import create_device
+from foxrestapiclient.devices.fox_fleet import FoxFleet
+from foxrestapiclient.testing.fox_simulator import FoxSimulator
+
+def async_test(coro):
+    def wrapper(*args, **kwargs):
+        loop = asyncio.new_event_loop()
+        try:
+            return loop.run_until_complete(coro(*args, **kwargs))
+        finally:
+            loop.close()
+    return wrapper
+
+class FoxAdaptivePollerTest(unittest.TestCase):
+
+    @async_test
+    async def test_intervals_follow_changes(self):
+        async with FoxSimulator.create_fleet(3, [DEVICE_TYPE_R1S1, DEVICE_TYPE_R2S2],
+                discovery_port=None) as simulator:
+            fleet = FoxFleet([create_device(device_data)
+                for device_data in simulator.get_device_data()])
+            meter, relay, offline = fleet.get_devices()
+            await simulator.async_set_online(offline.mac_addr, False)
+            poller = FoxAdaptivePoller(fleet, min_interval=0.05, max_interval=0.4,
+                unavailable_max_interval=1)
+            run_task = asyncio.ensure_future(poller.async_run())
+            #Retries of offline device make first batches slower
+            await asyncio.sleep(2)
+            #Meter values change on every poll, relay state never changes.
+            self.assertEqual(poller.get_interval(meter.mac_addr), 0.05)
+            self.assertEqual(poller.get_interval(relay.mac_addr), 0.4)
+            self.assertGreater(poller.get_interval(offline.mac_addr), 0.4)
+            meter_requests = simulator.get_device(meter.mac_addr).requests_count
+            relay_requests = simulator.get_device(relay.mac_addr).requests_count
+            self.assertGreater(meter_requests, relay_requests * 3)
+
+            self.assertTrue(await relay.async_update_channel_state(True, 1))
+            await asyncio.sleep(0.8)
+            self.assertTrue(relay.is_on(1))
+            self.assertLess(poller.get_interval(relay.mac_addr), 0.4)
+            poller.stop()
+            await run_task
+            await fleet.async_close()
+
+    @async_test
+    async def test_removed_device_is_forgotten(self):
+        async with FoxSimulator.create_fleet(2, [DEVICE_TYPE_R2S2],
+                discovery_port=None) as simulator:
+            fleet = FoxFleet([create_device(device_data)
+                for device_data in simulator.get_device_data()])
+            poller = FoxAdaptivePoller(fleet, min_interval=0.05, max_interval=0.2)
+            run_task = asyncio.ensure_future(poller.async_run())
+            await asyncio.sleep(0.2)
+            removed = fleet.remove_device(fleet.get_devices()[0].mac_addr)
+            await asyncio.sleep(0.2)
+            self.assertEqual(list(poller.get_intervals()), [fleet.get_devices()[0].mac_addr])
+            poller.stop()
+            await run_task
+            await removed.async_close()
+            await fleet.async_close()
+
+if __name__ == '__main__':
+    unittest.main()
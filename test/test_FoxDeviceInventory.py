@@ -0,0 +1,110 @@
+import asyncio
+import json
+import os
+import tempfile
+import unittest
+import sys
+from os import path
+sys.path.append( path.dirname( path.dirname( path.abspath(__file__) ) ) )
+
+from foxrestapiclient.devices.const import DEVICE_TYPE_R1S1, DEVICE_TYPE_R2S2
+from foxrestapiclient.devices.fox_base_device import DeviceData
+from foxrestapiclient.devices.fox_device_inventory import FoxDeviceInventory
+from foxrestapiclient.devices.fox_r2s2_device import FoxR2S2Device
+from foxrestapiclient.testing.fox_simulator import FoxSimulator
+
+def async_test(coro):
+    def wrapper(*args, **kwargs):
+        loop = asyncio.new_event_loop()
+        try:
+            return loop.run_until_complete(coro(*args, **kwargs))
+        finally:
+            loop.close()
+    return wrapper
+
+class FoxDeviceInventoryTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.file_path = os.path.join(self.directory.name, "inventory.json")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    @async_test
+    async def test_validate_and_restore(self):
+        async with FoxSimulator.create_fleet(2, [DEVICE_TYPE_R1S1, DEVICE_TYPE_R2S2],
+                discovery_port=None) as simulator:
+            inventory = FoxDeviceInventory(self.file_path)
+            self.assertEqual(inventory.apply_discovery(simulator.get_device_data()),
+                [device.mac_addr for device in simulator.get_device_data()])
+            devices = inventory.create_devices()
+            changed = await inventory.async_validate(devices)
+            self.assertEqual(len(changed), 2)
+            self.assertEqual(await inventory.async_validate(devices), [])
+            for device in devices:
+                await device.async_close()
+
+            restored = FoxDeviceInventory(self.file_path)
+            self.assertTrue(restored.load())
+            devices = restored.create_devices()
+            self.assertEqual(len(devices), 2)
+            self.assertIsInstance(devices[1], FoxR2S2Device)
+            self.assertEqual(devices[0].get_device_info()["sw_version"],
+                simulator.get_devices()[0].firmware)
+
+            simulator.get_devices()[0].firmware = "9.9.9"
+            self.assertEqual(await restored.async_validate(devices), [devices[0].mac_addr])
+            for device in devices:
+                await device.async_close()
+
+    def test_ip_change_invalidates_device_info(self):
+        inventory = FoxDeviceInventory(self.file_path)
+        device_data = DeviceData(None, "192.168.0.10", "000", "f0f000000001", DEVICE_TYPE_R1S1)
+        inventory.update(device_data)
+        inventory.update(device_data, object.__new__(FoxDeviceInventoryTest.Info))
+        self.assertIsNotNone(inventory.get_device_info(device_data.mac_addr))
+        self.assertEqual(inventory.apply_discovery([DeviceData(
+            "R1S1", "192.168.0.11", "000", device_data.mac_addr, DEVICE_TYPE_R1S1)]),
+            [device_data.mac_addr])
+        self.assertIsNone(inventory.get_device_info(device_data.mac_addr))
+        self.assertEqual(inventory.get_device_data(device_data.mac_addr).host, "192.168.0.11")
+        self.assertEqual(inventory.apply_discovery([DeviceData(
+            "R1S1", "192.168.0.11", "000", device_data.mac_addr, DEVICE_TYPE_R1S1)]), [])
+
+    def test_update_does_not_change_caller_data(self):
+        inventory = FoxDeviceInventory(self.file_path)
+        inventory.update(DeviceData("Meter", "192.168.0.10", "000", "f0f000000001",
+            DEVICE_TYPE_R1S1))
+        device_data = DeviceData(None, "192.168.0.11", "000", "f0f000000001", DEVICE_TYPE_R1S1)
+        self.assertTrue(inventory.update(device_data))
+        self.assertIsNone(device_data.name)
+        stored = inventory.get_device_data("f0f000000001")
+        self.assertIsNot(stored, device_data)
+        self.assertEqual((stored.name, stored.host), ("Meter", "192.168.0.11"))
+
+    def test_invalid_entries_skipped(self):
+        with open(self.file_path, "w") as inventory_file:
+            json.dump({"version": 1, "devices": {
+                "f0f000000001": {"host": "10.0.0.1", "api_key": "000", "dev_type": 4},
+                "f0f000000002": {"host": "10.0.0.2", "api_key": "000", "dev_type": 999},
+                "nothex": {"host": "10.0.0.3", "api_key": "000", "dev_type": 4}
+            }}, inventory_file)
+        inventory = FoxDeviceInventory(self.file_path)
+        self.assertTrue(inventory.load())
+        self.assertEqual(len(inventory), 1)
+        self.assertIn("f0f000000001", inventory)
+
+    def test_missing_and_broken_file(self):
+        inventory = FoxDeviceInventory(self.file_path)
+        self.assertFalse(inventory.load())
+        with open(self.file_path, "w") as inventory_file:
+            inventory_file.write("{broken")
+        self.assertFalse(inventory.load())
+        self.assertEqual(len(inventory), 0)
+
+    class Info:
+        firmware = "1.0.0"
+
+if __name__ == '__main__':
+    unittest.main()
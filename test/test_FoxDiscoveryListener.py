@@ -0,0 +1,72 @@
+import asyncio
+import unittest
+import sys
+from os import path
+sys.path.append( path.dirname( path.dirname( path.abspath(__file__) ) ) )
+
+from foxrestapiclient.devices.const import (DISCOVERY_EVENT_ADDED,
+                                            DISCOVERY_EVENT_CHANGED,
+                                            DISCOVERY_EVENT_REMOVED)
+from foxrestapiclient.devices.fox_discovery_listener import FoxDiscoveryListener
+from foxrestapiclient.testing.fox_simulator import FoxSimulator, build_discovery_datagram
+
+def async_test(coro):
+    def wrapper(*args, **kwargs):
+        loop = asyncio.new_event_loop()
+        try:
+            return loop.run_until_complete(coro(*args, **kwargs))
+        finally:
+            loop.close()
+    return wrapper
+
+class FoxDiscoveryListenerTest(unittest.TestCase):
+
+    @async_test
+    async def test_added_and_expired(self):
+        async with FoxSimulator.create_fleet(3, discovery_port=0) as simulator:
+            listener = FoxDiscoveryListener(("127.0.0.1", simulator.discovery_port),
+                local_port=0, probe_interval=0.1, expire_after=0.35)
+            events = []
+            listener.subscribe(events.append)
+            async with listener:
+                await asyncio.sleep(0.3)
+                self.assertEqual(len(listener.get_devices()), 3)
+                self.assertEqual([event.kind for event in events], [DISCOVERY_EVENT_ADDED] * 3)
+                offline = simulator.get_devices()[0]
+                await simulator.async_set_online(offline.mac_addr, False)
+                await asyncio.sleep(0.6)
+            self.assertEqual(events[-1].kind, DISCOVERY_EVENT_REMOVED)
+            self.assertEqual(events[-1].device.mac_addr, offline.mac_addr)
+            self.assertIsNone(listener.get_device(offline.mac_addr))
+            self.assertEqual(len(listener.get_devices()), 2)
+            self.assertFalse(listener.is_running())
+
+    def test_changed_address(self):
+        simulator = FoxSimulator.create_fleet(1, discovery_port=None)
+        datagram = build_discovery_datagram(simulator.get_devices()[0])
+        listener = FoxDiscoveryListener(local_port=0)
+        events = []
+        unsubscribe = listener.subscribe(events.append)
+        listener.parse_received_datagram(datagram, ("192.168.0.10", 1918))
+        listener.parse_received_datagram(datagram, ("192.168.0.10", 1918))
+        listener.parse_received_datagram(datagram, ("192.168.0.11", 1918))
+        self.assertEqual([event.kind for event in events],
+            [DISCOVERY_EVENT_ADDED, DISCOVERY_EVENT_CHANGED])
+        self.assertEqual(events[1].previous.host, "192.168.0.10")
+        self.assertEqual(events[1].device.host, "192.168.0.11")
+        unsubscribe()
+        listener.parse_received_datagram(datagram, ("192.168.0.12", 1918))
+        self.assertEqual(len(events), 2)
+
+    def test_subscriber_error_does_not_break_listener(self):
+        simulator = FoxSimulator.create_fleet(1, discovery_port=None)
+        listener = FoxDiscoveryListener(local_port=0)
+        events = []
+        listener.subscribe(lambda event: 1 / 0)
+        listener.subscribe(events.append)
+        listener.parse_received_datagram(
+            build_discovery_datagram(simulator.get_devices()[0]), ("10.0.0.1", 1918))
+        self.assertEqual(len(events), 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+import asyncio
+import unittest
+import sys
+from os import path
+sys.path.append( path.dirname( path.dirname( path.abspath(__file__) ) ) )
+
+from foxrestapiclient.devices.const import DEVICE_TYPE_R2S2
+from foxrestapiclient.devices.fox_base_device import DeviceData, FoxBaseDevice
+from foxrestapiclient.devices.fox_fleet import FoxFleet
+from .const import API_KEY, HOST
+
+def async_test(coro):
+    def wrapper(*args, **kwargs):
+        loop = asyncio.new_event_loop()
+        try:
+            return loop.run_until_complete(coro(*args, **kwargs))
+        finally:
+            loop.close()
+    return wrapper
+
+class FakeDevice(FoxBaseDevice):
+    """Device which simulates poll without network."""
+    running = 0
+    max_running = 0
+
+    def __init__(self, mac_addr, delay = 0.01, available = True):
+        super().__init__(DeviceData(None, HOST, API_KEY, mac_addr, DEVICE_TYPE_R2S2))
+        self.delay = delay
+        self.available = available
+
+    def is_on(self, channel: int = None):
+        return False
+
+    async def async_fetch_update(self):
+        FakeDevice.running += 1
+        FakeDevice.max_running = max(FakeDevice.max_running, FakeDevice.running)
+        try:
+            await asyncio.sleep(self.delay)
+            self.is_available = self.available
+        finally:
+            FakeDevice.running -= 1
+
+class FoxFleetTest(unittest.TestCase):
+
+    @async_test
+    async def test_async_poll_concurrency_limit(self):
+        FakeDevice.max_running = 0
+        fleet = FoxFleet([FakeDevice(str(i)) for i in range(20)], max_concurrency=4)
+        result = await fleet.async_poll()
+        self.assertEqual(len(result.succeeded), 20)
+        self.assertEqual(FakeDevice.max_running, 4)
+        self.assertEqual(len(result.device_durations), 20)
+        await fleet.async_close()
+
+    @async_test
+    async def test_async_poll_results(self):
+        fleet = FoxFleet([
+            FakeDevice("ok"),
+            FakeDevice("failed", available=False),
+            FakeDevice("slow", delay=1)
+        ], poll_timeout=0.1)
+        result = await fleet.async_poll(spread=0.05)
+        self.assertEqual(result.succeeded, ["ok"])
+        self.assertEqual(result.failed, ["failed"])
+        self.assertEqual(result.timed_out, ["slow"])
+        self.assertEqual(result.get_polled_count(), 3)
+        self.assertIs(fleet.last_poll_result, result)
+        get_available = lambda: dict(zip(fleet.snapshot.get_row_keys(),
+            fleet.snapshot.get_column("available")))
+        self.assertEqual(get_available(), {("ok", 0): 1, ("failed", 0): 0, ("slow", 0): 0})
+        #Device which answered before is marked unavailable after timeout
+        slow = fleet.get_device("slow")
+        slow.delay = 0.01
+        await fleet.async_poll()
+        self.assertEqual(get_available()[("slow", 0)], 1)
+        slow.delay = 1
+        await fleet.async_poll()
+        self.assertEqual(get_available()[("slow", 0)], 0)
+        await fleet.async_close()
+
+    @async_test
+    async def test_add_remove_device(self):
+        fleet = FoxFleet()
+        device = FakeDevice("mac")
+        fleet.add_device(device)
+        self.assertIs(fleet.get_device("mac"), device)
+        self.assertIs(fleet.remove_device("mac"), device)
+        self.assertEqual(fleet.get_devices(), [])
+        await device.async_close()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,122 @@
+import asyncio
+import math
+import unittest
+import sys
+from os import path
+sys.path.append( path.dirname( path.dirname( path.abspath(__file__) ) ) )
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from foxrestapiclient.devices.const import (DEVICE_TYPE_LED2S2, DEVICE_TYPE_R1S1,
+                                            DEVICE_TYPE_STR1S2)
+from foxrestapiclient.devices.fox_base_device import DeviceData, FoxBaseDevice
+from foxrestapiclient.devices.fox_device_factory import create_device
+from foxrestapiclient.devices.fox_fleet import FoxFleet
+from foxrestapiclient.devices.fox_fleet_snapshot import FoxFleetSnapshot
+from foxrestapiclient.testing.fox_simulator import FoxSimulator
+from .const import API_KEY, HOST
+
+def async_test(coro):
+    def wrapper(*args, **kwargs):
+        loop = asyncio.new_event_loop()
+        try:
+            return loop.run_until_complete(coro(*args, **kwargs))
+        finally:
+            loop.close()
+    return wrapper
+
+class FakeDevice(FoxBaseDevice):
+    """Device with state values set by test."""
+
+    def __init__(self, mac_addr: str, values: dict):
+        super().__init__(DeviceData(None, HOST, API_KEY, mac_addr, DEVICE_TYPE_R1S1))
+        self.values = values
+        self.is_available = True
+
+    def is_on(self, channel: int = None):
+        return self.values.get(("state", channel)) is True
+
+    def get_state_values(self) -> dict:
+        return dict(self.values)
+
+    async def async_fetch_update(self):
+        pass
+
+class FoxFleetSnapshotTest(unittest.TestCase):
+
+    @unittest.skipUnless(numpy, "NumPy is not installed")
+    def test_numpy_columns(self):
+        snapshot = FoxFleetSnapshot()
+        self.assertEqual(snapshot.count(snapshot.mask("state", lambda value: value == 1)), 0)
+        self.assertEqual(snapshot.sum("power_active"), 0)
+        devices = [
+            FakeDevice("a", {("state", None): True, ("power_active", None): "10.5"}),
+            FakeDevice("b", {("state", None): False, ("power_active", None): "2.0"}),
+            FakeDevice("c", {("state", 1): True, ("state", 2): True}),
+        ]
+        for device in devices:
+            snapshot.update_device(device)
+        snapshot.set_group("a", "floor 1")
+        snapshot.set_group("c", "floor 1")
+        column = snapshot.get_column("power_active")
+        self.assertIsInstance(column, numpy.ndarray)
+        #Column is a copy, changing it does not change snapshot
+        column[:] = 0
+        self.assertAlmostEqual(snapshot.sum("power_active"), 12.5)
+        on = snapshot.mask("state", lambda value: value == 1)
+        self.assertIsInstance(on, numpy.ndarray)
+        self.assertEqual(snapshot.count(on), 3)
+        metered = snapshot.mask("power_active", lambda value: value > 0)
+        self.assertEqual(snapshot.count(on & metered), 1)
+        self.assertAlmostEqual(snapshot.sum("power_active", on), 10.5)
+        self.assertEqual(snapshot.group_count(), {"floor 1": 3, None: 1})
+        self.assertEqual(snapshot.group_sum("power_active", on), {"floor 1": 10.5})
+        #Aggregations do not keep views which would block resizing of columns
+        snapshot.remove_device("b")
+        snapshot.update_device(FakeDevice("d", {("state", None): True}))
+        self.assertEqual(snapshot.count(snapshot.mask("state", lambda value: value == 1)), 4)
+
+    @async_test
+    async def test_snapshot_aggregations(self):
+        types = [DEVICE_TYPE_R1S1, DEVICE_TYPE_R1S1, DEVICE_TYPE_LED2S2, DEVICE_TYPE_STR1S2]
+        async with FoxSimulator.create_fleet(4, types, discovery_port=None) as simulator:
+            fleet = FoxFleet([create_device(data) for data in simulator.get_device_data()])
+            try:
+                meters = [device for device in fleet.get_devices()
+                    if device.dev_type == DEVICE_TYPE_R1S1]
+                light = [device for device in fleet.get_devices()
+                    if device.dev_type == DEVICE_TYPE_LED2S2][0]
+                snapshot = fleet.snapshot
+                snapshot.set_group(meters[0].mac_addr, "floor 1")
+                snapshot.set_group(light.mac_addr, "floor 1")
+                await light.async_update_channel_state(True, 1)
+                await fleet.async_poll()
+                #R1S1 and STR1S2 have device wide row, LED2S2 has row per channel
+                self.assertEqual(len(snapshot), 5)
+                snapshot.set_group(meters[1].mac_addr, "floor 2")
+                expected_power = sum(float(meter.fetch_sensor_value_by_key("power_active"))
+                    for meter in meters)
+                self.assertAlmostEqual(snapshot.sum("power_active"), expected_power)
+                self.assertEqual(snapshot.sum("available"), 5)
+                on = snapshot.mask("state", lambda value: value == 1)
+                self.assertEqual(snapshot.count(on), 1 + sum(meter.is_on() for meter in meters))
+                self.assertEqual(snapshot.group_count(), {"floor 1": 3, "floor 2": 1, None: 1})
+                self.assertAlmostEqual(snapshot.group_sum("power_active")["floor 2"],
+                    float(meters[1].fetch_sensor_value_by_key("power_active")))
+                cover_row = [key[0] for key in snapshot.get_row_keys()].index(
+                    [device for device in fleet.get_devices()
+                        if device.dev_type == DEVICE_TYPE_STR1S2][0].mac_addr)
+                self.assertTrue(math.isnan(snapshot.get_column("state")[cover_row]))
+                self.assertGreater(snapshot.get_column("updated")[cover_row], 0)
+                await fleet.remove_device(light.mac_addr).async_close()
+                self.assertEqual(len(snapshot), 3)
+                self.assertEqual(snapshot.group_count(), {"floor 1": 1, "floor 2": 1, None: 1})
+                self.assertAlmostEqual(snapshot.sum("power_active"), expected_power)
+            finally:
+                await fleet.async_close()
+
+if __name__ == '__main__':
+    unittest.main()
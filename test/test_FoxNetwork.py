@@ -0,0 +1,50 @@
+import asyncio
+import unittest
+import sys
+from os import path
+sys.path.append( path.dirname( path.dirname( path.abspath(__file__) ) ) )
+
+from foxrestapiclient.devices.const import DISCOVERY_BROADCAST_ADDRESS, DISCOVERY_DEVICE_PORT
+from foxrestapiclient.devices.fox_network import (NetworkInterface, get_ipv4_interfaces,
+                                                  get_probe_targets)
+from foxrestapiclient.devices.fox_service_discovery import FoxServiceDiscovery
+from foxrestapiclient.testing.fox_simulator import FoxSimulator
+
+def async_test(coro):
+    def wrapper(*args, **kwargs):
+        loop = asyncio.new_event_loop()
+        try:
+            return loop.run_until_complete(coro(*args, **kwargs))
+        finally:
+            loop.close()
+    return wrapper
+
+class FoxNetworkTest(unittest.TestCase):
+
+    def test_broadcast_address(self):
+        interface = NetworkInterface("eth1", "192.168.10.17", "255.255.255.0")
+        self.assertEqual(interface.broadcast, "192.168.10.255")
+        interface = NetworkInterface("eth2", "10.1.130.5", "255.255.192.0")
+        self.assertEqual(interface.broadcast, "10.1.191.255")
+
+    def test_probe_targets(self):
+        self.assertEqual(get_probe_targets(("127.0.0.1", 2000)),
+            [("0.0.0.0", ("127.0.0.1", 2000))])
+        self.assertEqual(get_probe_targets(interface_names=[]),
+            [("0.0.0.0", (DISCOVERY_BROADCAST_ADDRESS, DISCOVERY_DEVICE_PORT))])
+        for interface in get_ipv4_interfaces():
+            self.assertIn((interface.address, (interface.broadcast, DISCOVERY_DEVICE_PORT)),
+                get_probe_targets())
+
+    @async_test
+    async def test_discovery_on_interfaces(self):
+        if not get_ipv4_interfaces():
+            self.skipTest("No broadcast interfaces")
+        async with FoxSimulator.create_fleet(3) as simulator:
+            discovery = FoxServiceDiscovery(local_port=0)
+            found = [device async for device in discovery.stream(expected_count=3, timeout=3)]
+            self.assertEqual(sorted(device.mac_addr for device in found),
+                sorted(device.mac_addr for device in simulator.get_devices()))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,120 @@
+import asyncio
+import unittest
+import sys
+from os import path
+sys.path.append( path.dirname( path.dirname( path.abspath(__file__) ) ) )
+
+import aiohttp
+
+from foxrestapiclient.connection.rest_api_metrics import RestApiMetricsAggregator
+from foxrestapiclient.devices.const import DEVICE_TYPE_R1S1, OPENMETRICS_PATH
+from foxrestapiclient.devices.fox_base_device import DeviceData, FoxBaseDevice
+from foxrestapiclient.devices.fox_fleet import FoxFleet
+from foxrestapiclient.devices.fox_openmetrics import FoxOpenMetricsExporter
+from .const import API_KEY, HOST
+
+def async_test(coro):
+    def wrapper(*args, **kwargs):
+        loop = asyncio.new_event_loop()
+        try:
+            return loop.run_until_complete(coro(*args, **kwargs))
+        finally:
+            loop.close()
+    return wrapper
+
+class FakeDevice(FoxBaseDevice):
+    """Device with state values set by test."""
+
+    def __init__(self, mac_addr: str, name: str = None):
+        super().__init__(DeviceData(name, HOST, API_KEY, mac_addr, DEVICE_TYPE_R1S1))
+        self.values = {}
+        self.delay = 0
+
+    def get_state_values(self) -> dict:
+        return dict(self.values)
+
+    async def async_fetch_update(self):
+        await asyncio.sleep(self.delay)
+        self.is_available = True
+        await self._async_publish_state_changes()
+
+class FoxOpenMetricsExporterTest(unittest.TestCase):
+
+    @async_test
+    async def test_render(self):
+        meter = FakeDevice("meter", 'Meter "main"')
+        meter.values = {("state", None): True, ("voltage", None): "230.0",
+            ("active_energy", None): "12.5", ("current", None): None}
+        relay = FakeDevice("relay")
+        relay.values = {("state", 1): False, ("state", 2): True}
+        fleet = FoxFleet([meter])
+        exporter = FoxOpenMetricsExporter(fleet)
+        text = exporter.render()
+        self.assertIn('fox_device_available{mac="meter",name="Meter \\"main\\""} 0\n', text)
+        self.assertTrue(text.endswith("# EOF\n"))
+        await fleet.async_poll()
+        fleet.add_device(relay)
+        await fleet.async_poll()
+        text = exporter.render()
+        self.assertIn("# TYPE fox_meter_active_energy counter\n", text)
+        self.assertIn('fox_meter_active_energy_total{mac="meter",name="Meter \\"main\\""} 12.5\n',
+            text)
+        self.assertIn('fox_channel_on{mac="relay",name="",channel="2"} 1.0\n', text)
+        self.assertNotIn("fox_meter_current", text)
+        #Families are not repeated
+        self.assertEqual(text.count("# TYPE fox_channel_on gauge"), 1)
+        renders = exporter.device_renders_count
+        #Unchanged devices are not rendered again
+        await fleet.async_poll()
+        self.assertEqual(exporter.render(), text)
+        self.assertEqual(exporter.device_renders_count, renders)
+        meter.values[("voltage", None)] = "240.0"
+        await fleet.async_poll()
+        text = exporter.render()
+        self.assertEqual(exporter.device_renders_count, renders + 1)
+        self.assertIn("240.0", text)
+        fleet.remove_device("relay")
+        self.assertNotIn('mac="relay"', exporter.render())
+        await fleet.async_close()
+        await relay.async_close()
+
+    @async_test
+    async def test_timed_out_device_is_unavailable(self):
+        device = FakeDevice("slow")
+        fleet = FoxFleet([device], poll_timeout=0.1)
+        exporter = FoxOpenMetricsExporter(fleet)
+        await fleet.async_poll()
+        self.assertIn('fox_device_available{mac="slow",name=""} 1\n', exporter.render())
+        device.delay = 1
+        result = await fleet.async_poll()
+        self.assertEqual(result.timed_out, ["slow"])
+        self.assertFalse(device.is_available)
+        self.assertIn('fox_device_available{mac="slow",name=""} 0\n', exporter.render())
+        await fleet.async_close()
+
+    @async_test
+    async def test_request_metrics_endpoint(self):
+        aggregator = RestApiMetricsAggregator((0.1, 1))
+        aggregator.record_request("10.0.0.2", "get_state/", 0.05, None, 30)
+        aggregator.record_request("10.0.0.2", "get_state/", None, ConnectionError())
+        exporter = FoxOpenMetricsExporter(metrics=aggregator)
+        port = await exporter.async_start(port=0)
+        try:
+            async with aiohttp.ClientSession() as session:
+                async with session.get("http://127.0.0.1:{0}{1}".format(port,
+                        OPENMETRICS_PATH)) as response:
+                    self.assertTrue(response.headers["Content-Type"].startswith(
+                        "application/openmetrics-text"))
+                    text = await response.text()
+        finally:
+            await exporter.async_stop()
+        labels = 'host="10.0.0.2",method="get_state/"'
+        self.assertIn("fox_api_requests_total{%s} 2\n" % labels, text)
+        self.assertIn('fox_api_errors_total{%s,type="ConnectionError"} 1\n' % labels, text)
+        self.assertIn("# UNIT fox_api_request_duration_seconds seconds\n", text)
+        self.assertIn('fox_api_request_duration_seconds_bucket{%s,le="+Inf"} 1\n' % labels, text)
+        self.assertIn("fox_api_received_bytes_total{%s} 30\n" % labels, text)
+        self.assertTrue(text.endswith("# EOF\n"))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,64 @@
+import asyncio
+import math
+import unittest
+import sys
+from os import path
+sys.path.append( path.dirname( path.dirname( path.abspath(__file__) ) ) )
+
+from foxrestapiclient.devices.const import DEVICE_TYPE_R1S1
+from foxrestapiclient.devices.fox_r1s1_device import FoxR1S1Device
+from foxrestapiclient.devices.fox_sensor_history import FoxSensorHistory
+from foxrestapiclient.testing.fox_simulator import FoxSimulator
+
+def async_test(coro):
+    def wrapper(*args, **kwargs):
+        loop = asyncio.new_event_loop()
+        try:
+            return loop.run_until_complete(coro(*args, **kwargs))
+        finally:
+            loop.close()
+    return wrapper
+
+class FoxSensorHistoryTest(unittest.TestCase):
+
+    def test_ring_buffer_overwrites_oldest(self):
+        history = FoxSensorHistory(("voltage",), raw_capacity=3, tiers=())
+        for second in range(5):
+            history.append({"voltage": str(230 + second)}, timestamp=second)
+        self.assertEqual(len(history), 3)
+        self.assertEqual(history.get_samples("voltage"), [(2, 232), (3, 233), (4, 234)])
+        self.assertEqual(history.get_samples("voltage", since=3.5), [(4, 234)])
+        self.assertEqual(history.get_latest("voltage"), 234)
+
+    def test_downsampling(self):
+        history = FoxSensorHistory(("voltage", "current"), raw_capacity=10,
+            tiers=((10, 2), (20, 2)))
+        for second in range(0, 50, 2):
+            history.append({"voltage": second, "current": "invalid"}, timestamp=second)
+        self.assertEqual(history.get_resolutions(), [10, 20])
+        #Buckets 0-30 are full, 40 is in progress, capacity keeps last two
+        self.assertEqual(history.get_samples("voltage", 1), [(20, 20, 24, 28), (30, 30, 34, 38)])
+        self.assertEqual(history.get_samples("voltage", 2), [(0, 0, 9, 18), (20, 20, 29, 38)])
+        bucket = history.get_samples("current", 1)[0]
+        self.assertTrue(all(math.isnan(value) for value in bucket[1:]))
+        self.assertIsNone(FoxSensorHistory().get_latest("voltage"))
+
+    @async_test
+    async def test_r1s1_history(self):
+        async with FoxSimulator.create_fleet(1, [DEVICE_TYPE_R1S1],
+                discovery_port=None) as simulator:
+            async with FoxR1S1Device(simulator.get_device_data()[0],
+                    history_capacity=1) as device:
+                await device.async_fetch_update()
+                #History is not allocated until it is used
+                self.assertIsNone(device.sensor_history)
+                self.assertEqual(device.get_sensor_history("voltage"), [])
+                await device.async_fetch_update()
+                await device.async_fetch_update()
+                samples = device.get_sensor_history("voltage")
+                self.assertEqual(len(samples), 1)
+                self.assertAlmostEqual(samples[-1][1],
+                    float(device.fetch_sensor_value_by_key("voltage")))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,93 @@
+import asyncio
+import unittest
+import sys
+from os import path
+sys.path.append( path.dirname( path.dirname( path.abspath(__file__) ) ) )
+
+from foxrestapiclient.connection.const import API_CIRCUIT_OPEN
+from foxrestapiclient.connection.rest_api_circuit_breaker import RestApiCircuitBreaker
+from foxrestapiclient.devices.const import (DEVICE_DISCOVERY_REQUEST_HEADER,
+                                            DEVICE_TYPE_R1S1, DEVICE_TYPE_STR1S2)
+from foxrestapiclient.devices.fox_r1s1_device import FoxR1S1Device
+from foxrestapiclient.devices.fox_service_discovery import (DeviceDiscoverProtocol,
+                                                            FoxServiceDiscovery)
+from foxrestapiclient.devices.fox_str1s2_device import FoxSTR1S2Device
+from foxrestapiclient.testing.fox_simulated_device import FaultProfile
+from foxrestapiclient.testing.fox_simulator import FoxSimulator
+
+def async_test(coro):
+    def wrapper(*args, **kwargs):
+        loop = asyncio.new_event_loop()
+        try:
+            return loop.run_until_complete(coro(*args, **kwargs))
+        finally:
+            loop.close()
+    return wrapper
+
+class FoxSimulatorTest(unittest.TestCase):
+
+    @async_test
+    async def test_relay_state_and_energy(self):
+        async with FoxSimulator.create_fleet(1, [DEVICE_TYPE_R1S1], discovery_port=None) as simulator:
+            async with FoxR1S1Device(simulator.get_device_data()[0]) as device:
+                self.assertTrue(await device.async_update_channel_state(True))
+                await device.async_fetch_update()
+                self.assertTrue(device.is_available)
+                self.assertTrue(device.is_on())
+                self.assertGreater(float(device.all_sensor_values["voltage"]), 0)
+
+    @async_test
+    async def test_cover_moves_over_time(self):
+        async with FoxSimulator.create_fleet(1, [DEVICE_TYPE_STR1S2], discovery_port=None) as simulator:
+            async with FoxSTR1S2Device(simulator.get_device_data()[0]) as device:
+                self.assertTrue(await device.async_set_cover_position(50))
+                await device.async_fetch_update()
+                start_position = device.get_cover_position()
+                self.assertLess(start_position, 50)
+                await asyncio.sleep(0.2)
+                await device.async_fetch_update()
+                self.assertGreater(device.get_cover_position(), start_position)
+
+    @async_test
+    async def test_discovery_response(self):
+        async with FoxSimulator.create_fleet(3, discovery_port=0) as simulator:
+            discovery = FoxServiceDiscovery()
+            transport, _ = await asyncio.get_running_loop().create_datagram_endpoint(
+                lambda: DeviceDiscoverProtocol(discovery.parse_received_datagram),
+                local_addr=("127.0.0.1", 0))
+            transport.sendto(DEVICE_DISCOVERY_REQUEST_HEADER.encode(),
+                ("127.0.0.1", simulator.discovery_port))
+            await asyncio.sleep(0.2)
+            transport.close()
+            discovered = {device.mac_addr: device.dev_type
+                for device in discovery.get_discovered_devices()}
+            expected = {device.mac_addr: device.dev_type
+                for device in simulator.get_device_data()}
+            self.assertEqual(discovered, expected)
+
+    @async_test
+    async def test_offline_and_faults(self):
+        async with FoxSimulator.create_fleet(1, [DEVICE_TYPE_R1S1], discovery_port=None) as simulator:
+            device_data = simulator.get_device_data()[0]
+            simulated = simulator.get_device(device_data.mac_addr)
+            async with FoxR1S1Device(device_data) as device:
+                await simulator.async_set_online(device_data.mac_addr, False)
+                await device.async_fetch_update()
+                self.assertFalse(device.is_available)
+                self.assertEqual(device.get_circuit_state(), API_CIRCUIT_OPEN)
+                await simulator.async_set_online(device_data.mac_addr, True)
+                RestApiCircuitBreaker.get_default().reset(device_data.host)
+                await device.async_fetch_update()
+                self.assertTrue(device.is_available)
+                simulated.fault_profile = FaultProfile(drop_probability=1)
+                await device.async_fetch_update()
+                self.assertFalse(device.is_available)
+                RestApiCircuitBreaker.get_default().reset(device_data.host)
+                simulated.fault_profile = FaultProfile(invalid_action_probability=1)
+                self.assertFalse(await device.async_update_channel_state(True))
+                simulated.fault_profile = FaultProfile(slow_read_delay=0.001)
+                await device.async_fetch_update()
+                self.assertTrue(device.is_available)
+
+if __name__ == '__main__':
+    unittest.main()
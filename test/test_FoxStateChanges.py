@@ -0,0 +1,87 @@
+import asyncio
+import unittest
+import sys
+from os import path
+sys.path.append( path.dirname( path.dirname( path.abspath(__file__) ) ) )
+
+from foxrestapiclient.devices.const import DEVICE_TYPE_LED2S2, DEVICE_TYPE_R1S1
+from foxrestapiclient.devices.fox_base_device import DeviceData, FoxBaseDevice
+from foxrestapiclient.devices.fox_led2s2_device import FoxLED2S2Device
+from foxrestapiclient.testing.fox_simulator import FoxSimulator
+from .const import API_KEY, HOST
+
+def async_test(coro):
+    def wrapper(*args, **kwargs):
+        loop = asyncio.new_event_loop()
+        try:
+            return loop.run_until_complete(coro(*args, **kwargs))
+        finally:
+            loop.close()
+    return wrapper
+
+class FakeMeter(FoxBaseDevice):
+    """Device with state values set by test."""
+
+    def __init__(self):
+        super().__init__(DeviceData(None, HOST, API_KEY, "mac", DEVICE_TYPE_R1S1))
+        self.values = {}
+
+    def get_state_values(self) -> dict:
+        return dict(self.values)
+
+    async def async_fetch_update(self):
+        self.is_available = True
+        self._publish_state_changes()
+
+class FoxStateChangesTest(unittest.TestCase):
+
+    @async_test
+    async def test_deadband(self):
+        device = FakeMeter()
+        reported = []
+        unsubscribe = device.add_state_change_listener(
+            lambda changed_device, changes: reported.append(
+                {(change.field, change.channel): (change.old_value, change.new_value)
+                    for change in changes}))
+        device.values = {("state", None): True, ("voltage", None): "230.0"}
+        await device.async_fetch_update()
+        self.assertEqual(reported.pop(), {("state", None): (None, True),
+            ("voltage", None): (None, "230.0"), ("available", None): (None, True)})
+        device.values[("voltage", None)] = "230.6"
+        await device.async_fetch_update()
+        self.assertEqual(reported, [])
+        #Drift is compared with last reported value
+        device.values[("voltage", None)] = "231.2"
+        await device.async_fetch_update()
+        self.assertEqual(reported.pop(), {("voltage", None): ("230.0", "231.2")})
+        device.values[("voltage", None)] = None
+        device.values[("state", None)] = False
+        await device.async_fetch_update()
+        self.assertEqual(reported.pop(), {("voltage", None): ("231.2", None),
+            ("state", None): (True, False)})
+        unsubscribe()
+        device.values[("state", None)] = True
+        self.assertEqual(len(device._publish_state_changes()), 1)
+        self.assertEqual(reported, [])
+        await device.async_close()
+
+    @async_test
+    async def test_channel_change(self):
+        async with FoxSimulator.create_fleet(1, [DEVICE_TYPE_LED2S2],
+                discovery_port=None) as simulator:
+            async with FoxLED2S2Device(simulator.get_device_data()[0]) as device:
+                reported = []
+                device.add_state_change_listener(
+                    lambda changed_device, changes: reported.append(changes))
+                await device.async_fetch_update()
+                self.assertEqual(len(reported.pop()), 5)
+                await device.async_fetch_update()
+                self.assertEqual(reported, [])
+                await device.async_update_channel_state(not device.channel_two_state, 2)
+                await device.async_fetch_update()
+                changes = reported.pop()
+                self.assertEqual([(change.field, change.channel) for change in changes],
+                    [("state", 2)])
+
+if __name__ == '__main__':
+    unittest.main()
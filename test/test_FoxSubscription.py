@@ -0,0 +1,164 @@
+import asyncio
+import time
+import unittest
+import sys
+from os import path
+sys.path.append( path.dirname( path.dirname( path.abspath(__file__) ) ) )
+
+from foxrestapiclient.devices.const import (DEVICE_TYPE_LED2S2, DEVICE_TYPE_R1S1,
+                                            SUBSCRIPTION_OVERFLOW_BLOCK,
+                                            SUBSCRIPTION_OVERFLOW_CONFLATE)
+from foxrestapiclient.devices.fox_base_device import DeviceData, FoxBaseDevice
+from foxrestapiclient.devices.fox_fleet import FoxFleet
+from foxrestapiclient.devices.fox_led2s2_device import FoxLED2S2Device
+from foxrestapiclient.devices.fox_subscription import FoxDeviceUpdate, FoxStateChange
+from foxrestapiclient.testing.fox_simulator import FoxSimulator
+from .const import API_KEY, HOST
+
+def async_test(coro):
+    def wrapper(*args, **kwargs):
+        loop = asyncio.new_event_loop()
+        try:
+            return loop.run_until_complete(coro(*args, **kwargs))
+        finally:
+            loop.close()
+    return wrapper
+
+class FakeMeter(FoxBaseDevice):
+    """Device with state values set by test."""
+
+    def __init__(self, mac_addr: str = "mac"):
+        super().__init__(DeviceData(None, HOST, API_KEY, mac_addr, DEVICE_TYPE_R1S1))
+        self.values = {}
+
+    def get_state_values(self) -> dict:
+        return dict(self.values)
+
+    async def async_fetch_update(self):
+        self.is_available = True
+        await self._async_publish_state_changes()
+
+class FoxSubscriptionTest(unittest.TestCase):
+
+    @async_test
+    async def test_drop_oldest(self):
+        device = FakeMeter()
+        with device.subscribe(max_size=2) as subscription:
+            for power in range(4):
+                device.values = {("power", None): power}
+                await device.async_fetch_update()
+            self.assertEqual(len(subscription), 2)
+            self.assertEqual(subscription.dropped_count, 2)
+            update = await subscription.async_get()
+            self.assertIs(update.device, device)
+            self.assertEqual([(change.field, change.old_value, change.new_value)
+                for change in update.changes], [("power", 1, 2)])
+        #Closed subscription returns queued updates and stops
+        self.assertEqual([update.changes[0].new_value async for update in subscription], [3])
+        device.values = {("power", None): 10}
+        await device.async_fetch_update()
+        self.assertEqual(len(subscription), 0)
+        await device.async_close()
+
+    @async_test
+    async def test_conflate(self):
+        first = FakeMeter("first")
+        second = FakeMeter("second")
+        subscription = first.subscribe(max_size=1, overflow=SUBSCRIPTION_OVERFLOW_CONFLATE)
+        second._add_subscription(subscription)
+        first.values = {("power", None): 1}
+        await first.async_fetch_update()
+        first.values = {("power", None): 2, ("state", None): True}
+        await first.async_fetch_update()
+        update = subscription.get_nowait()
+        changes = {(change.field, change.channel): (change.old_value, change.new_value)
+            for change in update.changes}
+        self.assertEqual(changes, {("power", None): (None, 2), ("state", None): (None, True),
+            ("available", None): (None, True)})
+        self.assertEqual(subscription.dropped_count, 0)
+        #Other device does not fit into queue
+        await first.async_fetch_update()
+        first.values = {("power", None): 3}
+        await first.async_fetch_update()
+        second.values = {("power", None): 4}
+        await second.async_fetch_update()
+        self.assertEqual(subscription.dropped_count, 1)
+        self.assertIs(subscription.get_nowait().device, second)
+        self.assertEqual(FoxDeviceUpdate(first, [FoxStateChange("power", None, 1, 2)]).merge(
+            FoxDeviceUpdate(first, [FoxStateChange("power", None, 2, 3)])).changes[0].old_value,
+            1)
+        subscription.close()
+        await first.async_close()
+        await second.async_close()
+
+    @async_test
+    async def test_block(self):
+        device = FakeMeter()
+        subscription = device.subscribe(max_size=1, overflow=SUBSCRIPTION_OVERFLOW_BLOCK,
+            block_timeout=0.2)
+        device.values = {("power", None): 1}
+        await device.async_fetch_update()
+        #Consumer frees space, refresh continues
+        device.values = {("power", None): 2}
+        refresh = asyncio.ensure_future(device.async_fetch_update())
+        await asyncio.sleep(0.05)
+        self.assertFalse(refresh.done())
+        self.assertEqual(subscription.get_nowait().changes[0].new_value, 1)
+        await refresh
+        self.assertEqual(subscription.dropped_count, 0)
+        #Stalled consumer delays refresh by block timeout only
+        device.values = {("power", None): 3}
+        start = time.monotonic()
+        await device.async_fetch_update()
+        self.assertLess(time.monotonic() - start, 1)
+        self.assertEqual(subscription.dropped_count, 1)
+        self.assertEqual(subscription.get_nowait().changes[0].new_value, 3)
+        subscription.close()
+        await device.async_close()
+
+    @async_test
+    async def test_device_stream(self):
+        async with FoxSimulator.create_fleet(1, [DEVICE_TYPE_LED2S2],
+                discovery_port=None) as simulator:
+            async with FoxLED2S2Device(simulator.get_device_data()[0]) as device:
+                received = []
+
+                async def async_consume():
+                    with device.subscribe() as subscription:
+                        async for update in subscription:
+                            received.append(update)
+                            if len(received) == 2:
+                                return
+
+                consumer = asyncio.ensure_future(async_consume())
+                await device.async_fetch_update()
+                await device.async_update_channel_state(not device.channel_two_state, 2)
+                await device.async_fetch_update()
+                await asyncio.wait_for(consumer, 1)
+                self.assertEqual(len(received[0].changes), 5)
+                self.assertEqual([(change.field, change.channel)
+                    for change in received[1].changes], [("state", 2)])
+
+    @async_test
+    async def test_fleet_subscription(self):
+        first = FakeMeter("first")
+        second = FakeMeter("second")
+        fleet = FoxFleet([first])
+        subscription = fleet.subscribe()
+        fleet.add_device(second)
+        await fleet.async_poll()
+        self.assertEqual({subscription.get_nowait().device.mac_addr for _ in range(2)},
+            {"first", "second"})
+        fleet.remove_device("second")
+        second.values = {("power", None): 1}
+        await second.async_fetch_update()
+        self.assertEqual(len(subscription), 0)
+        subscription.close()
+        first.values = {("power", None): 1}
+        await fleet.async_poll()
+        self.assertEqual(len(subscription), 0)
+        await fleet.async_close()
+        await second.async_close()
+
+if __name__ == '__main__':
+    unittest.main()
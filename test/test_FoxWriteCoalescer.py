@@ -0,0 +1,111 @@
+import asyncio
+import time
+import unittest
+import sys
+from os import path
+sys.path.append( path.dirname( path.dirname( path.abspath(__file__) ) ) )
+
+from foxrestapiclient.devices.const import DEVICE_TYPE_DIM1S2, WRITE_RESULT_SUPERSEDED
+from foxrestapiclient.devices.fox_dim1s2_device import FoxDIM1S2Device
+from foxrestapiclient.devices.fox_write_coalescer import FoxWriteCoalescer
+from foxrestapiclient.testing.fox_simulated_device import FaultProfile
+from foxrestapiclient.testing.fox_simulator import FoxSimulator
+
+def async_test(coro):
+    def wrapper(*args, **kwargs):
+        loop = asyncio.new_event_loop()
+        try:
+            return loop.run_until_complete(coro(*args, **kwargs))
+        finally:
+            loop.close()
+    return wrapper
+
+class FoxWriteCoalescerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.written = []
+
+    async def write(self, value):
+        self.written.append(value)
+        await asyncio.sleep(0.05)
+        return value
+
+    async def submit_during_write(self, coalescer, values, merge = None):
+        """Submit first value, wait until its write starts and submit the rest."""
+        first = asyncio.ensure_future(coalescer.async_submit("key", values[0], self.write, merge))
+        await asyncio.sleep(0.01)
+        rest = [coalescer.async_submit("key", value, self.write, merge) for value in values[1:]]
+        return await asyncio.gather(first, *rest)
+
+    @async_test
+    async def test_latest_value_wins(self):
+        coalescer = FoxWriteCoalescer()
+        results = await self.submit_during_write(coalescer, list(range(10)))
+        self.assertEqual(self.written, [0, 9])
+        self.assertFalse(results[0].superseded)
+        self.assertEqual(results[0].result, 0)
+        for result in results[1:9]:
+            self.assertTrue(result.superseded)
+            self.assertEqual(result.result, 9)
+        self.assertFalse(results[9].superseded)
+        self.assertFalse(coalescer.has_pending_writes("key"))
+
+    @async_test
+    async def test_keys_are_independent(self):
+        coalescer = FoxWriteCoalescer()
+        await asyncio.gather(coalescer.async_submit(1, "a", self.write),
+            coalescer.async_submit(2, "b", self.write))
+        self.assertEqual(sorted(self.written), ["a", "b"])
+
+    @async_test
+    async def test_merge(self):
+        coalescer = FoxWriteCoalescer()
+        merge = lambda pending, new: {**pending, **new}
+        await self.submit_during_write(coalescer, [{"h": 1}, {"s": 2}, {"v": 3}], merge)
+        self.assertEqual(self.written, [{"h": 1}, {"s": 2, "v": 3}])
+
+    @async_test
+    async def test_min_interval(self):
+        coalescer = FoxWriteCoalescer(min_interval=0.2)
+        start = time.monotonic()
+        await coalescer.async_submit("level", 1, self.write)
+        await coalescer.async_submit("level", 2, self.write)
+        self.assertGreaterEqual(time.monotonic() - start, 0.2)
+
+    @async_test
+    async def test_error_passed_to_callers(self):
+        async def failing_write(value):
+            raise ValueError(value)
+        with self.assertRaises(ValueError):
+            await FoxWriteCoalescer().async_submit("key", 1, failing_write)
+
+    @async_test
+    async def test_cancel_resolves_callers(self):
+        coalescer = FoxWriteCoalescer()
+        first = asyncio.ensure_future(coalescer.async_submit("key", 1, self.write))
+        await asyncio.sleep(0.01)
+        pending = asyncio.ensure_future(coalescer.async_submit("key", 2, self.write))
+        await asyncio.sleep(0)
+        coalescer.cancel()
+        results = await asyncio.wait_for(asyncio.gather(first, pending,
+            return_exceptions=True), 1)
+        self.assertTrue(all(isinstance(result, asyncio.CancelledError) for result in results))
+        self.assertEqual(self.written, [1])
+        self.assertFalse(coalescer.has_pending_writes("key"))
+
+    @async_test
+    async def test_device_setter_reports_superseded(self):
+        async with FoxSimulator.create_fleet(1, [DEVICE_TYPE_DIM1S2], discovery_port=None,
+                fault_profile=FaultProfile(latency=0.05)) as simulator:
+            async with FoxDIM1S2Device(simulator.get_device_data()[0]) as device:
+                device.set_write_coalescing(True)
+                first = asyncio.ensure_future(device.async_update_channel_brightness(10, 1))
+                await asyncio.sleep(0.01)
+                results = await asyncio.gather(first,
+                    *[device.async_update_channel_brightness(value, 1) for value in (20, 30)])
+                self.assertEqual(results, [True, WRITE_RESULT_SUPERSEDED, True])
+                device.set_write_coalescing(False)
+                self.assertIs(await device.async_update_channel_brightness(40, 1), True)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,114 @@
+import asyncio
+import time
+import unittest
+import sys
+from os import path
+sys.path.append( path.dirname( path.dirname( path.abspath(__file__) ) ) )
+
+from foxrestapiclient.connection.const import (API_CIRCUIT_CLOSED, API_CIRCUIT_HALF_OPEN,
+                                               API_CIRCUIT_OPEN)
+from foxrestapiclient.connection.rest_api_circuit_breaker import (CircuitOpenError,
+                                                                  RestApiCircuitBreaker)
+from foxrestapiclient.connection.rest_api_client import RestApiClient
+from foxrestapiclient.connection.rest_api_retry import RestApiRetryPolicy
+from foxrestapiclient.devices.const import DEVICE_TYPE_R2S2
+from foxrestapiclient.testing.fox_simulator import FoxSimulator
+
+def async_test(coro):
+    def wrapper(*args, **kwargs):
+        loop = asyncio.new_event_loop()
+        try:
+            return loop.run_until_complete(coro(*args, **kwargs))
+        finally:
+            loop.close()
+    return wrapper
+
+HOST = "192.168.0.50"
+
+class RestApiCircuitBreakerTest(unittest.TestCase):
+
+    def test_opens_after_threshold_and_half_opens(self):
+        breaker = RestApiCircuitBreaker(failure_threshold=2, open_window=0.05, jitter=0)
+        changes = []
+        breaker.add_state_change_hook(lambda host, old, new: changes.append(new))
+        breaker.record_failure(HOST)
+        self.assertEqual(breaker.get_state(HOST), API_CIRCUIT_CLOSED)
+        breaker.record_failure(HOST)
+        self.assertEqual(breaker.get_state(HOST), API_CIRCUIT_OPEN)
+        with self.assertRaises(CircuitOpenError):
+            breaker.before_request(HOST)
+        time.sleep(0.06)
+        self.assertEqual(breaker.get_state(HOST), API_CIRCUIT_HALF_OPEN)
+        #Single trial request
+        breaker.before_request(HOST)
+        with self.assertRaises(CircuitOpenError):
+            breaker.before_request(HOST)
+        breaker.record_success(HOST)
+        self.assertEqual(breaker.get_state(HOST), API_CIRCUIT_CLOSED)
+        self.assertEqual(changes, [API_CIRCUIT_OPEN, API_CIRCUIT_HALF_OPEN, API_CIRCUIT_CLOSED])
+
+    def test_failed_trial_doubles_window(self):
+        breaker = RestApiCircuitBreaker(failure_threshold=1, open_window=0.05, jitter=0)
+        breaker.record_failure(HOST)
+        time.sleep(0.06)
+        breaker.before_request(HOST)
+        breaker.record_failure(HOST)
+        self.assertEqual(breaker.get_state(HOST), API_CIRCUIT_OPEN)
+        time.sleep(0.06)
+        self.assertEqual(breaker.get_state(HOST), API_CIRCUIT_OPEN)
+        time.sleep(0.05)
+        self.assertEqual(breaker.get_state(HOST), API_CIRCUIT_HALF_OPEN)
+
+    def test_released_trial(self):
+        breaker = RestApiCircuitBreaker(failure_threshold=1, open_window=0, jitter=0)
+        breaker.record_failure(HOST)
+        breaker.before_request(HOST)
+        breaker.release_trial(HOST)
+        breaker.before_request(HOST)
+
+    @async_test
+    async def test_client_fails_fast_on_open_circuit(self):
+        async with FoxSimulator.create_fleet(1, [DEVICE_TYPE_R2S2],
+                discovery_port=None) as simulator:
+            device_data = simulator.get_device_data()[0]
+            breaker = RestApiCircuitBreaker(failure_threshold=2, open_window=0.2, jitter=0)
+            errors = []
+            async with RestApiClient(device_data.host, "000",
+                    circuit_breaker=breaker) as client:
+                client.register_response_error_hook(errors.append)
+                await simulator.async_set_online(device_data.mac_addr, False)
+                for _ in range(2):
+                    await client.async_api_set_device_state(True, 1)
+                self.assertEqual(client.get_circuit_state(), API_CIRCUIT_OPEN)
+                requests_count = simulator.get_requests_count()
+                await simulator.async_set_online(device_data.mac_addr, True)
+                await client.async_api_set_device_state(True, 1)
+                self.assertIsInstance(errors[-1], CircuitOpenError)
+                self.assertEqual(simulator.get_requests_count(), requests_count)
+                await asyncio.sleep(0.3)
+                response = await client.async_api_set_device_state(True, 1)
+                self.assertEqual(response.status, "ok")
+                self.assertEqual(client.get_circuit_state(), API_CIRCUIT_CLOSED)
+
+    @async_test
+    async def test_retried_request_counts_once(self):
+        async with FoxSimulator.create_fleet(1, [DEVICE_TYPE_R2S2],
+                discovery_port=None) as simulator:
+            device_data = simulator.get_device_data()[0]
+            breaker = RestApiCircuitBreaker(failure_threshold=3, open_window=1, jitter=0)
+            retry_policy = RestApiRetryPolicy(max_attempts=3, backoff=0, jitter=0)
+            async with RestApiClient(device_data.host, "000", circuit_breaker=breaker,
+                    retry_policy=retry_policy) as client:
+                await simulator.async_set_online(device_data.mac_addr, False)
+                response = await client.async_api_get_device_state()
+                self.assertEqual(response.status, "false")
+                #One failed poll of three attempts does not open circuit
+                self.assertEqual(simulator.get_requests_count(), 0)
+                self.assertEqual(retry_policy.retries_count, 2)
+                self.assertEqual(client.get_circuit_state(), API_CIRCUIT_CLOSED)
+                for _ in range(2):
+                    await client.async_api_get_device_state()
+                self.assertEqual(client.get_circuit_state(), API_CIRCUIT_OPEN)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,117 @@
+import asyncio
+import json
+import unittest
+import sys
+from os import path
+sys.path.append( path.dirname( path.dirname( path.abspath(__file__) ) ) )
+
+from aiohttp import web
+
+from foxrestapiclient.connection.rest_api_circuit_breaker import RestApiCircuitBreaker
+from foxrestapiclient.connection.rest_api_client import RestApiClient
+from foxrestapiclient.connection.rest_api_metrics import (LatencyHistogram,
+                                                          RestApiMetrics,
+                                                          RestApiMetricsAggregator,
+                                                          RestApiMetricsSink)
+from foxrestapiclient.connection.rest_api_retry import RestApiRetryPolicy
+
+def async_test(coro):
+    def wrapper(*args, **kwargs):
+        loop = asyncio.new_event_loop()
+        try:
+            return loop.run_until_complete(coro(*args, **kwargs))
+        finally:
+            loop.close()
+    return wrapper
+
+RESPONSE = json.dumps({"status": "ok", "state": "on"})
+
+async def async_start_server() -> tuple:
+    async def handle(request):
+        return web.Response(text=RESPONSE)
+    app = web.Application()
+    app.router.add_get("/{api_key}/{method}/", handle)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    return runner, "127.0.0.1:{0}".format(site._server.sockets[0].getsockname()[1])
+
+class FailingSink(RestApiMetricsSink):
+    def record_request(self, host, method, latency=None, error=None, bytes_received=0):
+        raise ValueError("failed")
+
+class RestApiMetricsTest(unittest.TestCase):
+
+    def test_histogram(self):
+        histogram = LatencyHistogram((0.1, 0.5, 1))
+        for latency in (0.05, 0.1, 0.3, 0.7, 2):
+            histogram.observe(latency)
+        self.assertEqual(list(histogram.counts), [2, 1, 1, 1])
+        self.assertEqual(histogram.get_cumulative_counts()[-1], (float("inf"), 5))
+        self.assertEqual(histogram.get_percentile(0.5), 0.5)
+        self.assertEqual(histogram.get_percentile(1), float("inf"))
+        self.assertAlmostEqual(histogram.sum, 3.15)
+        self.assertIsNone(LatencyHistogram().get_percentile(0.5))
+
+    def test_aggregation(self):
+        aggregator = RestApiMetricsAggregator((0.1, 1))
+        aggregator.record_request("a", "get_state/", 0.05, None, 10)
+        aggregator.record_request("a", "get_state/", 0.5, None, 10)
+        aggregator.record_request("a", "set_state/", None, ConnectionError())
+        aggregator.record_request("b", "get_state/", 0.05, None, 10)
+        self.assertEqual(aggregator.get_endpoint("a", "get_state/").bytes_received, 20)
+        self.assertEqual(aggregator.get_by_host()["a"].errors, {"ConnectionError": 1})
+        self.assertEqual(aggregator.get_by_method()["get_state/"].requests_count, 3)
+        total = aggregator.get_total()
+        self.assertEqual(total.requests_count, 4)
+        self.assertEqual(total.get_errors_count(), 1)
+        self.assertEqual(total.latency.count, 3)
+        self.assertEqual(aggregator.get_slowest_hosts(1), [("a", 1)])
+
+    @async_test
+    async def test_client_metrics(self):
+        runner, host = await async_start_server()
+        metrics = RestApiMetrics()
+        aggregator = RestApiMetricsAggregator()
+        try:
+            client = RestApiClient(host, "000", circuit_breaker=RestApiCircuitBreaker(),
+                metrics=metrics)
+            #Disabled metrics are not measured
+            await client.async_make_api_call_get("get_state/")
+            self.assertFalse(metrics.enabled)
+            metrics.add_sink(FailingSink())
+            metrics.add_sink(aggregator)
+            self.assertTrue(metrics.enabled)
+            await client.async_make_api_call_get("get_state/")
+            await client.async_make_api_call_get("get_state/")
+            await client.async_make_api_call_get("set_state/", {"state": "on"})
+            state = aggregator.get_endpoint(host, "get_state/")
+            self.assertEqual(state.requests_count, 2)
+            self.assertEqual(state.latency.count, 2)
+            self.assertEqual(state.bytes_received, 2 * len(RESPONSE))
+            self.assertEqual(aggregator.get_endpoint(host, "set_state/").requests_count, 1)
+            await client.async_close()
+        finally:
+            await runner.cleanup()
+        metrics.remove_sink(aggregator)
+        metrics.remove_sink(metrics.get_sinks()[0])
+        self.assertFalse(metrics.enabled)
+
+    @async_test
+    async def test_errors_by_type(self):
+        metrics = RestApiMetrics()
+        aggregator = RestApiMetricsAggregator()
+        metrics.add_sink(aggregator)
+        client = RestApiClient("127.0.0.1:1", "000",
+            circuit_breaker=RestApiCircuitBreaker(failure_threshold=1),
+            retry_policy=RestApiRetryPolicy(max_attempts=1), metrics=metrics)
+        await client.async_make_api_call_get("get_state/")
+        await client.async_make_api_call_get("get_state/")
+        errors = aggregator.get_endpoint("127.0.0.1:1", "get_state/").errors
+        self.assertEqual(errors, {"ClientConnectorError": 1, "CircuitOpenError": 1})
+        self.assertEqual(aggregator.get_total().latency.count, 0)
+        await client.async_close()
+
+if __name__ == '__main__':
+    unittest.main()
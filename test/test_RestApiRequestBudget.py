@@ -0,0 +1,152 @@
+import asyncio
+import json
+import time
+import unittest
+import sys
+from os import path
+sys.path.append( path.dirname( path.dirname( path.abspath(__file__) ) ) )
+
+from aiohttp import web
+
+from foxrestapiclient.connection.rest_api_budget import RestApiRequestBudget
+from foxrestapiclient.connection.rest_api_circuit_breaker import RestApiCircuitBreaker
+from foxrestapiclient.connection.rest_api_client import RestApiClient
+
+def async_test(coro):
+    def wrapper(*args, **kwargs):
+        loop = asyncio.new_event_loop()
+        try:
+            return loop.run_until_complete(coro(*args, **kwargs))
+        finally:
+            loop.close()
+    return wrapper
+
+class CountingServer:
+    """Local endpoint which counts requests and max requests in progress."""
+
+    def __init__(self, latency):
+        self.latency = latency
+        self.requests = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.runner = None
+
+    async def handle(self, request):
+        self.requests += 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.latency)
+        finally:
+            self.in_flight -= 1
+        return web.Response(text=json.dumps({"status": "ok", "state": "on"}))
+
+    async def async_start(self) -> str:
+        app = web.Application()
+        app.router.add_get("/{api_key}/{method}/", self.handle)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, "127.0.0.1", 0)
+        await site.start()
+        return "127.0.0.1:{0}".format(site._server.sockets[0].getsockname()[1])
+
+class RestApiRequestBudgetTest(unittest.TestCase):
+
+    @async_test
+    async def test_token_bucket(self):
+        budget = RestApiRequestBudget(rate=100, burst=2, max_concurrency=None)
+        start = time.monotonic()
+        for _ in range(6):
+            await budget.async_acquire()
+            budget.release()
+        #Burst of 2, then 4 requests at 100 per second
+        self.assertGreaterEqual(time.monotonic() - start, 0.035)
+
+    @async_test
+    async def test_default_does_not_limit(self):
+        budget = RestApiRequestBudget()
+        self.assertIsNone(budget.rate)
+        self.assertIsNone(budget.get_concurrency_limit())
+        self.assertIsNone(RestApiRequestBudget.get_default().rate)
+        start = time.monotonic()
+        for _ in range(500):
+            await budget.async_acquire()
+        self.assertEqual(budget.get_in_flight(), 500)
+        self.assertLess(time.monotonic() - start, 0.1)
+        budget.set_rate(100, burst=2)
+        for _ in range(3):
+            await budget.async_acquire()
+        #Burst of 2, third request waits for token
+        self.assertGreaterEqual(time.monotonic() - start, 0.005)
+
+    @async_test
+    async def test_concurrency_limit(self):
+        budget = RestApiRequestBudget(rate=None, max_concurrency=2)
+        await budget.async_acquire()
+        await budget.async_acquire()
+        waiting = asyncio.ensure_future(budget.async_acquire())
+        await asyncio.sleep(0.01)
+        self.assertFalse(waiting.done())
+        self.assertEqual(budget.get_queue_depth(), 1)
+        budget.release()
+        await asyncio.wait_for(waiting, 1)
+        self.assertEqual(budget.get_in_flight(), 2)
+
+    def test_aimd(self):
+        budget = RestApiRequestBudget(rate=None, max_concurrency=32, adaptive=True,
+            min_concurrency=4)
+        for _ in range(10):
+            budget.record_success(0.01)
+        for _ in range(3):
+            budget.record_failure()
+        self.assertEqual(budget.get_concurrency_limit(), 16)
+        for _ in range(3):
+            budget.record_failure()
+        for _ in range(3):
+            budget.record_failure()
+        for _ in range(3):
+            budget.record_failure()
+        self.assertEqual(budget.get_concurrency_limit(), 4)
+        self.assertEqual(budget.decreases_count, 4)
+        #Latency spike blocks increase
+        for _ in range(10):
+            budget.record_success(0.5)
+        self.assertEqual(budget.get_concurrency_limit(), 4)
+        for _ in range(100):
+            budget.record_success(0.01)
+        self.assertGreater(budget.get_concurrency_limit(), 8)
+        budget.set_adaptive(False)
+        self.assertEqual(budget.get_concurrency_limit(), 32)
+
+    def test_isolated_errors_do_not_decrease(self):
+        budget = RestApiRequestBudget(rate=None, max_concurrency=32, adaptive=True)
+        for _ in range(5):
+            for _ in range(20):
+                budget.record_success(0.01)
+            budget.record_failure()
+        self.assertEqual(budget.get_concurrency_limit(), 32)
+
+    @async_test
+    async def test_shared_by_clients(self):
+        server = CountingServer(0.05)
+        host = await server.async_start()
+        budget = RestApiRequestBudget(max_concurrency=1)
+        try:
+            clients = [
+                RestApiClient(host, "000", circuit_breaker=RestApiCircuitBreaker(),
+                    request_budget=budget)
+                for _ in range(3)
+            ]
+            await asyncio.gather(*[
+                client.async_make_api_call_get("get_state/") for client in clients
+            ])
+            self.assertEqual(server.requests, 3)
+            self.assertEqual(server.max_in_flight, 1)
+            self.assertEqual(budget.get_in_flight(), 0)
+            for client in clients:
+                await client.async_close()
+        finally:
+            await server.runner.cleanup()
+
+if __name__ == '__main__':
+    unittest.main()
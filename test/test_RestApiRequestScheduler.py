@@ -0,0 +1,157 @@
+import asyncio
+import json
+import unittest
+import sys
+from os import path
+sys.path.append( path.dirname( path.dirname( path.abspath(__file__) ) ) )
+
+from aiohttp import web
+
+from foxrestapiclient.connection.const import (API_SCHEDULER_PRIORITY_READ,
+                                               API_SCHEDULER_PRIORITY_WRITE)
+from foxrestapiclient.connection.rest_api_circuit_breaker import RestApiCircuitBreaker
+from foxrestapiclient.connection.rest_api_client import RestApiClient
+from foxrestapiclient.connection.rest_api_scheduler import (RequestDroppedError,
+                                                            RestApiRequestScheduler)
+from foxrestapiclient.devices.const import DEVICE_TYPE_R2S2
+from foxrestapiclient.devices.fox_base_device import DeviceData
+from foxrestapiclient.devices.fox_r2s2_device import FoxR2S2Device
+
+def async_test(coro):
+    def wrapper(*args, **kwargs):
+        loop = asyncio.new_event_loop()
+        try:
+            return loop.run_until_complete(coro(*args, **kwargs))
+        finally:
+            loop.close()
+    return wrapper
+
+class RecordingServer:
+    """Local endpoint which records order of requests and max requests in progress."""
+
+    def __init__(self, latency):
+        self.latency = latency
+        self.methods = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.runner = None
+
+    async def handle(self, request):
+        self.methods.append(request.match_info["method"])
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.latency)
+        finally:
+            self.in_flight -= 1
+        return web.Response(text=json.dumps({"status": "ok"}))
+
+    async def async_start(self) -> str:
+        app = web.Application()
+        app.router.add_get("/{api_key}/{method}/", self.handle)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, "127.0.0.1", 0)
+        await site.start()
+        return "127.0.0.1:{0}".format(site._server.sockets[0].getsockname()[1])
+
+class RestApiRequestSchedulerTest(unittest.TestCase):
+
+    @async_test
+    async def test_writes_go_first(self):
+        scheduler = RestApiRequestScheduler(max_in_flight=1)
+        order = []
+
+        async def request(name, priority):
+            await scheduler.async_acquire(priority)
+            order.append(name)
+            await asyncio.sleep(0.01)
+            scheduler.release()
+
+        tasks = [asyncio.ensure_future(request("read1", API_SCHEDULER_PRIORITY_READ))]
+        await asyncio.sleep(0)
+        tasks.append(asyncio.ensure_future(request("read2", API_SCHEDULER_PRIORITY_READ)))
+        tasks.append(asyncio.ensure_future(request("read3", API_SCHEDULER_PRIORITY_READ)))
+        tasks.append(asyncio.ensure_future(request("write", API_SCHEDULER_PRIORITY_WRITE)))
+        await asyncio.sleep(0)
+        self.assertEqual(scheduler.get_queue_depth(), 3)
+        self.assertEqual(scheduler.get_in_flight(), 1)
+        await asyncio.gather(*tasks)
+        self.assertEqual(order, ["read1", "write", "read2", "read3"])
+        self.assertEqual(scheduler.dispatched_count, 4)
+        self.assertGreater(scheduler.max_wait, 0)
+
+    @async_test
+    async def test_stale_read_dropped(self):
+        scheduler = RestApiRequestScheduler(max_in_flight=1, max_read_wait=0.05)
+        await scheduler.async_acquire(API_SCHEDULER_PRIORITY_WRITE)
+        read = asyncio.ensure_future(scheduler.async_acquire(API_SCHEDULER_PRIORITY_READ))
+        write = asyncio.ensure_future(scheduler.async_acquire(API_SCHEDULER_PRIORITY_WRITE))
+        await asyncio.sleep(0.1)
+        scheduler.release()
+        await write
+        scheduler.release()
+        with self.assertRaises(RequestDroppedError):
+            await read
+        self.assertEqual(scheduler.dropped_count, 1)
+        self.assertEqual(scheduler.get_in_flight(), 0)
+
+    @async_test
+    async def test_cancelled_request_leaves_queue(self):
+        scheduler = RestApiRequestScheduler(max_in_flight=1)
+        await scheduler.async_acquire()
+        waiting = asyncio.ensure_future(scheduler.async_acquire())
+        await asyncio.sleep(0)
+        waiting.cancel()
+        await asyncio.gather(waiting, return_exceptions=True)
+        self.assertEqual(scheduler.get_queue_depth(), 0)
+        scheduler.release()
+        self.assertEqual(scheduler.get_in_flight(), 0)
+
+    @async_test
+    async def test_client_sends_command_before_queued_reads(self):
+        server = RecordingServer(0.05)
+        host = await server.async_start()
+        try:
+            async with RestApiClient(host, "000",
+                    circuit_breaker=RestApiCircuitBreaker()) as client:
+                reads = [
+                    asyncio.ensure_future(client.async_make_api_call_get(method))
+                    for method in ("get_state/", "get_brightness/", "get_current_energy/")
+                ]
+                await asyncio.sleep(0.01)
+                await client.async_api_set_device_state(True)
+                await asyncio.gather(*reads)
+                self.assertEqual(server.methods[:2], ["get_state", "set_state"])
+                self.assertEqual(server.max_in_flight, 1)
+                self.assertEqual(client.get_scheduler().get_queue_depth(), 0)
+        finally:
+            await server.runner.cleanup()
+
+    @async_test
+    async def test_dropped_read_keeps_device_available(self):
+        server = RecordingServer(0.2)
+        host = await server.async_start()
+        try:
+            async with FoxR2S2Device(DeviceData(None, host, "000", "mac",
+                    DEVICE_TYPE_R2S2)) as device:
+                await device.async_fetch_update()
+                self.assertTrue(device.is_available)
+                device.channel_one_state = True
+                scheduler = device.get_request_scheduler()
+                scheduler.set_max_in_flight(1)
+                scheduler.max_read_wait = 0.05
+                write = asyncio.ensure_future(device.async_update_channel_state(True, 2))
+                await asyncio.sleep(0.01)
+                #Read waits behind write in flight and is dropped
+                await device.async_fetch_update()
+                await write
+                self.assertEqual(scheduler.dropped_count, 1)
+                self.assertTrue(device.is_available)
+                self.assertTrue(device.channel_one_state)
+                self.assertEqual(server.methods.count("get_state"), 1)
+        finally:
+            await server.runner.cleanup()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,135 @@
+import asyncio
+import json
+import unittest
+import sys
+from os import path
+sys.path.append( path.dirname( path.dirname( path.abspath(__file__) ) ) )
+
+from aiohttp import web
+
+from foxrestapiclient.connection.rest_api_cache import RestApiResponseCache
+from foxrestapiclient.connection.rest_api_client import RestApiClient
+from foxrestapiclient.connection.rest_api_session import RestApiSessionPool
+
+def async_test(coro):
+    def wrapper(*args, **kwargs):
+        loop = asyncio.new_event_loop()
+        try:
+            return loop.run_until_complete(coro(*args, **kwargs))
+        finally:
+            loop.close()
+    return wrapper
+
+class CountingServer:
+    """Local endpoint which counts requests by api method."""
+
+    def __init__(self):
+        self.hits = {}
+        self.state = "on"
+        self.read_delay = 0.05
+        self.runner = None
+
+    async def handle(self, request):
+        method = request.match_info["method"]
+        self.hits[method] = self.hits.get(method, 0) + 1
+        body = {"status": "ok"}
+        if method == "get_state":
+            body["state"] = self.state
+            await asyncio.sleep(self.read_delay)
+        else:
+            if method == "set_state":
+                self.state = request.query["state"]
+            await asyncio.sleep(0.05)
+        return web.Response(text=json.dumps(body))
+
+    async def async_start(self) -> str:
+        app = web.Application()
+        app.router.add_get("/{api_key}/{method}/", self.handle)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, "127.0.0.1", 0)
+        await site.start()
+        return "127.0.0.1:{0}".format(site._server.sockets[0].getsockname()[1])
+
+class RestApiResponseCacheTest(unittest.TestCase):
+
+    def test_make_key(self):
+        self.assertEqual(RestApiResponseCache.make_key("h", "get_state/", {"b": 1, "a": 2}),
+            RestApiResponseCache.make_key("h", "get_state/", {"a": "2", "b": "1"}))
+
+    def test_lru_eviction(self):
+        cache = RestApiResponseCache(max_size=2)
+        keys = [RestApiResponseCache.make_key("h", "get_state/", {"channel": i}) for i in range(3)]
+        cache.put(keys[0], b"0")
+        cache.put(keys[1], b"1")
+        cache.get(keys[0])
+        cache.put(keys[2], b"2")
+        self.assertEqual(len(cache), 2)
+        self.assertEqual(cache.get(keys[0]), b"0")
+        self.assertIsNone(cache.get(keys[1]))
+
+    def test_ttl_and_max_age(self):
+        cache = RestApiResponseCache(ttl={"get_state/": 0.05})
+        key = RestApiResponseCache.make_key("h", "get_state/")
+        cache.put(key, b"on")
+        self.assertEqual(cache.get(key, 1), b"on")
+        self.assertIsNone(cache.get(key, 0))
+        cache.put(RestApiResponseCache.make_key("h", "set_state/"), b"ok")
+        self.assertEqual(len(cache), 1)
+
+    def test_invalidate_after_write(self):
+        cache = RestApiResponseCache()
+        state_key = RestApiResponseCache.make_key("h", "get_state/")
+        info_key = RestApiResponseCache.make_key("h", "get_device_info/")
+        generation = cache.get_generation("h")
+        cache.put(state_key, b"on")
+        cache.put(info_key, b"info")
+        cache.invalidate_after_write("h", "set_state/")
+        self.assertIsNone(cache.get(state_key))
+        self.assertEqual(cache.get(info_key), b"info")
+        #Response read before write is rejected
+        cache.put(state_key, b"off", generation)
+        self.assertIsNone(cache.get(state_key))
+
+    @async_test
+    async def test_client_single_flight_and_max_age(self):
+        server = CountingServer()
+        host = await server.async_start()
+        try:
+            async with RestApiClient(host, "000", RestApiSessionPool(),
+                    RestApiResponseCache()) as client:
+                states = await asyncio.gather(
+                    *[client.async_api_get_device_state() for _ in range(5)])
+                self.assertTrue(all(state.state == "on" for state in states))
+                self.assertEqual(server.hits["get_state"], 1)
+                await client.async_api_get_device_state(max_age=10)
+                self.assertEqual(server.hits["get_state"], 1)
+                await client.async_api_get_device_state()
+                self.assertEqual(server.hits["get_state"], 2)
+                await client.async_api_set_device_state(True)
+                await client.async_api_get_device_state(max_age=10)
+                self.assertEqual(server.hits["get_state"], 3)
+        finally:
+            await server.runner.cleanup()
+
+    @async_test
+    async def test_read_after_write_does_not_join_older_read(self):
+        server = CountingServer()
+        server.read_delay = 0.3
+        host = await server.async_start()
+        try:
+            async with RestApiClient(host, "000", RestApiSessionPool(),
+                    RestApiResponseCache()) as client:
+                client.set_max_parallel_requests(None)
+                before_write = asyncio.ensure_future(client.async_api_get_device_state())
+                await asyncio.sleep(0.05)
+                await client.async_api_set_device_state(False)
+                after_write = await client.async_api_get_device_state()
+                self.assertEqual((await before_write).state, "on")
+                self.assertEqual(after_write.state, "off")
+                self.assertEqual(server.hits["get_state"], 2)
+        finally:
+            await server.runner.cleanup()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,35 @@
+import json
+import unittest
+import sys
+from os import path
+sys.path.append( path.dirname( path.dirname( path.abspath(__file__) ) ) )
+
+from foxrestapiclient.connection.rest_api_responses import (
+    RestApiBaseResponse, RestApiBrightnessResponse, RestApiDeviceInfoResponse,
+    RestApiDeviceStateResponse)
+from foxrestapiclient.devices.fox_base_device import DeviceData
+
+class RestApiResponsesTest(unittest.TestCase):
+
+    def test_responses_have_no_dict(self):
+        for response in (RestApiBaseResponse("ok"), RestApiDeviceStateResponse(),
+                RestApiDeviceInfoResponse(), RestApiBrightnessResponse(),
+                DeviceData(None, "host", "000", "mac", 4)):
+            self.assertFalse(hasattr(response, "__dict__"))
+
+    def test_error_flags(self):
+        self.assertFalse(RestApiBaseResponse("ok").has_errors())
+        response = RestApiBaseResponse("false", error_obj="error")
+        self.assertTrue(response.has_errors())
+        self.assertEqual(response.get_error_obj(), "error")
+
+    def test_metadata_interned(self):
+        payload = '{"status": "ok", "firmware": "1.2.14", "hw": "2.0"}'
+        first = RestApiDeviceInfoResponse(**json.loads(payload))
+        second = RestApiDeviceInfoResponse(**json.loads(payload))
+        self.assertIs(first.firmware, second.firmware)
+        self.assertIs(first.hardware, second.hardware)
+        self.assertIs(first.status, second.status)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,157 @@
+import asyncio
+import json
+import time
+import unittest
+import sys
+from os import path
+sys.path.append( path.dirname( path.dirname( path.abspath(__file__) ) ) )
+
+from aiohttp import web
+
+from foxrestapiclient.connection.rest_api_circuit_breaker import RestApiCircuitBreaker
+from foxrestapiclient.connection.rest_api_client import RestApiClient
+from foxrestapiclient.connection.rest_api_retry import RestApiRetryPolicy
+
+def async_test(coro):
+    def wrapper(*args, **kwargs):
+        loop = asyncio.new_event_loop()
+        try:
+            return loop.run_until_complete(coro(*args, **kwargs))
+        finally:
+            loop.close()
+    return wrapper
+
+class FlakyServer:
+    """HTTP server dropping requests for given time or delaying first request."""
+
+    def __init__(self, drop_for: float = 0, delay_first: float = 0):
+        self.drop_until = time.monotonic() + drop_for
+        self.delay_first = delay_first
+        self.requests = []
+        self.__server = None
+        self.__handler = None
+        self.host = None
+
+    async def __aenter__(self):
+        self.__handler = web.Server(self.__async_handle, access_log=None)
+        self.__server = await asyncio.get_running_loop().create_server(
+            self.__handler, "127.0.0.1", 0)
+        self.host = "127.0.0.1:{0}".format(self.__server.sockets[0].getsockname()[1])
+        return self
+
+    async def __aexit__(self, *args):
+        self.__server.close()
+        await self.__handler.shutdown(0)
+        await self.__server.wait_closed()
+
+    async def __async_handle(self, request):
+        self.requests.append(request.path)
+        if time.monotonic() < self.drop_until:
+            request.transport.abort()
+            return web.Response()
+        if len(self.requests) == 1 and self.delay_first > 0:
+            await asyncio.sleep(self.delay_first)
+        body = {"status": "ok"}
+        if "get_state" in request.path:
+            body["state"] = "on"
+        return web.Response(body=json.dumps(body).encode(),
+            content_type="application/json")
+
+class RestApiRetryPolicyTest(unittest.TestCase):
+
+    def create_client(self, host: str, policy: RestApiRetryPolicy) -> RestApiClient:
+        return RestApiClient(host, "000", circuit_breaker=RestApiCircuitBreaker(
+            failure_threshold=100), retry_policy=policy)
+
+    def test_budget_and_backoff(self):
+        policy = RestApiRetryPolicy(backoff=0.1, max_backoff=0.3, jitter=0.5,
+            budget_ratio=0.5, budget_max_tokens=2)
+        self.assertTrue(policy.is_retryable("get_state/"))
+        self.assertFalse(policy.is_retryable("set_state/"))
+        policy.mark_safe("set_state/")
+        self.assertTrue(policy.is_retryable("set_state/"))
+        self.assertTrue(policy.try_retry())
+        self.assertTrue(policy.try_retry())
+        self.assertFalse(policy.try_retry())
+        policy.record_request()
+        policy.record_request()
+        self.assertTrue(policy.try_retry())
+        for retry in range(1, 6):
+            backoff = policy.get_backoff(retry)
+            self.assertGreaterEqual(backoff, 0.05 * 2 ** (retry - 1) if retry < 3 else 0.15)
+            self.assertLessEqual(backoff, 0.45)
+
+    def test_hedge_delay(self):
+        policy = RestApiRetryPolicy(hedging=True, hedge_min_delay=0.01)
+        self.assertIsNone(policy.get_hedge_delay("host"))
+        for index in range(100):
+            policy.record_latency("host", (index + 1) / 1000)
+        self.assertAlmostEqual(policy.get_hedge_delay("host"), 0.095)
+        self.assertIsNone(RestApiRetryPolicy().get_hedge_delay("host"))
+
+    @async_test
+    async def test_read_retried_after_dropped_connection(self):
+        async with FlakyServer(drop_for=0.1) as server:
+            policy = RestApiRetryPolicy(backoff=0.3, jitter=0)
+            async with self.create_client(server.host, policy) as client:
+                errors = []
+                client.register_response_error_hook(errors.append)
+                response = await client.async_api_get_device_state()
+                self.assertEqual(response.status, "ok")
+                self.assertEqual(policy.retries_count, 1)
+                #Hook is called once with final result
+                self.assertEqual(errors, [None])
+
+    @async_test
+    async def test_write_not_retried(self):
+        async with FlakyServer(drop_for=0.1) as server:
+            policy = RestApiRetryPolicy(backoff=0.3, jitter=0)
+            async with self.create_client(server.host, policy) as client:
+                response = await client.async_api_set_device_state(True)
+                self.assertEqual(response.status, "false")
+                self.assertEqual(policy.retries_count, 0)
+                policy.mark_safe("set_state/")
+                server.drop_until = time.monotonic() + 0.1
+                response = await client.async_api_set_device_state(True)
+                self.assertEqual(response.status, "ok")
+                self.assertEqual(policy.retries_count, 1)
+
+    @async_test
+    async def test_retry_budget_exhausted(self):
+        async with FlakyServer(drop_for=10) as server:
+            policy = RestApiRetryPolicy(backoff=0.01, budget_max_tokens=1)
+            async with self.create_client(server.host, policy) as client:
+                response = await client.async_api_get_device_state()
+                self.assertEqual(response.status, "false")
+                self.assertEqual(policy.retries_count, 1)
+
+    @async_test
+    async def test_hedged_read(self):
+        async with FlakyServer(delay_first=2) as server:
+            policy = RestApiRetryPolicy(hedging=True, hedge_min_delay=0.05)
+            for _ in range(20):
+                policy.record_latency(server.host, 0.01)
+            async with self.create_client(server.host, policy) as client:
+                client.set_max_parallel_requests(2)
+                start = time.monotonic()
+                response = await client.async_api_get_device_state()
+                self.assertEqual(response.status, "ok")
+                self.assertLess(time.monotonic() - start, 1)
+                self.assertEqual(policy.hedges_count, 1)
+                self.assertEqual(len(server.requests), 2)
+
+    @async_test
+    async def test_single_request_device_not_hedged(self):
+        async with FlakyServer(delay_first=0.3) as server:
+            policy = RestApiRetryPolicy(hedging=True, hedge_min_delay=0.05)
+            for _ in range(20):
+                policy.record_latency(server.host, 0.01)
+            async with self.create_client(server.host, policy) as client:
+                self.assertEqual(client.get_max_parallel_requests(), 1)
+                response = await client.async_api_get_device_state()
+                self.assertEqual(response.status, "ok")
+                self.assertEqual(policy.hedges_count, 0)
+                self.assertEqual(len(server.requests), 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,121 @@
+import asyncio
+import json
+import unittest
+import sys
+from os import path
+sys.path.append( path.dirname( path.dirname( path.abspath(__file__) ) ) )
+
+from aiohttp import web
+
+from foxrestapiclient.connection.rest_api_client import RestApiClient
+from foxrestapiclient.connection.rest_api_retry import RestApiRetryPolicy
+from foxrestapiclient.connection.rest_api_session import RestApiSessionPool
+from foxrestapiclient.connection.const import API_RESPONSE_STATUS_OK
+
+def async_test(coro):
+    def wrapper(*args, **kwargs):
+        loop = asyncio.new_event_loop()
+        try:
+            return loop.run_until_complete(coro(*args, **kwargs))
+        finally:
+            loop.close()
+    return wrapper
+
+async def start_state_server():
+    async def get_state(request):
+        return web.Response(text=json.dumps({"status": API_RESPONSE_STATUS_OK, "state": "on"}))
+    app = web.Application()
+    app.router.add_get("/{api_key}/get_state/", get_state)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, "127.0.0.1:{0}".format(port)
+
+async def start_dropping_server(paths: list):
+    """Start server which closes every connection without response, requested paths are stored."""
+    async def handle(reader, writer):
+        request_line = await reader.readline()
+        paths.append(request_line.split()[1].decode())
+        writer.close()
+    server = await asyncio.start_server(handle, "127.0.0.1", 0)
+    return server, "127.0.0.1:{0}".format(server.sockets[0].getsockname()[1])
+
+class RestApiSessionPoolTest(unittest.TestCase):
+
+    def test_get_default(self):
+        self.assertIs(RestApiSessionPool.get_default(), RestApiSessionPool.get_default())
+
+    @async_test
+    async def test_session_shared_between_clients(self):
+        runner, host = await start_state_server()
+        pool = RestApiSessionPool()
+        try:
+            async with RestApiClient(host, "000", pool) as first, \
+                    RestApiClient(host, "000", pool) as second:
+                self.assertEqual((await first.async_api_get_device_state()).state, "on")
+                self.assertEqual((await second.async_api_get_device_state()).state, "on")
+                self.assertIs(pool.get_session(host), pool.get_session("other"))
+                session = pool.get_session(host)
+            self.assertTrue(session.closed)
+        finally:
+            await runner.cleanup()
+
+    @async_test
+    async def test_client_close_is_idempotent(self):
+        pool = RestApiSessionPool()
+        client = RestApiClient("127.0.0.1", "000", pool)
+        other = RestApiClient("127.0.0.1", "000", pool)
+        session = pool.get_session("127.0.0.1")
+        await client.async_close()
+        await client.async_close()
+        self.assertFalse(session.closed)
+        await other.async_close()
+        self.assertTrue(session.closed)
+
+    @async_test
+    async def test_dropped_connection_resends_only_safe_requests(self):
+        paths = []
+        server, host = await start_dropping_server(paths)
+        try:
+            async with RestApiClient(host, "000", RestApiSessionPool(),
+                    retry_policy=RestApiRetryPolicy(max_attempts=1)) as client:
+                #aiohttp repeats GET once by itself, pool repeats only safe reads
+                await client.async_make_api_call_get("set_state/", {"state": "on"})
+                writes = len(paths)
+                self.assertEqual(set(paths), {"/000/set_state/?state=on"})
+                paths.clear()
+                await client.async_make_api_call_get("get_state/")
+                self.assertEqual(paths, ["/000/get_state/"] * writes * 2)
+        finally:
+            server.close()
+            await server.wait_closed()
+
+    def test_loop_change_closes_previous_sessions(self):
+        pool = RestApiSessionPool()
+        #Client created outside of loop is counted when it is used
+        unused = RestApiClient("127.0.0.1", "000", pool)
+
+        async def leak_client():
+            #Client is never closed
+            RestApiClient("127.0.0.1", "000", pool)
+            return pool.get_session("127.0.0.1")
+
+        async def use_client():
+            client = RestApiClient("127.0.0.1", "000", pool)
+            session = pool.get_session("127.0.0.1")
+            await client.async_close()
+            return session
+
+        old_session = async_test(leak_client)()
+        self.assertFalse(old_session.closed)
+        new_session = async_test(use_client)()
+        self.assertTrue(old_session.closed)
+        self.assertIsNot(new_session, old_session)
+        #Leaked client of previous loop does not keep new sessions open
+        self.assertTrue(new_session.closed)
+        async_test(unused.async_close)()
+
+if __name__ == '__main__':
+    unittest.main()
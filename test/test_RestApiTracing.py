@@ -0,0 +1,105 @@
+import asyncio
+import json
+import os
+import tempfile
+import unittest
+import sys
+from os import path
+sys.path.append( path.dirname( path.dirname( path.abspath(__file__) ) ) )
+
+from foxrestapiclient.connection.rest_api_responses import (RestApiDeviceStateResponse,
+                                                            parse_response)
+from foxrestapiclient.connection.rest_api_tracing import (JsonLinesSpanExporter,
+                                                          RestApiSpanExporter,
+                                                          RestApiTracer)
+from foxrestapiclient.devices.const import DEVICE_TYPE_R1S1
+from foxrestapiclient.devices.fox_r1s1_device import FoxR1S1Device
+from foxrestapiclient.testing.fox_simulator import FoxSimulator
+
+def async_test(coro):
+    def wrapper(*args, **kwargs):
+        loop = asyncio.new_event_loop()
+        try:
+            return loop.run_until_complete(coro(*args, **kwargs))
+        finally:
+            loop.close()
+    return wrapper
+
+class CollectingExporter(RestApiSpanExporter):
+    def __init__(self):
+        self.spans = []
+
+    def export(self, span):
+        self.spans.append(span)
+
+class RestApiTracingTest(unittest.TestCase):
+
+    def test_disabled(self):
+        tracer = RestApiTracer.get_default()
+        self.assertFalse(tracer.enabled)
+        self.assertIsNone(tracer.start_span("request"))
+        response = parse_response(RestApiDeviceStateResponse, '{"status": "ok", "state": "on"}')
+        self.assertEqual(response.state, "on")
+
+    @async_test
+    async def test_refresh_spans(self):
+        tracer = RestApiTracer.get_default()
+        exporter = CollectingExporter()
+        tracer.add_exporter(exporter)
+        try:
+            async with FoxSimulator.create_fleet(1, [DEVICE_TYPE_R1S1],
+                    discovery_port=None) as simulator:
+                async with FoxR1S1Device(simulator.get_device_data()[0]) as device:
+                    await device.async_fetch_update()
+                    await device.async_fetch_update()
+        finally:
+            tracer.remove_exporter(exporter)
+        requests = [span for span in exporter.spans if span.name == "request"]
+        parses = [span for span in exporter.spans if span.name == "parse"]
+        #Three reads per refresh
+        self.assertEqual(len(requests), 6)
+        self.assertEqual(len(parses), 6)
+        self.assertEqual({span.device for span in exporter.spans}, {device.mac_addr})
+        first, second = sorted({span.trace_id for span in exporter.spans})
+        self.assertEqual(len([span for span in requests if span.trace_id == first]), 3)
+        for span in requests:
+            self.assertIsNone(span.error)
+            self.assertIn("ttfb", span.phases)
+            self.assertIn("body_read", span.phases)
+            self.assertIn("queue", span.phases)
+            if not span.connection_reused:
+                self.assertIn("connect", span.phases)
+        self.assertTrue(any(span.connection_reused for span in requests))
+        for span in parses:
+            self.assertEqual(set(span.phases), {"json_decode", "object_build"})
+        self.assertEqual({span.method for span in parses},
+            {"get_state/", "get_current_energy/", "get_total_energy/"})
+        self.assertEqual({span.method for span in requests}, {span.method for span in parses})
+        #Tracing is disabled without exporters
+        self.assertIsNone(tracer.start_span("request"))
+
+    @async_test
+    async def test_json_lines_export(self):
+        tracer = RestApiTracer.get_default()
+        file_path = path.join(tempfile.mkdtemp(), "spans.jsonl")
+        exporter = JsonLinesSpanExporter(file_path)
+        tracer.add_exporter(exporter)
+        try:
+            with tracer.trace("mac"):
+                with self.assertRaises(ValueError):
+                    parse_response(RestApiDeviceStateResponse, "not json", "get_state/")
+            parse_response(RestApiDeviceStateResponse, '{"status": "ok"}', "get_state/")
+        finally:
+            tracer.remove_exporter(exporter)
+            exporter.close()
+        with open(file_path, encoding="utf-8") as file:
+            records = [json.loads(line) for line in file]
+        os.remove(file_path)
+        self.assertEqual(len(records), 2)
+        self.assertEqual(records[0]["device"], "mac")
+        self.assertEqual(records[0]["error"], "JSONDecodeError")
+        self.assertIsNone(records[1]["trace_id"])
+        self.assertIn("object_build", records[1]["phases"])
+
+if __name__ == '__main__':
+    unittest.main()